@@ -0,0 +1,185 @@
+# Vérification différentielle du moteur de rendu rapide (fast_render) contre python-docx
+#
+# Usage :
+#   python -m benchmarks.fast_render_check            # échoue (code 1) à la première différence
+#   python -m benchmarks.fast_render_check --iterations 50
+#
+# document_texts, canonical_document_xml, sample_parties et render_synthetic
+# sont aussi utilisés par les tests (tests/test_render.py).
+
+import argparse
+import io
+import sys
+import tempfile
+import time
+import zipfile
+from contextlib import redirect_stdout
+from dataclasses import replace
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def document_texts(content: bytes) -> List[str]:
+    """Texte visible par python-docx : paragraphes du corps puis cellules des tableaux."""
+    from docx import Document
+
+    document = Document(io.BytesIO(content))
+    texts = [paragraph.text for paragraph in document.paragraphs]
+    for table in document.tables:
+        for row in table.rows:
+            texts.extend(cell.text for cell in row.cells)
+    return texts
+
+
+def canonical_document_xml(content: bytes) -> bytes:
+    """word/document.xml sous forme canonique (C14N), pour comparer deux rendus."""
+    from lxml import etree
+
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        return etree.tostring(etree.fromstring(archive.read("word/document.xml")), method='c14n')
+
+
+def _other_parts(content: bytes) -> Dict[str, bytes]:
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        return {name: archive.read(name) for name in archive.namelist() if name != "word/document.xml"}
+
+
+def _fixed_party_changes(template: bytes, content: bytes, partie_fixe: Dict[str, str]) -> List[str]:
+    """Cellules de la partie 1 (contenant son représentant) modifiées par le rendu."""
+    from docx import Document
+
+    def cells(data: bytes) -> List[str]:
+        document = Document(io.BytesIO(data))
+        return [cell.text for table in document.tables for row in table.rows for cell in row.cells]
+
+    marker = partie_fixe.get('representant_nom')
+    if not marker:
+        return []
+    return [f"{before!r} -> {after!r}" for before, after in zip(cells(template), cells(content))
+            if marker in before and after != before]
+
+
+def sample_parties():
+    """Sociétés de test, dont une avec des caractères à échapper et des sauts de ligne."""
+    from src.scraper import get_test_data
+
+    nexans = get_test_data("393525852")
+    return {
+        'nexans': nexans,
+        'frdigital': get_test_data("901995308"),
+        'escaping': replace(
+            nexans,
+            raison_sociale="  A&B <Conseil> \"Études\" 'SAS'",
+            adresse="1 rue de l'Église\n75001 PARIS\tFrance ",
+            representant_nom="Zoé O'Brien & Cie",
+            representant_fonction="Président\tdirecteur",
+        ),
+    }
+
+
+def render_synthetic(engine: str, template: Path, partie2) -> bytes:
+    """Rendu d'un template synthétique (format detailed) par le moteur demandé."""
+    from src.fast_render import get_fast_template
+    from src.generator import contract_renderer
+    from src.template_cache import get_compiled_template
+
+    # Règles du NDA master (format detailed) appliquées au template synthétique
+    rendering = (get_fast_template if engine == 'fast' else get_compiled_template)(template).render()
+    contract_renderer('nda', 'master').fill(rendering, partie2)
+
+    buffer = io.BytesIO()
+    if engine == 'fast':
+        rendering.save(buffer)
+    else:
+        rendering.document.save(buffer)
+    return buffer.getvalue()
+
+
+def _timed(func, iterations: int) -> float:
+    """Durée moyenne d'un appel (ms), après un appel de préchauffage."""
+    func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+def check(iterations: int) -> Tuple[List[str], List[Tuple[str, float, float]]]:
+    """
+    Compare les deux moteurs sur les templates NDA et les templates synthétiques.
+
+    Returns:
+        (différences, [(cas, ms python-docx, ms fast)])
+    """
+    from benchmarks.synthetic import build_all
+    from src.generator import contract_renderer, load_template_config, render_contract
+
+    config = load_template_config("nda")
+    render_nda = partial(render_contract, "nda")
+    parties = sample_parties()
+    failures, timings = [], []
+
+    def compare(name: str, render):
+        reference, fast = render('docx'), render('fast')
+        if document_texts(reference) != document_texts(fast):
+            failures.append(f"{name}: texte différent")
+        elif canonical_document_xml(reference) != canonical_document_xml(fast):
+            failures.append(f"{name}: word/document.xml différent (C14N)")
+        if _other_parts(reference) != _other_parts(fast):
+            failures.append(f"{name}: parties hors document.xml différentes")
+        return reference, fast
+
+    with redirect_stdout(io.StringIO()):
+        for variant in config['variants']:
+            template = contract_renderer('nda', variant, config).template_path.read_bytes()
+            for party_name, partie2 in parties.items():
+                reference, fast = compare(f"nda/{variant}/{party_name}",
+                                          lambda engine: render_nda(partie2, variant, config=config, engine=engine))
+                # Les règles de tableaux ne visent que le bloc de signature de la partie 2
+                for change in _fixed_party_changes(template, fast, config['partie_fixe']):
+                    failures.append(f"nda/{variant}/{party_name}: cellule de la partie 1 modifiée : {change}")
+            partie2 = parties['nexans']
+            timings.append((f"nda/{variant}",
+                            _timed(lambda: render_nda(partie2, variant, config=config, engine='docx'), iterations),
+                            _timed(lambda: render_nda(partie2, variant, config=config, engine='fast'), iterations)))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for size, template in build_all(Path(tmp)).items():
+                for party_name, partie2 in parties.items():
+                    compare(f"synthetic/{size}/{party_name}",
+                            lambda engine: render_synthetic(engine, template, partie2))
+                partie2 = parties['nexans']
+                count = max(3, iterations // {'small': 1, 'medium': 5, 'large': 20}[size])
+                timings.append((f"synthetic/{size}",
+                                _timed(lambda: render_synthetic('docx', template, partie2), count),
+                                _timed(lambda: render_synthetic('fast', template, partie2), count)))
+
+    return failures, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vérification différentielle fast_render / python-docx")
+    parser.add_argument('--iterations', type=int, default=20, help='Rendus chronométrés par cas')
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(PROJECT_ROOT))
+    failures, timings = check(args.iterations)
+
+    print("⚡ Rendu par contrat (templates compilés, sauvegarde en mémoire)")
+    print(f"   {'cas':<24}{'python-docx':>14}{'fast':>12}{'gain':>9}")
+    for name, reference_ms, fast_ms in timings:
+        print(f"   {name:<24}{reference_ms:>11.2f} ms{fast_ms:>9.2f} ms{reference_ms / fast_ms:>8.1f}x")
+
+    if failures:
+        print(f"\n❌ {len(failures)} différence(s):")
+        for failure in failures:
+            print(f"   - {failure}")
+        sys.exit(1)
+    print("\n✅ Texte, document.xml (C14N) et autres parties identiques")
+
+
+if __name__ == "__main__":
+    main()
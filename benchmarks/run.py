@@ -0,0 +1,343 @@
+# Benchmarks : rendu de templates, remplacements et résolution des sociétés
+#
+# Usage :
+#   python -m benchmarks.run                      # toutes les étapes
+#   python -m benchmarks.run --quick              # moins d'itérations
+#   python -m benchmarks.run --stages render resolve_api
+#   python -m benchmarks.run --compare benchmarks/results/<précédent>.json
+
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = PROJECT_ROOT / "benchmarks" / "results"
+
+# Écart relatif (débit) au-delà duquel --compare signale une régression
+REGRESSION_THRESHOLD = 0.10
+
+
+def _peak_rss_mb() -> float:
+    """RSS maximal du processus courant (ru_maxrss : Ko sous Linux, octets sous macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _measure(func: Callable[[], Any], iterations: int,
+             setup: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """
+    Exécute func `iterations` fois et retourne débit et latences.
+
+    setup (facultatif) prépare l'argument de chaque itération hors chrono.
+    """
+    latencies = []
+    for _ in range(iterations):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg) if setup else func()
+        latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        'iterations': iterations,
+        'total_s': round(total, 4),
+        'per_sec': round(iterations / total, 2) if total else None,
+        'p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Étapes (chacune exécutée dans un processus neuf : RSS maximal isolé)
+# ---------------------------------------------------------------------------
+
+def stage_parse(template: str, iterations: int) -> Dict[str, Any]:
+    """Parsing d'un DOCX avec python-docx (coût payé à chaque appel avant le cache de templates)."""
+    from docx import Document
+
+    return _measure(lambda: Document(template), iterations)
+
+
+def stage_replace(template: str, iterations: int) -> Dict[str, Any]:
+    """replace_in_document sur un document fraîchement chargé (chargement hors chrono)."""
+    from docx import Document
+    from src.generator import contract_renderer, replace_in_document
+    from src.scraper import get_test_data
+
+    replacements = contract_renderer('nda', 'master').replacements.resolve(get_test_data("393525852"))
+    with open(template, 'rb') as f:
+        content = f.read()
+
+    return _measure(
+        lambda doc: replace_in_document(doc, replacements),
+        iterations,
+        setup=lambda: Document(io.BytesIO(content)),
+    )
+
+
+def stage_render(template: str, iterations: int) -> Dict[str, Any]:
+    """Rendu complet depuis le template compilé : copie, remplacements, signatures, sauvegarde en mémoire."""
+    from src.generator import contract_renderer
+    from src.scraper import get_test_data
+    from src.template_cache import CompiledTemplate
+
+    partie2 = get_test_data("393525852")
+    renderer = contract_renderer('nda', 'master')
+    compiled = CompiledTemplate(Path(template))
+
+    def render():
+        rendering = renderer.fill(compiled.render(), partie2)
+        rendering.document.save(io.BytesIO())
+
+    return _measure(render, iterations)
+
+
+def stage_render_fast(template: str, iterations: int) -> Dict[str, Any]:
+    """Même rendu que stage_render par réécriture directe de word/document.xml (fast_render)."""
+    from src.fast_render import FastTemplate
+    from src.generator import contract_renderer
+    from src.scraper import get_test_data
+
+    partie2 = get_test_data("393525852")
+    renderer = contract_renderer('nda', 'master')
+    compiled = FastTemplate(Path(template))
+
+    def render():
+        rendering = renderer.fill(compiled.render(), partie2)
+        rendering.save(io.BytesIO())
+
+    return _measure(render, iterations)
+
+
+def stage_generate(variant: str, iterations: int) -> Dict[str, Any]:
+    """render_contract sur les vrais templates NDA (contrats/s de bout en bout, hors résolution)."""
+    from src.generator import load_template_config, render_contract
+    from src.scraper import get_test_data
+
+    partie2 = get_test_data("393525852")
+    config = load_template_config("nda")
+    with redirect_stdout(io.StringIO()):
+        render_contract('nda', partie2, variant, config=config)  # préchauffage du cache de templates
+        return _measure(lambda: render_contract('nda', partie2, variant, config=config), iterations)
+
+
+def _setup_resolution(cache_dir: str, latency: float):
+    """Serveur SIRENE simulé + client et cache dédiés au benchmark."""
+    from src import cache as cache_module
+    from src import sirene_client
+    from src.lookups import lookups_version
+    from src.sirene_stub import start_stub_server
+
+    server, base_url = start_stub_server(latency=latency)
+    sirene_client._client = sirene_client.SireneClient(base_url, requests_per_minute=600_000)
+    cache_module._company_cache = cache_module.CompanyCache(
+        Path(cache_dir) / "bench.sqlite", ttl_seconds=3600, negative_ttl_seconds=3600,
+        data_version=lookups_version(),
+    )
+    return server
+
+
+def stage_resolve_api(latency: float, iterations: int) -> Dict[str, Any]:
+    """scrape_pappers sans cache chaud : une requête à l'API simulée par SIREN."""
+    from src.scraper import scrape_pappers
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = _setup_resolution(tmp, latency)
+        sirens = iter(f"{552100000 + i}" for i in range(iterations))
+        with redirect_stdout(io.StringIO()):
+            result = _measure(lambda: scrape_pappers(next(sirens), refresh=True), iterations)
+        server.shutdown()
+    return result
+
+
+def stage_resolve_cache(latency: float, iterations: int) -> Dict[str, Any]:
+    """scrape_pappers servi par le cache local (après un premier passage sur l'API simulée)."""
+    from src.scraper import resolve_many, scrape_pappers
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = _setup_resolution(tmp, latency)
+        sirens = [f"{552100000 + i}" for i in range(100)]
+        with redirect_stdout(io.StringIO()):
+            resolve_many(sirens)
+            position = iter(range(iterations))
+            result = _measure(lambda: scrape_pappers(sirens[next(position) % len(sirens)]), iterations)
+        server.shutdown()
+    return result
+
+
+def stage_resolve_many(latency: float, iterations: int) -> Dict[str, Any]:
+    """resolve_many sur un lot de SIREN (recherche groupée), débit en sociétés/s."""
+    from src.scraper import resolve_many
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = _setup_resolution(tmp, latency)
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            resolved = resolve_many([f"{552100000 + i}" for i in range(iterations)], refresh=True)
+            elapsed = time.perf_counter() - start
+        server.shutdown()
+
+    return {
+        'iterations': len(resolved),
+        'total_s': round(elapsed, 4),
+        'per_sec': round(len(resolved) / elapsed, 2),
+        'p50_ms': None,
+        'p99_ms': None,
+    }
+
+
+STAGES = {
+    'parse': stage_parse,
+    'replace': stage_replace,
+    'render': stage_render,
+    'render_fast': stage_render_fast,
+    'generate': stage_generate,
+    'resolve_api': stage_resolve_api,
+    'resolve_cache': stage_resolve_cache,
+    'resolve_many': stage_resolve_many,
+}
+
+
+def _run_in_child(stage: str, argument: Any, iterations: int) -> Dict[str, Any]:
+    """Point d'entrée du processus enfant d'une étape."""
+    os.chdir(PROJECT_ROOT)
+    base_rss = _peak_rss_mb()
+    result = STAGES[stage](argument, iterations)
+    result['peak_rss_mb'] = round(_peak_rss_mb(), 1)
+    result['base_rss_mb'] = round(base_rss, 1)
+    return result
+
+
+def run_stage(stage: str, label: str, argument: Any, iterations: int) -> Dict[str, Any]:
+    """Exécute une étape dans un processus neuf (spawn) pour isoler son RSS."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+        result = pool.submit(_run_in_child, stage, argument, iterations).result()
+    return {'name': f"{stage}[{label}]", 'stage': stage, **result}
+
+
+def build_plan(templates: Dict[str, Path], quick: bool, latency: float) -> List[tuple]:
+    """Liste des (étape, libellé, argument, itérations)."""
+    scale = 0.2 if quick else 1.0
+
+    def n(count: int) -> int:
+        return max(3, int(count * scale))
+
+    iterations_by_size = {'small': 200, 'medium': 40, 'large': 10}
+    plan = []
+    for size, template in templates.items():
+        for stage in ('parse', 'replace', 'render', 'render_fast'):
+            plan.append((stage, size, str(template), n(iterations_by_size[size])))
+    for variant in ('master', 'dev_plateforme', 'prestations'):
+        plan.append(('generate', variant, variant, n(200)))
+    plan.append(('resolve_api', f"latence {latency * 1000:.0f} ms", latency, n(200)))
+    plan.append(('resolve_cache', 'sqlite', latency, n(2000)))
+    plan.append(('resolve_many', f"latence {latency * 1000:.0f} ms", latency, n(5000)))
+    return plan
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, Any], baseline_path: str, threshold: float) -> List[str]:
+    """Compare le débit de chaque étape avec un fichier de résultats précédent."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {stage['name']: stage for stage in json.load(f)['stages']}
+
+    regressions = []
+    print(f"\n📊 Comparaison avec {baseline_path}")
+    for stage in current['stages']:
+        previous = baseline.get(stage['name'])
+        if not previous or not previous.get('per_sec') or not stage.get('per_sec'):
+            continue
+        change = stage['per_sec'] / previous['per_sec'] - 1
+        flag = ''
+        if change < -threshold:
+            flag = '  ⚠️  régression'
+            regressions.append(stage['name'])
+        print(f"   {stage['name']:<32} {previous['per_sec']:>10.1f} -> {stage['per_sec']:>10.1f} /s "
+              f"({change:+.1%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks du générateur de contrats")
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), help='Étapes à exécuter (défaut: toutes)')
+    parser.add_argument('--quick', action='store_true', help='Itérations réduites (vérification rapide)')
+    parser.add_argument('--latency', type=float, default=0.005, help='Latence du serveur SIRENE simulé (s)')
+    parser.add_argument('--output', help='Fichier JSON des résultats (défaut: benchmarks/results/)')
+    parser.add_argument('--compare', help='Fichier JSON de résultats de référence')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='Baisse de débit tolérée avant signalement (défaut: 0.10)')
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(PROJECT_ROOT))
+    os.chdir(PROJECT_ROOT)
+    from benchmarks.synthetic import SIZES, build_all
+
+    with tempfile.TemporaryDirectory() as tmp:
+        templates = build_all(Path(tmp))
+        plan = [step for step in build_plan(templates, args.quick, args.latency)
+                if not args.stages or step[0] in args.stages]
+
+        print(f"🧪 {len(plan)} mesure(s)")
+        stages = []
+        for stage, label, argument, iterations in plan:
+            result = run_stage(stage, label, argument, iterations)
+            stages.append(result)
+            latency = f"p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms" \
+                if result['p50_ms'] is not None else ''
+            print(f"   {result['name']:<32} {result['per_sec']:>10.1f} /s  {latency:<32} "
+                  f"RSS max {result['peak_rss_mb']:.0f} Mo")
+
+    commit = _git_commit()
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': commit,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'quick': args.quick,
+            'sizes': SIZES,
+        },
+        'stages': stages,
+    }
+
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\n🧾 Résultats: {output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} régression(s) au-delà de {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
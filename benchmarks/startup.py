@@ -0,0 +1,125 @@
+# Budget de démarrage du CLI, mesuré avec python -X importtime
+#
+# Usage :
+#   python -m benchmarks.startup              # échoue (code 1) si un budget est dépassé
+#   python -m benchmarks.startup --runs 10 --output startup.json
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Temps d'import cumulé maximal de src.cli (ms, médiane des exécutions)
+IMPORT_BUDGET_MS = 25.0
+
+# Modules qui ne doivent pas être importés dans chaque scénario
+FORBIDDEN_MODULES = {
+    'help': ('docx', 'lxml', 'requests', 'yaml'),
+    'nda_test_data': ('requests', 'urllib3'),
+}
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+
+def _importtime(args: List[str]) -> Tuple[Dict[str, int], float]:
+    """
+    Lance python -X importtime avec ces arguments.
+
+    Returns:
+        ({module: temps cumulé en µs}, durée totale du processus en ms)
+    """
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', *args],
+        cwd=PROJECT_ROOT, capture_output=True, text=True,
+        env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'},
+    )
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    modules = {}
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            modules[match.group(4)] = int(match.group(2))
+    return modules, elapsed_ms
+
+
+def measure(runs: int) -> Dict[str, object]:
+    """Mesure l'import de src.cli, --help et un NDA sur données de test."""
+    import_ms, help_ms, baseline_ms = [], [], []
+    scenarios = {}
+
+    for _ in range(runs):
+        _, elapsed = _importtime(['-c', 'pass'])
+        baseline_ms.append(elapsed)
+
+        modules, _ = _importtime(['-c', 'import src.cli'])
+        import_ms.append(modules.get('src.cli', 0) / 1000)
+
+        modules, elapsed = _importtime(['-m', 'src.cli', '--help'])
+        help_ms.append(elapsed)
+        scenarios['help'] = modules
+
+    with tempfile.TemporaryDirectory() as tmp:
+        modules, nda_ms = _importtime(['-m', 'src.cli', 'nda', '--party', '393525852', '--output', tmp])
+        scenarios['nda_test_data'] = modules
+
+    violations = {
+        scenario: sorted(m for m in FORBIDDEN_MODULES[scenario]
+                         if any(name == m or name.startswith(m + '.') for name in scenarios[scenario]))
+        for scenario in FORBIDDEN_MODULES
+    }
+
+    return {
+        'import_src_cli_ms': round(statistics.median(import_ms), 2),
+        'import_budget_ms': IMPORT_BUDGET_MS,
+        'help_wall_ms': round(statistics.median(help_ms), 1),
+        'interpreter_wall_ms': round(statistics.median(baseline_ms), 1),
+        'nda_test_data_wall_ms': round(nda_ms, 1),
+        'forbidden_imports': {k: v for k, v in violations.items() if v},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Budget de démarrage du CLI (python -X importtime)")
+    parser.add_argument('--runs', type=int, default=5, help='Nombre de mesures (médiane)')
+    parser.add_argument('--output', help='Écrire les résultats en JSON')
+    args = parser.parse_args()
+
+    results = measure(args.runs)
+
+    print("🚀 Démarrage du CLI")
+    print(f"   import src.cli:        {results['import_src_cli_ms']:.1f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)")
+    print(f"   src.cli --help:        {results['help_wall_ms']:.0f} ms "
+          f"(interpréteur seul: {results['interpreter_wall_ms']:.0f} ms)")
+    print(f"   nda (données de test): {results['nda_test_data_wall_ms']:.0f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    failures = []
+    if results['import_src_cli_ms'] > IMPORT_BUDGET_MS:
+        failures.append(f"import src.cli: {results['import_src_cli_ms']} ms > {IMPORT_BUDGET_MS} ms")
+    for scenario, modules in results['forbidden_imports'].items():
+        failures.append(f"{scenario}: import de {', '.join(modules)}")
+
+    if failures:
+        print("\n❌ Budget de démarrage dépassé:")
+        for failure in failures:
+            print(f"   - {failure}")
+        sys.exit(1)
+    print("✅ Budget respecté")
+
+
+if __name__ == "__main__":
+    main()
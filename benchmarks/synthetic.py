@@ -0,0 +1,77 @@
+# Templates DOCX synthétiques de taille croissante pour les benchmarks
+
+from pathlib import Path
+from typing import Dict
+
+from docx import Document
+
+# Paragraphes par page (approximation d'une page de contrat)
+PARAGRAPHS_PER_PAGE = 30
+
+# Tailles : pages, tableaux, runs par paragraphe
+SIZES: Dict[str, Dict[str, int]] = {
+    'small': {'pages': 2, 'tables': 1, 'runs': 4},
+    'medium': {'pages': 20, 'tables': 10, 'runs': 8},
+    'large': {'pages': 100, 'tables': 50, 'runs': 16},
+}
+
+# Phrase du format "detailed" (NDA master), découpée en runs dans le template
+DETAILED_SENTENCE = (
+    "XXXXX, société par actions simplifiée unipersonnelle, dont le siège social est "
+    "situé à XXXXX (France), au capital de XXXXX €, inscrit au registre du commerce de "
+    "XXXXX sous le numéro d'inscription XXXXX, dûment représenté par XXXXX, en qualité de Président."
+)
+
+FILLER = (
+    "Les informations confidentielles s'entendent de toute information de nature "
+    "technique, commerciale ou financière communiquée par une partie à l'autre."
+)
+
+
+def _add_split_paragraph(document, text: str, runs: int):
+    """Paragraphe dont le texte est réparti sur `runs` runs (comme après édition Word)."""
+    paragraph = document.add_paragraph()
+    step = max(1, len(text) // runs)
+    for start in range(0, len(text), step):
+        paragraph.add_run(text[start:start + step])
+    return paragraph
+
+
+def build_synthetic_template(path: Path, pages: int, tables: int, runs: int) -> Path:
+    """
+    Écrit un template NDA synthétique.
+
+    Une page sur deux contient la phrase de désignation de la partie 2
+    (placeholders coupés entre runs) ; chaque tableau reproduit le bloc
+    de signatures (LE PARTENAIRE / Nom : / Titre :).
+    """
+    document = Document()
+    document.add_heading("ACCORD DE CONFIDENTIALITÉ", level=1)
+
+    table_every = max(1, pages // max(1, tables))
+    tables_added = 0
+
+    for page in range(pages):
+        for i in range(PARAGRAPHS_PER_PAGE):
+            text = DETAILED_SENTENCE if (i == 0 and page % 2 == 0) else FILLER
+            _add_split_paragraph(document, text, runs)
+
+        if tables_added < tables and page % table_every == 0:
+            table = document.add_table(rows=2, cols=2)
+            table.cell(0, 0).text = "FR DIGITAL"
+            table.cell(0, 1).text = "LE PARTENAIRE"
+            table.cell(1, 0).text = "Nom :\nTitre :"
+            table.cell(1, 1).text = "Nom :\nTitre :"
+            tables_added += 1
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    document.save(path)
+    return path
+
+
+def build_all(directory: Path) -> Dict[str, Path]:
+    """Construit un template par taille de SIZES."""
+    return {
+        name: build_synthetic_template(directory / f"synthetic_{name}.docx", **size)
+        for name, size in SIZES.items()
+    }
@@ -148,8 +148,7 @@ generate_nda() {
     echo "    - URL Pappers : https://www.pappers.fr/entreprise/nexans-393525852"
     echo "    - SIREN       : 393525852"
     echo ""
-    echo "  Sociétés de test disponibles :"
-    echo "    - FR Digital  : 901995308"
+    echo "  Société de test disponible (FR Digital est la partie 1, fixe) :"
     echo "    - Nexans      : 393525852"
     echo ""
     read -p "Identifiant : " party_id
@@ -200,9 +199,10 @@ show_help() {
     echo ""
     echo "OPTIONS :"
     echo ""
-    echo "  --party <identifiant>   URL Pappers ou SIREN de la société partenaire"
-    echo "  --type <variante>       Type de NDA : master, dev_plateforme, prestations"
+    echo "  --party <identifiant>   URL Pappers ou SIREN de la société partenaire (répétable)"
+    echo "  --type <variante>       Type de NDA : master, dev_plateforme, prestations, all (répétable)"
     echo "  --output <dossier>      Répertoire de sortie (défaut: output/)"
+    echo "  --zip <archive.zip>     Regrouper les NDA générés dans une archive"
     echo ""
     echo "EXEMPLES :"
     echo ""
@@ -214,6 +214,9 @@ show_help() {
     echo "    --party \"https://www.pappers.fr/entreprise/nexans-393525852\" \\"
     echo "    --type dev_plateforme"
     echo ""
+    echo "  # Les trois variantes pour un partenaire, dans une archive"
+    echo "  python3 -m src.cli nda --party \"393525852\" --type all --zip nexans.zip"
+    echo ""
     echo "VARIANTES NDA :"
     echo ""
     echo "  master          : Conseil IA générique"
@@ -222,7 +225,7 @@ show_help() {
     echo ""
     echo "SOCIÉTÉS DE TEST :"
     echo ""
-    echo "  FR Digital : 901995308"
+    echo "  FR Digital : 901995308  (partie 1, fixe : ne pas la passer à --party)"
     echo "  Nexans     : 393525852"
     echo ""
 
@@ -0,0 +1,339 @@
+# Génération de contrats en lot à partir d'un fichier CSV ou JSONL
+
+import csv
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .contract_engine import IncompleteSocieteError
+from .generator import (contract_renderer, generate_contract, generate_contract_stored, load_template_config,
+                        partie_fixe_siren)
+from .jobs import format_contract
+from .metrics import metrics
+from .models import Societe
+from .output_store import get_output_store
+from .pdf_export import format_pdf_result, get_pdf_exporter
+from .pending import PendingQueue
+from .scraper import SocieteNotFoundError, resolve_many
+
+
+def read_batch_file(path: str, default_variant: Optional[str] = None,
+                    default_template: str = "nda") -> List[Dict[str, Any]]:
+    """
+    Lit la liste des parties à traiter.
+
+    Formats acceptés :
+    - CSV avec en-tête : colonne `party` (ou `siren`), colonnes optionnelles
+      `type` (ou `variant`) et `contract` (ou `template`, type de contrat :
+      nda, msa...)
+    - JSONL : un objet par ligne avec les mêmes clés
+
+    Le type de contrat et la variante de chaque ligne sont vérifiés dans
+    le config.yaml du template : une ligne invalide est en erreur.
+
+    Args:
+        path: Chemin du fichier CSV ou JSONL
+        default_variant: Variante utilisée quand la ligne n'en précise pas
+            (défaut : la première variante déclarée du template)
+        default_template: Type de contrat utilisé quand la ligne n'en précise pas
+
+    Returns:
+        Liste de lignes {line, party, template, variant, error}
+    """
+    file_path = Path(path)
+    if not file_path.exists():
+        raise FileNotFoundError(f"Fichier batch introuvable: {file_path}")
+
+    if file_path.suffix.lower() in ('.jsonl', '.ndjson'):
+        records = []
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append((line_number, json.loads(line)))
+                except json.JSONDecodeError as e:
+                    records.append((line_number, {'_error': f"JSON invalide: {e}"}))
+    else:
+        with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+            # Ligne 1 = en-tête
+            records = list(enumerate(csv.DictReader(f), start=2))
+
+    rows = []
+    for line_number, record in records:
+        party = str(record.get('party') or record.get('siren') or '').strip()
+        variant = str(record.get('type') or record.get('variant') or default_variant or '').strip()
+        template = str(record.get('contract') or record.get('template') or default_template).strip()
+        rows.append({
+            'line': line_number,
+            'party': party,
+            'template': template,
+            'variant': variant,
+            'error': record.get('_error') or ('' if party else "Colonne party/siren vide"),
+        })
+
+    check_rows(rows)
+    return rows
+
+
+def check_rows(rows: List[Dict[str, Any]]) -> int:
+    """
+    Vérifie le type de contrat et la variante des lignes valides.
+
+    Une ligne sans variante reçoit la première variante déclarée de son
+    template. Chaque configuration n'est chargée qu'une fois.
+
+    Returns:
+        Nombre de lignes passées en erreur
+
+    Raises:
+        TemplateConfigError: config.yaml d'un template invalide
+    """
+    configs: Dict[str, Optional[Dict[str, Any]]] = {}
+    invalid = 0
+    for row in rows:
+        if row.get('error'):
+            continue
+        template = row['template']
+        if template not in configs:
+            try:
+                configs[template] = load_template_config(template)
+            except FileNotFoundError:
+                configs[template] = None
+        config = configs[template]
+        if config is None:
+            row['error'] = f"Type de contrat inconnu: {template}"
+        elif not row['variant']:
+            row['variant'] = next(iter(config['variants']))
+        elif row['variant'] not in config['variants']:
+            row['error'] = (f"Variante inconnue: {row['variant']}. "
+                            f"Variantes disponibles: {list(config['variants'].keys())}")
+        invalid += bool(row['error'])
+    return invalid
+
+
+def process_row(row: Dict[str, Any], partie2: Societe, output_dir: str,
+                incremental: bool = False) -> Dict[str, Any]:
+    """
+    Génère le contrat d'une ligne du batch pour une société déjà résolue.
+
+    Exécuté dans un processus du pool : les logs détaillés sont
+    capturés pour ne pas entrelacer les sorties des workers, et toute
+    erreur est retournée dans le résultat au lieu d'être levée. Les
+    métriques de la ligne sont renvoyées au processus principal
+    (clé _metrics, absente du manifest).
+
+    En mode incrémental, un contrat dont les entrées n'ont pas changé est
+    repris du stockage adressé par contenu (reused=True dans le manifest).
+    """
+    metrics.reset()
+    result = _row_result(row)
+
+    start = time.perf_counter()
+    try:
+        with redirect_stdout(io.StringIO()):
+            if incremental:
+                output_file, result['reused'] = generate_contract_stored(
+                    template_name=result['template'],
+                    partie2=partie2,
+                    store=get_output_store(),
+                    variant=row['variant'],
+                    output_dir=output_dir
+                )
+            else:
+                output_file = generate_contract(
+                    template_name=result['template'],
+                    partie2=partie2,
+                    variant=row['variant'],
+                    output_dir=output_dir
+                )
+        result['status'] = 'ok'
+        result['output'] = output_file
+        result['raison_sociale'] = partie2.raison_sociale
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        result['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+    result['_metrics'] = metrics.snapshot()
+    return result
+
+
+def _row_result(row: Dict[str, Any], error: Optional[str] = None) -> Dict[str, Any]:
+    """Entrée de manifest pour une ligne (en erreur tant qu'elle n'a pas abouti)."""
+    return {
+        'line': row['line'],
+        'party': row['party'],
+        'template': row.get('template', 'nda'),
+        'variant': row['variant'],
+        'status': 'error',
+        'output': None,
+        'error': error,
+    }
+
+
+def default_manifest_path(output_dir: str) -> str:
+    """Chemin par défaut du manifest de résultats."""
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return str(Path(output_dir) / f"batch_manifest_{timestamp}.jsonl")
+
+
+def run_batch(rows: List[Dict[str, Any]], output_dir: str = "output",
+              manifest_path: Optional[str] = None, workers: Optional[int] = None,
+              refresh: bool = False, offline: bool = False,
+              incremental: bool = False, pdf: bool = False,
+              pending: Optional[PendingQueue] = None,
+              known: Optional[Dict[str, Societe]] = None) -> Dict[str, Any]:
+    """
+    Génère les contrats d'un batch en parallèle.
+
+    1. Résolution : chaque société distincte est résolue une seule fois
+       (cache, puis API SIRENE en parallèle sur une session partagée).
+    2. Rendu : les lignes sont réparties sur un pool de processus
+       (l'import de python-docx n'est payé qu'une fois par worker).
+
+    Chaque résultat est écrit dans le manifest JSONL dès qu'il est
+    disponible ; une ligne en échec n'interrompt pas le batch. Aucune
+    saisie n'est jamais demandée : avec `pending`, les lignes dont la
+    société est introuvable, ou incomplète pour la variante (champ « Non
+    renseigné »), sont mises en attente (status "deferred") au lieu
+    d'être comptées en erreur. Une ligne qui demande le même contrat
+    qu'une ligne précédente (même type, variante et SIREN, donc le même
+    fichier de sortie) n'est pas rendue une seconde fois : elle est notée
+    status "duplicate", avec duplicate_of = ligne d'origine.
+
+    Args:
+        rows: Lignes retournées par read_batch_file
+        output_dir: Répertoire de sortie des contrats
+        manifest_path: Fichier JSONL des résultats (défaut: output_dir/batch_manifest_<date>.jsonl)
+        workers: Nombre de processus (défaut: nombre de cœurs)
+        refresh: Ignorer le cache local des sociétés
+        offline: Ne pas appeler l'API SIRENE
+        incremental: Ne régénérer que les contrats dont le template, la variante
+            ou les données de la société ont changé
+        pdf: Convertir aussi chaque contrat en PDF (LibreOffice, par lots, pendant
+            la génération des suivants)
+        pending: File d'attente des contrats dont la société est introuvable ou incomplète
+        known: Sociétés déjà connues par identifiant (données manuelles),
+            non résolues
+
+    Returns:
+        Résumé {total, ok, reused, deferred, duplicates, errors, manifest, duration_s} et,
+        avec pdf, pdf {ok, errors, amortized_ms} (durée moyenne amortie par document)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = manifest_path or default_manifest_path(output_dir)
+    Path(manifest_path).parent.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    summary = {'total': len(rows), 'ok': 0, 'reused': 0, 'deferred': 0, 'duplicates': 0, 'errors': 0,
+               'manifest': manifest_path}
+    start = time.perf_counter()
+    done = 0
+
+    exporter = None
+    if pdf:
+        # LibreOffice absent : erreur avant tout rendu
+        exporter = get_pdf_exporter(on_result=lambda result: print(format_pdf_result(result)))
+
+    known = known or {}
+    parties = [row['party'] for row in rows if not row.get('error') and row['party'] not in known]
+    print(f"🔍 Résolution de {len(set(parties))} identifiant(s)...")
+    with redirect_stdout(io.StringIO()):
+        resolved = resolve_many(parties, refresh=refresh, offline=offline) if parties else {}
+    resolved.update(known)
+
+    with open(manifest_path, 'w', encoding='utf-8') as manifest:
+
+        def record(result: Dict[str, Any]):
+            nonlocal done
+            done += 1
+            metrics.merge(result.pop('_metrics', {}))
+            manifest.write(json.dumps(result, ensure_ascii=False) + "\n")
+            manifest.flush()
+
+            if result['status'] == 'deferred':
+                summary['deferred'] += 1
+                print(f"⏸️  [{done}/{len(rows)}] ligne {result['line']} {result['party']} ({format_contract(result)}) "
+                      f"en attente: {result['error']}")
+            elif result['status'] == 'duplicate':
+                summary['duplicates'] += 1
+                print(f"🔁 [{done}/{len(rows)}] ligne {result['line']} {result['party']} ({format_contract(result)}): "
+                      f"{result['error']}")
+            elif result['status'] == 'ok':
+                summary['ok'] += 1
+                summary['reused'] += bool(result.get('reused'))
+                if exporter:
+                    exporter.submit(result['output'])
+                icon = "♻️ " if result.get('reused') else "✅"
+                print(f"{icon} [{done}/{len(rows)}] ligne {result['line']} {result['party']} ({format_contract(result)}) → {result['output']}")
+            else:
+                summary['errors'] += 1
+                print(f"❌ [{done}/{len(rows)}] ligne {result['line']} {result['party']} ({format_contract(result)}): {result['error']}")
+
+        to_render = []
+        fixed_sirens: Dict[str, Optional[str]] = {}
+        # (type, variante, SIREN) -> ligne qui génère ce contrat
+        first_lines: Dict[Tuple[str, str, str], int] = {}
+        for row in rows:
+            outcome = None if row.get('error') else resolved.get(row['party'])
+            template = row.get('template', 'nda')
+            if isinstance(outcome, Societe) and template not in fixed_sirens:
+                fixed_sirens[template] = partie_fixe_siren(template)
+            if isinstance(outcome, Societe) and outcome.siren.replace(' ', '') == fixed_sirens[template]:
+                # Partie 1 déjà dans le template : pas de contrat avec elle-même
+                record(_row_result(row, f"{outcome.raison_sociale} est la partie 1 du contrat (partie_fixe), "
+                                        f"pas une société partenaire"))
+                continue
+            if isinstance(outcome, Societe):
+                try:
+                    # Champ repris par la variante non renseigné : refusé avant le pool
+                    contract_renderer(template, row['variant']).check_complete(outcome)
+                except IncompleteSocieteError as e:
+                    outcome = e
+            if isinstance(outcome, Societe):
+                contract = (template, row['variant'], outcome.siren.replace(' ', ''))
+                if contract in first_lines:
+                    # Même fichier de sortie : un seul rendu, pas d'écritures concurrentes
+                    record({**_row_result(row, f"doublon de la ligne {first_lines[contract]}"),
+                            'status': 'duplicate', 'duplicate_of': first_lines[contract]})
+                    continue
+                first_lines[contract] = row['line']
+                to_render.append((row, outcome))
+            elif pending is not None and isinstance(outcome, (SocieteNotFoundError, IncompleteSocieteError)):
+                pending.park(outcome.siren, row['party'], row['variant'], output_dir, str(outcome),
+                             template=row.get('template', 'nda'))
+                record({**_row_result(row, str(outcome)), 'status': 'deferred'})
+            else:
+                record(_row_result(row, row.get('error') or str(outcome)))
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(process_row, row, partie2, output_dir, incremental): row for row, partie2 in to_render}
+
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # Worker tué (mémoire, signal) : on enregistre l'échec et on continue
+                    result = _row_result(futures[future], f"Worker interrompu: {e}")
+                record(result)
+
+    if exporter:
+        pdf_results = exporter.close()
+        converted = [result for result in pdf_results if result['status'] == 'ok']
+        summary['pdf'] = {
+            'ok': len(converted),
+            'errors': len(pdf_results) - len(converted),
+            'amortized_ms': round(sum(r['amortized_ms'] for r in pdf_results) / len(pdf_results), 1)
+            if pdf_results else None,
+        }
+
+    summary['duration_s'] = round(time.perf_counter() - start, 2)
+    return summary
@@ -0,0 +1,316 @@
+# Cache local (SQLite) des sociétés résolues, avec TTL et cache négatif
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
+from .lookups import lookups_version
+from .metrics import metrics
+from .models import Dirigeant, Societe
+from .settings import get_setting, resolve_path
+
+# Statuts retournés par CompanyCache.get
+HIT = 'hit'
+NEGATIVE = 'negative'
+MISS = 'miss'
+
+
+class CompanyCache:
+    """
+    Cache SQLite des fiches Societe, indexé par SIREN.
+
+    Chaque entrée garde sa date de récupération : une fiche plus vieille
+    que le TTL est considérée absente. Les SIREN introuvables (404) sont
+    mémorisés pour une durée plus courte afin de ne pas réinterroger
+    l'API à chaque contrat.
+
+    Chaque fiche garde aussi la version des tables de correspondance
+    (src/lookups.py) qui ont servi à la construire : après une mise à jour
+    des tables, les fiches construites avec les anciennes sont considérées
+    absentes et reconstruites. Les fiches saisies à la main (version vide)
+    ne dépendent pas des tables et restent valides.
+
+    Utilisable depuis plusieurs threads et processus (mode WAL, connexion
+    rouverte après un fork).
+    """
+
+    def __init__(self, path: Path, ttl_seconds: float, negative_ttl_seconds: float,
+                 data_version: str = ''):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.data_version = data_version
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS societes (
+                    siren TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    data TEXT,
+                    source TEXT,
+                    fetched_at REAL NOT NULL,
+                    data_version TEXT
+                )
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(societes)")}
+            if 'data_version' not in columns:
+                # Cache créé avant le versionnement : ses fiches seront reconstruites
+                conn.execute("ALTER TABLE societes ADD COLUMN data_version TEXT")
+            # Lecture incrémentale des nouvelles fiches (index des noms, found_since)
+            conn.execute("CREATE INDEX IF NOT EXISTS societes_fetched_at ON societes (fetched_at)")
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, siren: str) -> Tuple[str, Optional[Societe]]:
+        """
+        Cherche une société dans le cache.
+
+        Returns:
+            (HIT, Societe) si une fiche valide existe,
+            (NEGATIVE, None) si le SIREN est connu comme introuvable,
+            (MISS, None) sinon (absent, expiré ou construit avec d'autres tables)
+        """
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT status, data, fetched_at, data_version FROM societes WHERE siren = ?",
+                (siren,)
+            ).fetchone()
+
+        result, societe = MISS, None
+        if row is not None:
+            status, data, fetched_at, data_version = row
+            age = time.time() - fetched_at
+            current = data_version in ('', self.data_version)
+
+            if status == 'found' and age <= self.ttl_seconds and current:
+                result, societe = HIT, Societe(**json.loads(data))
+            elif status == 'not_found' and age <= self.negative_ttl_seconds:
+                result = NEGATIVE
+
+        metrics.incr('cache_lookups_total', result=result)
+        return result, societe
+
+    def put(self, siren: str, societe: Societe, source: str = 'sirene', data_version: Optional[str] = None):
+        """
+        Enregistre (ou remplace) la fiche d'une société.
+
+        data_version : version des tables utilisées pour la construire
+        (défaut : celle du cache) ; '' pour une fiche qui n'en dépend pas.
+        """
+        if data_version is None:
+            data_version = self.data_version
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO societes (siren, status, data, source, fetched_at, data_version) "
+                "VALUES (?, 'found', ?, ?, ?, ?)",
+                (siren, json.dumps(asdict(societe), ensure_ascii=False), source, time.time(), data_version)
+            )
+            conn.commit()
+
+    def put_many(self, societes: Iterable[Societe], source: str, data_version: Optional[str] = None) -> int:
+        """
+        Enregistre un lot de fiches en une transaction (import en masse).
+
+        Returns:
+            Nombre de fiches enregistrées
+        """
+        if data_version is None:
+            data_version = self.data_version
+        now = time.time()
+        rows = [(societe.siren.replace(' ', ''), json.dumps(asdict(societe), ensure_ascii=False),
+                 source, now, data_version) for societe in societes]
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO societes (siren, status, data, source, fetched_at, data_version) "
+                "VALUES (?, 'found', ?, ?, ?, ?)",
+                rows
+            )
+            conn.commit()
+        return len(rows)
+
+    def valid_found(self) -> Iterator[Societe]:
+        """Fiches valides (ni expirées, ni construites avec d'autres tables), par SIREN."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT data FROM societes WHERE status = 'found' AND fetched_at >= ? "
+                "AND (data_version = '' OR data_version = ?) ORDER BY siren",
+                (time.time() - self.ttl_seconds, self.data_version)
+            ).fetchall()
+        for (data,) in rows:
+            yield Societe(**json.loads(data))
+
+    def put_not_found(self, siren: str, source: str = 'sirene'):
+        """Mémorise qu'un SIREN est introuvable (cache négatif)."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO societes (siren, status, data, source, fetched_at) "
+                "VALUES (?, 'not_found', NULL, ?, ?)",
+                (siren, source, time.time())
+            )
+            conn.commit()
+
+    def invalidate(self, siren: str):
+        """Supprime l'entrée d'un SIREN."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM societes WHERE siren = ?", (siren,))
+            conn.commit()
+
+    def found_since(self, since: float) -> Iterator[Tuple[str, Societe, float]]:
+        """
+        Fiches enregistrées ou remplacées après `since` (expirées comprises),
+        par date croissante : (siren, Societe, fetched_at).
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT siren, data, fetched_at FROM societes "
+                "WHERE fetched_at > ? AND status = 'found' ORDER BY fetched_at",
+                (since,)
+            ).fetchall()
+        for siren, data, fetched_at in rows:
+            yield siren, Societe(**json.loads(data)), fetched_at
+
+
+class DirigeantCache:
+    """
+    Cache SQLite des représentants légaux, indexé par SIREN.
+
+    Distinct du cache des sociétés : les dirigeants viennent d'une autre
+    source (src/dirigeants.py), changent à un autre rythme et sont
+    combinés à la fiche société au moment de la résolution. Mêmes règles
+    de TTL et de cache négatif que CompanyCache.
+    """
+
+    def __init__(self, path: Path, ttl_seconds: float, negative_ttl_seconds: float):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS dirigeants (
+                    siren TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    nom TEXT,
+                    fonction TEXT,
+                    source TEXT,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, siren: str) -> Tuple[str, Optional[Dirigeant]]:
+        """
+        Cherche le représentant d'une société.
+
+        Returns:
+            (HIT, Dirigeant), (NEGATIVE, None) ou (MISS, None), comme CompanyCache.get
+        """
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT status, nom, fonction, fetched_at FROM dirigeants WHERE siren = ?",
+                (siren,)
+            ).fetchone()
+
+        result, dirigeant = MISS, None
+        if row is not None:
+            status, nom, fonction, fetched_at = row
+            age = time.time() - fetched_at
+
+            if status == 'found' and age <= self.ttl_seconds:
+                result, dirigeant = HIT, Dirigeant(nom=nom, fonction=fonction)
+            elif status == 'not_found' and age <= self.negative_ttl_seconds:
+                result = NEGATIVE
+
+        metrics.incr('dirigeant_cache_lookups_total', result=result)
+        return result, dirigeant
+
+    def put(self, siren: str, dirigeant: Dirigeant, source: str):
+        """Enregistre (ou remplace) le représentant d'une société."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO dirigeants (siren, status, nom, fonction, source, fetched_at) "
+                "VALUES (?, 'found', ?, ?, ?, ?)",
+                (siren, dirigeant.nom, dirigeant.fonction, source, time.time())
+            )
+            conn.commit()
+
+    def put_not_found(self, siren: str, source: str):
+        """Mémorise qu'aucun représentant n'est connu pour ce SIREN (cache négatif)."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO dirigeants (siren, status, nom, fonction, source, fetched_at) "
+                "VALUES (?, 'not_found', NULL, NULL, ?, ?)",
+                (siren, source, time.time())
+            )
+            conn.commit()
+
+
+_company_cache: Optional[CompanyCache] = None
+
+
+def get_company_cache() -> Optional[CompanyCache]:
+    """Cache configuré dans config/settings.yaml (None si désactivé)."""
+    global _company_cache
+
+    if not get_setting('cache', 'enabled', True):
+        return None
+
+    if _company_cache is None:
+        _company_cache = CompanyCache(
+            path=resolve_path(get_setting('cache', 'path', '.cache/societes.sqlite')),
+            ttl_seconds=float(get_setting('cache', 'ttl_days', 30)) * 86400,
+            negative_ttl_seconds=float(get_setting('cache', 'negative_ttl_hours', 6)) * 3600,
+            data_version=lookups_version(),
+        )
+    return _company_cache
+
+
+_dirigeant_cache: Optional[DirigeantCache] = None
+
+
+def get_dirigeant_cache() -> Optional[DirigeantCache]:
+    """Cache des représentants configuré dans config/settings.yaml (None si le cache est désactivé)."""
+    global _dirigeant_cache
+
+    if not get_setting('cache', 'enabled', True):
+        return None
+
+    if _dirigeant_cache is None:
+        _dirigeant_cache = DirigeantCache(
+            path=resolve_path(get_setting('dirigeants', 'cache_path', '.cache/dirigeants.sqlite')),
+            ttl_seconds=float(get_setting('dirigeants', 'ttl_days', 90)) * 86400,
+            negative_ttl_seconds=float(get_setting('dirigeants', 'negative_ttl_hours', 24)) * 3600,
+        )
+    return _dirigeant_cache
@@ -7,8 +7,112 @@ from pathlib import Path
 # Ajouter le répertoire parent au PATH pour les imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.scraper import scrape_pappers
-from src.generator import generate_nda
+# Seuls des modules légers sont importés ici : python-docx, requests et
+# PyYAML sont chargés par les commandes qui en ont besoin (--help et les
+# erreurs d'arguments restent instantanés, voir benchmarks/startup.py)
+from src.metrics import metrics
+
+
+def add_cache_arguments(subparser):
+    """Options d'utilisation du cache local des sociétés."""
+    group = subparser.add_mutually_exclusive_group()
+    group.add_argument(
+        '--refresh',
+        action='store_true',
+        help='Ignorer le cache local et réinterroger l\'API SIRENE'
+    )
+    group.add_argument(
+        '--offline',
+        action='store_true',
+        help='Ne pas appeler l\'API SIRENE (cache local et données de test uniquement)'
+    )
+
+
+def add_incremental_argument(subparser):
+    """Option de régénération incrémentale (stockage adressé par contenu)."""
+    subparser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Réutiliser les contrats déjà générés dont le template, la variante et les données '
+             'de la société n\'ont pas changé (voir output_store dans config/settings.yaml)'
+    )
+
+
+def add_pdf_argument(subparser):
+    """Option d'export PDF (LibreOffice headless, section pdf de config/settings.yaml)."""
+    subparser.add_argument(
+        '--pdf',
+        action='store_true',
+        default=None,
+        help='Convertir aussi les contrats en PDF (défaut si defaults.output_format vaut "pdf")'
+    )
+
+
+def add_defer_argument(subparser):
+    """Option de mise en attente des sociétés introuvables (sans saisie interactive)."""
+    subparser.add_argument(
+        '--defer',
+        action='store_true',
+        help='Mettre en attente les contrats dont la société est introuvable au lieu de demander '
+             'une saisie ; les terminer ensuite avec "resume --manual donnees.csv"'
+    )
+
+
+def add_contract_arguments(subparser):
+    """
+    Options de génération communes aux types de contrats (nda, contract).
+
+    Les variantes (--type) ne sont pas des choices argparse : elles viennent
+    du config.yaml du template et sont vérifiées par select_variants.
+    """
+    subparser.add_argument(
+        '--party',
+        action='append',
+        required=True,
+        help='URL Pappers, SIREN ou raison sociale de la société partenaire (Partie 2). Peut être spécifié '
+             'plusieurs fois (un contrat par société). La partie 1 (partie_fixe du template) est ignorée.'
+    )
+    subparser.add_argument(
+        '--commune',
+        help='Commune du siège, pour départager les homonymes quand --party est une raison sociale'
+    )
+    subparser.add_argument(
+        '--type',
+        action='append',
+        help='Variante (défaut: la première du template, master pour un NDA). Peut être spécifié '
+             'plusieurs fois ; "all" pour toutes les variantes.'
+    )
+    subparser.add_argument(
+        '--output',
+        default='output',
+        help='Répertoire de sortie (défaut: output/)'
+    )
+    subparser.add_argument(
+        '--zip',
+        help='Regrouper tous les contrats générés dans cette archive ZIP'
+    )
+    add_incremental_argument(subparser)
+    add_pdf_argument(subparser)
+    add_defer_argument(subparser)
+    add_cache_arguments(subparser)
+    add_metrics_arguments(subparser)
+
+
+def add_metrics_arguments(subparser):
+    """Options d'instrumentation (temps par étape, compteurs)."""
+    subparser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Afficher le temps passé par étape et les compteurs à la fin'
+    )
+    subparser.add_argument(
+        '--metrics-out',
+        help='Écrire les métriques dans ce fichier (format Prometheus si .prom, JSON sinon)'
+    )
+    subparser.add_argument(
+        '--metrics-log',
+        help='Journal JSON structuré des étapes (JSONL, une ligne par étape)'
+    )
 
 
 def main():
@@ -18,17 +122,46 @@ def main():
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Exemples:
-  # Générer un NDA master entre deux sociétés
+  # Générer un NDA master entre FR Digital (partie 1, fixe) et un partenaire
   python -m src.cli nda \\
-    --party "https://www.pappers.fr/entreprise/fr-digital-901995308" \\
     --party "https://www.pappers.fr/entreprise/nexans-393525852" \\
     --type master
 
   # Avec SIREN direct
-  python -m src.cli nda --party "901995308" --party "393525852" --type master
+  python -m src.cli nda --party "393525852" --type master
 
   # NDA dev plateforme
   python -m src.cli nda --party "393525852" --type dev_plateforme
+
+  # Toutes les variantes pour deux partenaires, dans une archive
+  python -m src.cli nda --party "393525852" --party "552100554" --type all --zip ndas.zip
+
+  # Autre type de contrat déclaré dans templates/<type>/config.yaml (ex. msa)
+  python -m src.cli contract msa --party "393525852" --type all
+
+  # Génération en lot (CSV avec colonnes party,type et, si besoin, contract)
+  python -m src.cli batch --input partenaires.csv --workers 8
+  python -m src.cli batch --input clients.csv --contract msa
+
+  # Lot sans interruption : sociétés introuvables mises en attente
+  python -m src.cli batch --input partenaires.csv --defer
+  python -m src.cli resume --template a_completer.csv
+  python -m src.cli resume --manual a_completer.csv
+
+  # Gros lot en file persistante : reprise après arrêt, avancement, reprise des échecs
+  python -m src.cli jobs submit --input partenaires.csv --run
+  python -m src.cli jobs status
+  python -m src.cli jobs retry
+
+  # Index local du fichier stock SIRENE (résolution sans clé API)
+  python -m src.cli stock-import --input StockUniteLegale_utf8.zip
+
+  # Recherche d'une société par son nom (fautes de frappe tolérées)
+  python -m src.cli search "nexans" --commune Courbevoie
+  python -m src.cli nda --party "Nexans" --type master
+
+  # Serveur HTTP (POST /nda {"siren": "...", "variant": "master"} -> DOCX)
+  python -m src.cli serve --port 8080 --workers 4
         """
     )
 
@@ -37,23 +170,170 @@ Exemples:
 
     # Commande NDA
     nda_parser = subparsers.add_parser('nda', help='Générer un accord de confidentialité')
-    nda_parser.add_argument(
-        '--party',
-        action='append',
+    add_contract_arguments(nda_parser)
+    nda_parser.set_defaults(template='nda')
+
+    # Commande contract : tout type de contrat déclaré dans templates/<nom>/config.yaml
+    contract_parser = subparsers.add_parser(
+        'contract', help='Générer un contrat d\'un autre type (templates/<type>/config.yaml)')
+    contract_parser.add_argument(
+        'template',
+        help='Type de contrat : nom du répertoire du template (nda, msa, dpa...)'
+    )
+    add_contract_arguments(contract_parser)
+
+    # Commande batch
+    batch_parser = subparsers.add_parser('batch', help='Générer des contrats en lot depuis un CSV/JSONL')
+    batch_parser.add_argument(
+        '--input',
         required=True,
-        help='URL Pappers ou SIREN de la société partenaire (Partie 2). Peut être spécifié plusieurs fois.'
+        help='Fichier CSV (colonnes party/siren, type, contract) ou JSONL des sociétés partenaires'
+    )
+    batch_parser.add_argument(
+        '--contract',
+        default='nda',
+        help='Type de contrat pour les lignes sans colonne contract (défaut: nda)'
     )
-    nda_parser.add_argument(
+    batch_parser.add_argument(
         '--type',
-        default='master',
-        choices=['master', 'dev_plateforme', 'prestations'],
-        help='Type de NDA (défaut: master)'
+        help='Variante pour les lignes sans colonne type (défaut: la première du template, master pour un NDA)'
     )
-    nda_parser.add_argument(
+    batch_parser.add_argument(
         '--output',
         default='output',
         help='Répertoire de sortie (défaut: output/)'
     )
+    batch_parser.add_argument(
+        '--manifest',
+        help='Fichier JSONL des résultats (défaut: <output>/batch_manifest_<date>.jsonl)'
+    )
+    batch_parser.add_argument(
+        '--workers',
+        type=int,
+        help='Nombre de processus de génération (défaut: nombre de cœurs)'
+    )
+    add_incremental_argument(batch_parser)
+    add_pdf_argument(batch_parser)
+    add_defer_argument(batch_parser)
+    add_cache_arguments(batch_parser)
+    add_metrics_arguments(batch_parser)
+
+    # Commande resume
+    resume_parser = subparsers.add_parser('resume', help='Terminer les contrats mis en attente (--defer)')
+    resume_source = resume_parser.add_mutually_exclusive_group(required=True)
+    resume_source.add_argument(
+        '--manual',
+        help='CSV des données manuelles (siren;raison_sociale;forme_juridique;capital;adresse;'
+             'ville_rcs;representant_nom;representant_fonction)'
+    )
+    resume_source.add_argument(
+        '--template',
+        help='Écrire le CSV à compléter pour les sociétés en attente'
+    )
+    resume_parser.add_argument(
+        '--queue',
+        help='File d\'attente (défaut: pending.path dans config/settings.yaml)'
+    )
+    resume_parser.add_argument(
+        '--workers',
+        type=int,
+        help='Nombre de processus de génération (défaut: nombre de cœurs)'
+    )
+    add_incremental_argument(resume_parser)
+    add_pdf_argument(resume_parser)
+    add_metrics_arguments(resume_parser)
+
+    # Commande jobs (file de travaux persistante)
+    jobs_parser = subparsers.add_parser('jobs', help='File de travaux persistante pour les gros lots')
+    jobs_commands = jobs_parser.add_subparsers(dest='jobs_command', required=True)
+
+    jobs_submit = jobs_commands.add_parser('submit', help='Enregistrer un lot depuis un CSV/JSONL')
+    jobs_submit.add_argument('--input', required=True, help='Fichier CSV (colonnes party/siren, type, contract) ou JSONL')
+    jobs_submit.add_argument('--contract', default='nda',
+                             help='Type de contrat pour les lignes sans colonne contract (défaut: nda)')
+    jobs_submit.add_argument('--type', help='Variante pour les lignes sans colonne type (défaut: la première du template)')
+    jobs_submit.add_argument('--output', default='output', help='Répertoire de sortie (défaut: output/)')
+    jobs_submit.add_argument('--run', action='store_true', help='Exécuter le lot immédiatement')
+
+    jobs_run = jobs_commands.add_parser('run', help='Exécuter ou reprendre un lot')
+    jobs_retry = jobs_commands.add_parser('retry', help='Remettre en file et exécuter les travaux en échec')
+    jobs_retry.add_argument('--job', type=int, action='append', help='Travail à reprendre (répétable ; défaut: tous)')
+    jobs_status = jobs_commands.add_parser('status', help='Avancement d\'un lot')
+    jobs_status.add_argument('--jobs', action='store_true', help='Détail par travail')
+    jobs_status.add_argument('--json', action='store_true', help='Sortie JSON')
+
+    for command in (jobs_run, jobs_retry, jobs_status):
+        command.add_argument('run_id', nargs='?', type=int, help='Identifiant du lot (défaut: le plus récent)')
+    for command in (jobs_submit, jobs_run, jobs_retry):
+        add_cache_arguments(command)
+        add_metrics_arguments(command)
+
+    # Commande stock-import
+    stock_parser = subparsers.add_parser('stock-import', help='Construire l\'index local du fichier stock SIRENE')
+    stock_parser.add_argument(
+        '--input',
+        required=True,
+        help='Fichier StockUniteLegale de l\'INSEE (CSV ou zip)'
+    )
+    stock_parser.add_argument(
+        '--index',
+        help='Fichier SQLite de l\'index (défaut: stock.path dans config/settings.yaml)'
+    )
+
+    # Commande search
+    search_parser = subparsers.add_parser('search', help='Chercher une société par son nom (index local)')
+    search_parser.add_argument(
+        'name',
+        nargs='?',
+        help='Raison sociale, même approximative'
+    )
+    search_parser.add_argument(
+        '--commune',
+        help='Ne garder que les sociétés dont le siège est dans cette commune'
+    )
+    search_parser.add_argument(
+        '--limit',
+        type=int,
+        default=10,
+        help='Nombre maximal de résultats (défaut: 10)'
+    )
+    search_parser.add_argument(
+        '--rebuild',
+        action='store_true',
+        help='Reconstruire l\'index des noms (index stock SIRENE et cache des sociétés)'
+    )
+    search_parser.add_argument(
+        '--json',
+        action='store_true',
+        help='Résultats au format JSON'
+    )
+
+    # Commande serve
+    serve_parser = subparsers.add_parser('serve', help='Démarrer le serveur HTTP de génération')
+    serve_parser.add_argument(
+        '--host',
+        help='Adresse d\'écoute (défaut: server.host)'
+    )
+    serve_parser.add_argument(
+        '--port',
+        type=int,
+        help='Port d\'écoute (défaut: server.port)'
+    )
+    serve_parser.add_argument(
+        '--workers',
+        type=int,
+        help='Threads de rendu (défaut: server.workers)'
+    )
+    serve_parser.add_argument(
+        '--queue-size',
+        type=int,
+        help='Demandes en attente avant réponse 503 (défaut: server.queue_size)'
+    )
+    serve_parser.add_argument(
+        '--offline',
+        action='store_true',
+        help='Ne pas appeler l\'API SIRENE (cache, index stock et données de test uniquement)'
+    )
 
     args = parser.parse_args()
 
@@ -61,53 +341,158 @@ Exemples:
         parser.print_help()
         sys.exit(1)
 
-    # Traitement selon le type de contrat
-    if args.contract_type == 'nda':
-        handle_nda(args)
-    else:
-        print(f"❌ Type de contrat non supporté: {args.contract_type}")
-        sys.exit(1)
+    if getattr(args, 'metrics_log', None):
+        metrics.open_log(args.metrics_log)
+
+    try:
+        # Traitement selon le type de contrat
+        if args.contract_type in ('nda', 'contract'):
+            handle_contract(args)
+        elif args.contract_type == 'batch':
+            handle_batch(args)
+        elif args.contract_type == 'resume':
+            handle_resume(args)
+        elif args.contract_type == 'jobs':
+            handle_jobs(args)
+        elif args.contract_type == 'stock-import':
+            handle_stock_import(args)
+        elif args.contract_type == 'search':
+            handle_search(args)
+        elif args.contract_type == 'serve':
+            handle_serve(args)
+        else:
+            print(f"❌ Type de contrat non supporté: {args.contract_type}")
+            sys.exit(1)
+    finally:
+        # Exécuté aussi en cas d'échec (sys.exit) : c'est là que le profil est utile
+        report_metrics(args)
+
 
+def report_metrics(args):
+    """Affiche et/ou écrit les métriques demandées par --profile/--metrics-out."""
+    metrics.close_log()
+    if getattr(args, 'profile', False):
+        print()
+        print(metrics.format_report())
+    if getattr(args, 'metrics_out', None):
+        metrics.write(args.metrics_out)
+        print(f"📊 Métriques: {args.metrics_out}")
+
+
+def handle_contract(args):
+    """Traite la génération des contrats (nda, contract) : chaque partie x chaque variante demandée."""
+    from src.contract_engine import IncompleteSocieteError
+    from src.generator import (contract_label, contract_renderer, generate_contract_set, load_template_config,
+                               partie_fixe_siren, select_variants)
+    from src.output_store import get_output_store
+    from src.pdf_export import format_pdf_result, get_pdf_exporter, pdf_export_default
+    from src.pending import get_pending_queue
+    from src.scraper import AmbiguousNameError, SocieteNotFoundError, choose_match, extract_siren, scrape_pappers
 
-def handle_nda(args):
-    """Traite la génération d'un NDA."""
+    label = contract_label(args.template)
     print("=" * 70)
-    print("📋 GÉNÉRATEUR NDA")
+    print(f"📋 GÉNÉRATEUR {label}")
     print("=" * 70)
 
-    parties = []
+    # La partie fixe (partie 1) est déjà dans le template : un contrat bilatéral
+    # est généré pour chaque société partenaire (partie 2)
+    try:
+        variants = select_variants(args.template, args.type)
+        fixed_siren = partie_fixe_siren(args.template)
+        partie_fixe = load_template_config(args.template).get('partie_fixe') or {}
+    except ValueError as e:
+        print(f"\n❌ Erreur: {e}")
+        sys.exit(1)
 
-    # Note: Pour le NDA, on ne prend que la première partie (partie 2)
-    # FR Digital (partie 1) est hardcodé dans le template
-    if len(args.party) > 1:
-        print("ℹ️  Note: NDA bilatéral. Seule la première société sera utilisée comme Partie 2.")
-        print("   FR Digital est automatiquement Partie 1.\n")
+    if args.pdf and args.zip:
+        print("\n❌ Erreur: --pdf et --zip ne sont pas combinables (l'archive ne contient que les DOCX)")
+        sys.exit(1)
+    pdf = args.pdf if args.pdf is not None else (pdf_export_default() and not args.zip)
 
-    party_identifier = args.party[0]
+    try:
+        # LibreOffice absent : erreur avant toute résolution
+        exporter = get_pdf_exporter(on_result=lambda r: print(format_pdf_result(r))) if pdf else None
 
-    print(f"\n📥 Extraction des données de la Partie 2...")
-    print(f"   Identifiant: {party_identifier}\n")
+        # Chaque société n'est résolue qu'une fois, même citée sous plusieurs formes
+        parties, deferred = {}, {}
+        for party_identifier in args.party:
+            try:
+                siren = extract_siren(party_identifier, commune=args.commune)
+            except AmbiguousNameError as e:
+                if args.defer or not sys.stdin.isatty():
+                    raise
+                siren = choose_match(e)
+            if siren == fixed_siren:
+                # Partie 1 déjà dans le template : pas de contrat avec elle-même
+                print(f"\n⚠️  {party_identifier} est la partie 1 du {label} (partie_fixe) : ignoré, "
+                      f"--party n'attend que les sociétés partenaires")
+                continue
+            if siren in parties or siren in deferred:
+                continue
 
-    try:
-        # Scraper la société
-        partie2 = scrape_pappers(party_identifier)
+            print(f"\n📥 Extraction des données de la Partie 2...")
+            print(f"   Identifiant: {party_identifier}\n")
+            try:
+                partie2 = scrape_pappers(siren, refresh=args.refresh, offline=args.offline,
+                                         interactive=False if args.defer else None)
+                # Champ repris par une variante non renseigné (index stock, greffe inconnu) : refusé
+                for variant in variants:
+                    contract_renderer(args.template, variant).check_complete(partie2)
+                parties[siren] = partie2
+            except (SocieteNotFoundError, IncompleteSocieteError) as e:
+                if not args.defer:
+                    raise
+                # Les autres sociétés sont générées ; celle-ci attend des données manuelles
+                queue = get_pending_queue()
+                for variant in variants:
+                    queue.park(e.siren, party_identifier, variant, args.output, str(e), template=args.template)
+                deferred[siren] = party_identifier
+                print(f"⏸️  SIREN {siren} mis en attente ({queue.path})")
         print()
 
-        # Générer le NDA
-        output_file = generate_nda(
-            partie2=partie2,
-            variant=args.type,
-            output_dir=args.output
+        if not parties and not deferred:
+            print(f"❌ Aucun {label} généré : aucune société partenaire (partie 2) indiquée")
+            sys.exit(1)
+        if not parties:
+            print(f"⏸️  Aucun {label} généré : toutes les sociétés sont en attente")
+            print(f"   Compléter les données : python -m src.cli resume --template a_completer.csv")
+            return
+
+        # Générer les contrats (config, règles et templates chargés une seule fois)
+        output_files = generate_contract_set(
+            args.template,
+            parties=list(parties.values()),
+            variants=variants,
+            output_dir=args.output,
+            zip_path=args.zip,
+            store=get_output_store() if args.incremental else None
         )
 
+        pdf_files = []
+        if exporter:
+            print(f"\n📑 Conversion PDF de {len(output_files)} {label}...")
+            for result in exporter.convert(output_files):
+                if result['status'] != 'ok':
+                    raise RuntimeError(f"Conversion PDF échouée: {result['source']}: {result['error']}")
+                pdf_files.append(result['pdf'])
+
         print("\n" + "=" * 70)
         print("✅ GÉNÉRATION TERMINÉE")
         print("=" * 70)
-        print(f"📄 Fichier: {output_file}")
-        print(f"🎯 Type: NDA {args.type}")
+        if args.zip:
+            print(f"🗜️  Archive: {args.zip}")
+        for output_file in output_files:
+            print(f"📄 Fichier: {output_file}")
+        for pdf_file in pdf_files:
+            print(f"📑 PDF: {pdf_file}")
+        print(f"🎯 Type: {label} {', '.join(variants)}")
         print(f"👥 Parties:")
-        print(f"   - FR DIGITAL (Partie 1)")
-        print(f"   - {partie2.raison_sociale} (Partie 2)")
+        if partie_fixe.get('raison_sociale'):
+            print(f"   - {partie_fixe['raison_sociale']} (Partie 1)")
+        for partie2 in parties.values():
+            print(f"   - {partie2.raison_sociale} (Partie 2)")
+        for party_identifier in deferred.values():
+            print(f"   - {party_identifier} (Partie 2, en attente : python -m src.cli resume --manual ...)")
         print("=" * 70)
 
     except Exception as e:
@@ -115,5 +500,311 @@ def handle_nda(args):
         sys.exit(1)
 
 
+def handle_batch(args):
+    """Traite la génération d'un lot de contrats."""
+    from src.batch import read_batch_file, run_batch
+    from src.generator import select_variants
+    from src.pdf_export import PdfExportError, pdf_export_default
+    from src.pending import get_pending_queue
+
+    print("=" * 70)
+    print("📋 GÉNÉRATEUR DE CONTRATS - MODE BATCH")
+    print("=" * 70)
+
+    try:
+        if args.type:
+            select_variants(args.contract, [args.type])
+        rows = read_batch_file(args.input, default_variant=args.type, default_template=args.contract)
+    except Exception as e:
+        print(f"\n❌ Erreur: {e}")
+        sys.exit(1)
+
+    print(f"\n📥 {len(rows)} ligne(s) à traiter depuis {args.input}\n")
+
+    try:
+        summary = run_batch(
+            rows,
+            output_dir=args.output,
+            manifest_path=args.manifest,
+            workers=args.workers,
+            refresh=args.refresh,
+            offline=args.offline,
+            incremental=args.incremental,
+            pdf=args.pdf if args.pdf is not None else pdf_export_default(),
+            pending=get_pending_queue() if args.defer else None
+        )
+    except PdfExportError as e:
+        print(f"\n❌ Erreur: {e}")
+        sys.exit(1)
+
+    print_batch_summary(args, summary)
+    if summary['errors'] or summary.get('pdf', {}).get('errors'):
+        sys.exit(1)
+
+
+def print_batch_summary(args, summary):
+    """Résumé d'un lot (batch ou resume)."""
+    print("\n" + "=" * 70)
+    failed = summary['errors'] or summary.get('pdf', {}).get('errors')
+    print("⚠️  BATCH TERMINÉ AVEC ERREURS" if failed else "✅ BATCH TERMINÉ")
+    print("=" * 70)
+    print(f"📄 Générés: {summary['ok']}/{summary['total']}")
+    if args.incremental:
+        print(f"♻️  Réutilisés sans rendu: {summary['reused']}")
+    if summary['deferred']:
+        print(f"⏸️  En attente de données: {summary['deferred']} (python -m src.cli resume --template a_completer.csv)")
+    if summary['duplicates']:
+        print(f"🔁 Doublons (contrat déjà demandé par une autre ligne): {summary['duplicates']}")
+    if 'pdf' in summary:
+        pdf = summary['pdf']
+        print(f"📑 PDF: {pdf['ok']} converti(s), {pdf['errors']} erreur(s)"
+              + (f", ~{pdf['amortized_ms']:.0f} ms/document (amorti)" if pdf['amortized_ms'] is not None else ''))
+    print(f"❌ Erreurs: {summary['errors']}")
+    print(f"⏱️  Durée: {summary['duration_s']} s")
+    print(f"🧾 Manifest: {summary['manifest']}")
+    print("=" * 70)
+
+
+def handle_resume(args):
+    """Génère les contrats en attente à partir d'un CSV de données manuelles."""
+    import json
+    from src.batch import run_batch
+    from src.cache import get_company_cache
+    from src.pdf_export import PdfExportError, pdf_export_default
+    from src.pending import get_pending_queue, read_manual_data
+
+    queue = get_pending_queue(args.queue)
+    entries = queue.entries()
+    if not entries:
+        print(f"✅ Aucun contrat en attente ({queue.path})")
+        return
+
+    if args.template:
+        count = queue.write_template(args.template)
+        print(f"📝 {count} société(s) à compléter: {args.template}")
+        print(f"   Puis : python -m src.cli resume --manual {args.template}")
+        return
+
+    print("=" * 70)
+    print("📋 GÉNÉRATEUR DE CONTRATS - REPRISE DES CONTRATS EN ATTENTE")
+    print("=" * 70)
+
+    try:
+        societes, errors = read_manual_data(args.manual)
+    except (OSError, ValueError) as e:
+        print(f"\n❌ Erreur: {e}")
+        sys.exit(1)
+    for error in errors:
+        print(f"⚠️  {args.manual}: {error}")
+
+    ready = [entry for entry in entries if entry['siren'] in societes]
+    print(f"\n📥 {len(ready)}/{len(entries)} contrat(s) en attente avec des données manuelles\n")
+    if not ready:
+        return
+
+    # Données conservées pour les prochains contrats, comme une saisie interactive
+    cache = get_company_cache()
+    if cache:
+        for siren in dict.fromkeys(entry['siren'] for entry in ready):
+            cache.put(siren, societes[siren], source='manual', data_version='')
+
+    by_output: dict = {}
+    for entry in ready:
+        by_output.setdefault(entry['output_dir'], []).append(entry)
+
+    failed = False
+    for output_dir, group in by_output.items():
+        rows = [{'line': i, 'party': entry['party'], 'template': entry.get('template', 'nda'),
+                 'variant': entry['variant'], 'error': ''}
+                for i, entry in enumerate(group, start=1)]
+        try:
+            summary = run_batch(
+                rows,
+                output_dir=output_dir,
+                workers=args.workers,
+                offline=True,
+                incremental=args.incremental,
+                pdf=args.pdf if args.pdf is not None else pdf_export_default(),
+                known={entry['party']: societes[entry['siren']] for entry in group}
+            )
+        except PdfExportError as e:
+            print(f"\n❌ Erreur: {e}")
+            sys.exit(1)
+
+        # Seuls les contrats effectivement générés quittent la file (doublons d'un contrat généré compris)
+        with open(summary['manifest'], 'r', encoding='utf-8') as manifest:
+            results = [json.loads(line) for line in manifest]
+        generated = {result['line'] for result in results if result['status'] == 'ok'}
+        generated |= {result['line'] for result in results
+                      if result['status'] == 'duplicate' and result['duplicate_of'] in generated}
+        queue.remove([entry for i, entry in enumerate(group, start=1) if i in generated])
+
+        print_batch_summary(args, summary)
+        failed = failed or summary['errors'] or summary.get('pdf', {}).get('errors')
+
+    remaining = len(queue.entries())
+    if remaining:
+        print(f"⏸️  Toujours en attente: {remaining} contrat(s) ({queue.path})")
+    if failed:
+        sys.exit(1)
+
+
+def handle_jobs(args):
+    """File de travaux persistante : submit, run, retry, status."""
+    import json
+    from src.jobs import DONE, format_contract, format_duration, format_progress, get_job_runner, get_job_store
+
+    store = get_job_store()
+
+    if args.jobs_command == 'submit':
+        from src.batch import read_batch_file
+        from src.generator import select_variants
+
+        try:
+            if args.type:
+                select_variants(args.contract, [args.type])
+            rows = read_batch_file(args.input, default_variant=args.type, default_template=args.contract)
+        except Exception as e:
+            print(f"\n❌ Erreur: {e}")
+            sys.exit(1)
+        run_id = store.create_run(rows, args.output, source=args.input)
+        print(f"📥 Lot {run_id}: {len(rows)} travail(aux) enregistré(s) depuis {args.input}")
+        if not args.run:
+            print(f"   Exécuter : python -m src.cli jobs run {run_id}")
+            return
+    else:
+        run = store.get_run(args.run_id)
+        if run is None:
+            print(f"❌ Aucun lot {args.run_id if args.run_id is not None else 'enregistré'} ({store.path})")
+            sys.exit(1)
+        run_id = run['id']
+
+    if args.jobs_command == 'status':
+        progress = store.progress(run_id)
+        jobs = store.jobs(run_id) if args.jobs else []
+        if args.json:
+            print(json.dumps({'run_id': run_id, **progress, 'jobs': [
+                {k: v for k, v in job.items() if k != 'societe'} for job in jobs
+            ]}, ensure_ascii=False, indent=2))
+            return
+        print(f"📊 Lot {run_id}: {format_progress(progress)}")
+        for job in jobs:
+            detail = job['output'] if job['status'] == DONE else (job['error'] or '')
+            print(f"   #{job['id']:<6} ligne {job['line']:<5} {job['party']:<12} {format_contract(job):<15} "
+                  f"{job['status']:<10} {detail}")
+        return
+
+    if args.jobs_command == 'retry':
+        count = store.retry(run_id, args.job)
+        print(f"🔁 Lot {run_id}: {count} travail(aux) remis en file")
+        if not count:
+            return
+
+    def on_job(job, progress):
+        total = progress[DONE] + progress['failed'] + progress['remaining']
+        position = f"[{progress[DONE] + progress['failed']}/{total}]"
+        eta = f" (fin dans {format_duration(progress['eta_s'])})" if progress['eta_s'] else ""
+        if job['status'] == DONE:
+            print(f"✅ {position} #{job['id']} {job['party']} ({format_contract(job)}) → {job['output']}{eta}")
+        else:
+            print(f"❌ {position} #{job['id']} {job['party']} ({format_contract(job)}) "
+                  f"[{job['failed_stage']}]: {job['error']}{eta}")
+
+    print(f"🚀 Lot {run_id}: {format_progress(store.progress(run_id))}")
+    progress = get_job_runner(run_id, refresh=args.refresh, offline=args.offline, on_job=on_job).run()
+
+    print("\n" + "=" * 70)
+    print(f"{'⚠️ ' if progress['failed'] else '✅'} Lot {run_id}: {format_progress(progress)}")
+    print(f"⏱️  Durée: {progress['duration_s']} s")
+    if progress['failed']:
+        print(f"🔁 Reprendre les échecs : python -m src.cli jobs retry {run_id}")
+    print("=" * 70)
+    if progress['failed']:
+        sys.exit(1)
+
+
+def handle_stock_import(args):
+    """Construit l'index local du fichier stock SIRENE."""
+    import time
+    from src.settings import get_setting, resolve_path
+    from src.stock_index import build_stock_index
+
+    index_path = args.index or resolve_path(get_setting('stock', 'path', '.cache/stock_unite_legale.sqlite'))
+    print(f"📥 Import du fichier stock: {args.input}")
+    print(f"   Index: {index_path}")
+
+    start = time.perf_counter()
+    try:
+        count = build_stock_index(args.input, str(index_path))
+    except Exception as e:
+        print(f"\n❌ Erreur: {e}")
+        sys.exit(1)
+
+    print(f"✅ {count} unité(s) légale(s) indexée(s) en {time.perf_counter() - start:.1f} s")
+
+    if args.index or not get_setting('names', 'build_on_stock_import', True):
+        return
+    # Recherche par nom : l'index des noms repart du nouveau fichier stock
+    from src.name_index import rebuild_name_index
+
+    start = time.perf_counter()
+    count = rebuild_name_index()
+    print(f"📇 Index des noms: {count} raison(s) sociale(s) en {time.perf_counter() - start:.1f} s")
+
+
+def handle_search(args):
+    """Recherche une société par son nom dans l'index local."""
+    import json
+    import time
+    from src.name_index import rebuild_name_index, search_companies
+    from src.scraper import format_siren
+
+    if not args.name and not args.rebuild:
+        print("❌ Erreur: indiquer un nom à chercher (ou --rebuild)")
+        sys.exit(1)
+
+    if args.rebuild:
+        start = time.perf_counter()
+        count = rebuild_name_index()
+        print(f"📇 Index des noms: {count} raison(s) sociale(s) en {time.perf_counter() - start:.1f} s")
+        if not args.name:
+            return
+
+    matches = search_companies(args.name, commune=args.commune, limit=args.limit)
+    if args.json:
+        print(json.dumps([vars(match) for match in matches], ensure_ascii=False, indent=2))
+        return
+
+    where = f" à {args.commune}" if args.commune else ''
+    if not matches:
+        print(f"❌ Aucune société trouvée pour « {args.name} »{where}")
+        sys.exit(1)
+    print(f"🔎 {len(matches)} société(s) pour « {args.name} »{where} :")
+    for match in matches:
+        approx = f"  (~{match.distance} faute{'s' if match.distance > 1 else ''})" if match.distance else ''
+        print(f"   {format_siren(match.siren)}  {match.raison_sociale:<40} {match.commune or '-':<20} "
+              f"[{match.source}]{approx}")
+    print(f"   Générer : python -m src.cli nda --party {matches[0].siren}")
+
+
+def handle_serve(args):
+    """Démarre le serveur HTTP de génération."""
+    from src.server import serve
+    from src.settings import get_setting
+
+    def option(name: str, default):
+        value = getattr(args, name)
+        return value if value is not None else get_setting('server', name, default)
+
+    serve(
+        host=option('host', '127.0.0.1'),
+        port=option('port', 8080),
+        workers=option('workers', 4),
+        queue_size=option('queue_size', 16),
+        timeout=float(get_setting('server', 'timeout', 30)),
+        offline=args.offline
+    )
+
+
 if __name__ == "__main__":
     main()
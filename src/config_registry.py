@@ -0,0 +1,244 @@
+# Registre des configurations de templates (templates/*/config.yaml)
+
+import json
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .contract_engine import validate_rules
+from .settings import get_setting, resolve_path
+
+# Version du format du cache JSON (à incrémenter si sa structure change)
+CACHE_VERSION = 2
+
+# Code qui valide une configuration (règles, champs de Societe) : une
+# configuration en cache n'est reprise que si ce code n'a pas changé depuis
+VALIDATOR_MODULES = ('config_registry.py', 'contract_engine.py', 'models.py')
+
+
+@lru_cache(maxsize=1)
+def validator_version() -> str:
+    """Empreinte (taille, date de modification) des modules de validation."""
+    parts = []
+    for name in VALIDATOR_MODULES:
+        try:
+            stat = (Path(__file__).parent / name).stat()
+        except OSError:
+            # Modules livrés sans leurs sources : seul CACHE_VERSION fait foi
+            return ''
+        parts.append(f"{name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return ','.join(parts)
+
+
+class TemplateConfigError(ValueError):
+    """Configuration de template invalide ou introuvable."""
+
+
+def validate_template_config(config: Any, name: str) -> Dict[str, Any]:
+    """
+    Vérifie la structure d'une configuration de template.
+
+    Toutes les erreurs sont rassemblées dans une seule exception pour
+    corriger le fichier en une fois.
+
+    Raises:
+        TemplateConfigError: configuration non conforme
+    """
+    errors: List[str] = []
+
+    if not isinstance(config, dict):
+        raise TemplateConfigError(f"Configuration {name}: un dictionnaire YAML est attendu")
+
+    errors.extend(validate_rules(config))
+    formats = config.get('formats') if isinstance(config.get('formats'), dict) else {}
+
+    variants = config.get('variants')
+    if not isinstance(variants, dict) or not variants:
+        errors.append("variants: au moins une variante est requise")
+    else:
+        for variant, variant_config in variants.items():
+            if not isinstance(variant_config, dict):
+                errors.append(f"variants.{variant}: dictionnaire attendu")
+                continue
+            template = variant_config.get('template')
+            if not isinstance(template, str) or not template.lower().endswith('.docx'):
+                errors.append(f"variants.{variant}.template: nom de fichier .docx attendu")
+            format_partie2 = variant_config.get('format_partie2')
+            if format_partie2 is not None and format_partie2 not in formats:
+                errors.append(f"variants.{variant}.format_partie2: '{format_partie2}' "
+                              f"(formats déclarés: {', '.join(map(str, formats)) or 'aucun'})")
+            if not isinstance(variant_config.get('defaults', {}), dict):
+                errors.append(f"variants.{variant}.defaults: dictionnaire attendu")
+
+    placeholders = config.get('placeholders', [])
+    if not isinstance(placeholders, list) or not all(isinstance(p, str) and p for p in placeholders):
+        errors.append("placeholders: liste de chaînes non vides attendue")
+
+    output = config.get('output', {})
+    if not isinstance(output, dict):
+        errors.append("output: dictionnaire attendu")
+    else:
+        naming = output.get('naming')
+        if naming is not None and (not isinstance(naming, str) or not naming.endswith('.docx')):
+            errors.append("output.naming: modèle de nom de fichier .docx attendu")
+        if naming is not None and '{{TYPE}}' not in str(naming):
+            errors.append("output.naming: {{TYPE}} requis (sinon les variantes s'écrasent)")
+        if not isinstance(output.get('date_format', ''), str):
+            errors.append("output.date_format: chaîne strftime attendue")
+
+    if errors:
+        raise TemplateConfigError(f"Configuration {name} invalide:\n  - " + "\n  - ".join(errors))
+    return config
+
+
+class ConfigRegistry:
+    """
+    Configurations de templates chargées une fois par processus.
+
+    Chaque config.yaml est lu, validé puis gardé en mémoire ; il est relu
+    seulement si sa date de modification ou sa taille change. Les chemins
+    sont résolus depuis la racine du projet (paths.templates), pas depuis
+    le répertoire courant.
+
+    Si cache_dir est fourni, la configuration validée est aussi écrite en
+    JSON : un nouveau processus la relit sans reparser ni revalider le YAML,
+    tant que le YAML et le code des validateurs (validator_version) n'ont
+    pas changé.
+    """
+
+    def __init__(self, templates_dir: Path, cache_dir: Optional[Path] = None):
+        self.templates_dir = Path(templates_dir)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._configs: Dict[str, Tuple[Tuple[float, int], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def config_path(self, name: str) -> Path:
+        return self.templates_dir / name / "config.yaml"
+
+    def template_path(self, name: str, template_file: str) -> Path:
+        """Chemin d'un fichier DOCX de template (templates/<nom>/examples/)."""
+        return self.templates_dir / name / "examples" / template_file
+
+    def names(self) -> List[str]:
+        """Templates disposant d'un config.yaml."""
+        if not self.templates_dir.is_dir():
+            return []
+        return sorted(p.parent.name for p in self.templates_dir.glob("*/config.yaml"))
+
+    def get(self, name: str) -> Dict[str, Any]:
+        """
+        Configuration validée d'un template.
+
+        Le dictionnaire retourné est partagé : ne pas le modifier.
+
+        Raises:
+            FileNotFoundError: config.yaml absent
+            TemplateConfigError: configuration invalide
+        """
+        path = self.config_path(name)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Configuration template introuvable: {path}") from None
+        signature = (stat.st_mtime, stat.st_size)
+
+        with self._lock:
+            cached = self._configs.get(name)
+            if cached and cached[0] == signature:
+                return cached[1]
+
+            config = self._read_cache(name, signature)
+            if config is None:
+                config = validate_template_config(self._load_yaml(path), name)
+                self._write_cache(name, signature, config)
+            self._configs[name] = (signature, config)
+            return config
+
+    def load_all(self) -> Dict[str, Dict[str, Any]]:
+        """Charge et valide toutes les configurations (préchauffage, vérification)."""
+        return {name: self.get(name) for name in self.names()}
+
+    def clear(self):
+        with self._lock:
+            self._configs.clear()
+
+    @staticmethod
+    def _load_yaml(path: Path) -> Any:
+        import yaml
+
+        with open(path, 'r', encoding='utf-8') as f:
+            try:
+                return yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise TemplateConfigError(f"YAML invalide dans {path}: {e}") from e
+
+    def _cache_file(self, name: str) -> Optional[Path]:
+        return self.cache_dir / f"{name}.json" if self.cache_dir else None
+
+    def _read_cache(self, name: str, signature: Tuple[float, int]) -> Optional[Dict[str, Any]]:
+        cache_file = self._cache_file(name)
+        if cache_file is None or not cache_file.exists():
+            return None
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (cached.get('version') != CACHE_VERSION or cached.get('validator') != validator_version()
+                or tuple(cached.get('source', ())) != signature):
+            return None
+        return cached['config']
+
+    def _write_cache(self, name: str, signature: Tuple[float, int], config: Dict[str, Any]):
+        cache_file = self._cache_file(name)
+        if cache_file is None:
+            return
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'version': CACHE_VERSION, 'validator': validator_version(),
+                           'source': list(signature), 'config': config},
+                          f, ensure_ascii=False)
+            os.replace(tmp_file, cache_file)
+        except (OSError, TypeError, ValueError):
+            # Cache facultatif : une config non sérialisable en JSON reste servie depuis le YAML
+            pass
+
+
+_registry: Optional[ConfigRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_config_registry() -> ConfigRegistry:
+    """Registre partagé configuré dans config/settings.yaml (paths.templates, templates.config_cache)."""
+    global _registry
+
+    with _registry_lock:
+        if _registry is None:
+            cache_dir = None
+            if get_setting('templates', 'config_cache', True):
+                cache_dir = resolve_path(get_setting('templates', 'config_cache_dir', '.cache/template_configs'))
+            _registry = ConfigRegistry(
+                templates_dir=resolve_path(get_setting('paths', 'templates', 'templates')),
+                cache_dir=cache_dir,
+            )
+        return _registry
+
+
+if __name__ == "__main__":
+    # Vérifie toutes les configurations de templates
+    import sys
+
+    registry = get_config_registry()
+    failed = False
+    for template_name in registry.names():
+        try:
+            config = registry.get(template_name)
+            print(f"✅ {template_name}: {len(config['variants'])} variante(s)")
+        except TemplateConfigError as e:
+            failed = True
+            print(f"❌ {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,268 @@
+# Moteur de contrats générique : remplacements déclarés dans templates/<nom>/config.yaml
+
+import string
+from dataclasses import fields
+from itertools import chain
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .lookups import NON_RENSEIGNE
+from .metrics import metrics
+from .models import Societe
+from .replacer import ReplacementEngine
+
+# Champs de la partie 2 utilisables dans une valeur : {champ} ou {champ|filtre|...}
+FIELDS = tuple(f.name for f in fields(Societe))
+
+FILTERS: Dict[str, Callable[[str], str]] = {
+    'lower': str.lower,
+    'upper': str.upper,
+    'title': str.title,
+    'strip': str.strip,
+    'compact': lambda value: value.replace(' ', ''),
+}
+
+class IncompleteSocieteError(ValueError):
+    """Champ repris par la variante non renseigné : contrat refusé (à mettre en attente avec --defer)."""
+
+    def __init__(self, siren: str, missing: List[str], message: str):
+        super().__init__(message)
+        self.siren = siren
+        self.missing = missing
+
+
+# Valeur compilée : texte fixe ou (champ, filtres)
+ValuePart = Union[str, Tuple[str, Tuple[Callable[[str], str], ...]]]
+
+
+def compile_value(template: str) -> Tuple[ValuePart, ...]:
+    """
+    Compile une valeur de remplacement : texte fixe et champs de la partie 2.
+
+    "{raison_sociale}, {forme_juridique|lower}" ; accolades littérales
+    doublées ({{ et }}).
+
+    Raises:
+        ValueError: champ ou filtre inconnu, accolades mal formées
+    """
+    parts: List[ValuePart] = []
+    for literal, field, format_spec, conversion in string.Formatter().parse(template):
+        if literal:
+            parts.append(literal)
+        if field is None:
+            continue
+        if format_spec or conversion:
+            raise ValueError(f"{{{field}}}: format et conversion non pris en charge, utiliser un filtre "
+                             f"({', '.join(FILTERS)})")
+        name, *filters = (part.strip() for part in field.split('|'))
+        if name not in FIELDS:
+            raise ValueError(f"{{{field}}}: champ inconnu (champs: {', '.join(FIELDS)})")
+        unknown = [f for f in filters if f not in FILTERS]
+        if unknown:
+            raise ValueError(f"{{{field}}}: filtre(s) inconnu(s) {', '.join(unknown)} "
+                             f"(filtres: {', '.join(FILTERS)})")
+        parts.append((name, tuple(FILTERS[f] for f in filters)))
+    return tuple(parts)
+
+
+def render_value(parts: Tuple[ValuePart, ...], partie2: Societe) -> str:
+    """Valeur compilée appliquée aux données d'une société."""
+    pieces = []
+    for part in parts:
+        if type(part) is str:
+            pieces.append(part)
+            continue
+        name, filters = part
+        value = str(getattr(partie2, name))
+        for apply_filter in filters:
+            value = apply_filter(value)
+        pieces.append(value)
+    return ''.join(pieces)
+
+
+class ReplacementTable:
+    """
+    Table placeholder -> valeur déclarée, compilée une fois.
+
+    Le motif regex ne dépend que des placeholders : il est construit à la
+    compilation et partagé par tous les rendus, seules les valeurs sont
+    calculées pour chaque société (ReplacementEngine.bind).
+    """
+
+    def __init__(self, replacements: Dict[str, str]):
+        self.values = tuple((placeholder, compile_value(value)) for placeholder, value in replacements.items())
+        # Champs de la société repris dans les valeurs
+        self.fields = tuple(dict.fromkeys(part[0] for _, parts in self.values for part in parts
+                                          if type(part) is not str))
+        self.engine = ReplacementEngine({placeholder: '' for placeholder, _ in self.values})
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def resolve(self, partie2: Societe) -> Dict[str, str]:
+        """Remplacements pour une société (même ordre de priorité que la configuration)."""
+        return {placeholder: render_value(parts, partie2) for placeholder, parts in self.values}
+
+    def bind(self, partie2: Societe) -> ReplacementEngine:
+        return self.engine.bind(self.resolve(partie2))
+
+
+def validate_rules(config: Dict[str, Any]) -> List[str]:
+    """
+    Vérifie les règles de remplacement d'une configuration (formats, tables).
+
+    Returns:
+        Erreurs, au format de validate_template_config
+    """
+    errors: List[str] = []
+
+    def check_table(location: str, replacements: Any):
+        if not isinstance(replacements, dict) or not replacements:
+            errors.append(f"{location}: dictionnaire placeholder -> valeur attendu")
+            return
+        for placeholder, value in replacements.items():
+            if not isinstance(placeholder, str) or not placeholder:
+                errors.append(f"{location}: placeholder vide")
+            elif not isinstance(value, str):
+                errors.append(f"{location}.{placeholder}: chaîne attendue")
+            else:
+                try:
+                    compile_value(value)
+                except ValueError as e:
+                    errors.append(f"{location}.{placeholder}: {e}")
+
+    formats = config.get('formats', {})
+    if not isinstance(formats, dict):
+        errors.append("formats: dictionnaire attendu")
+    else:
+        for name, replacements in formats.items():
+            check_table(f"formats.{name}", replacements)
+
+    tables = config.get('tables', [])
+    if not isinstance(tables, list):
+        errors.append("tables: liste de règles attendue")
+    else:
+        for i, rule in enumerate(tables):
+            if not isinstance(rule, dict):
+                errors.append(f"tables[{i}]: dictionnaire attendu")
+                continue
+            markers = rule.get('markers')
+            if not isinstance(markers, list) or not markers or not all(isinstance(m, str) and m for m in markers):
+                errors.append(f"tables[{i}].markers: liste de chaînes non vides attendue")
+            column = rule.get('column')
+            if column is not None and (type(column) is not int or column < 0):
+                errors.append(f"tables[{i}].column: index de colonne (entier >= 0) attendu")
+            check_table(f"tables[{i}].replacements", rule.get('replacements'))
+
+    return errors
+
+
+def variant_format(config: Dict[str, Any], variant_config: Dict[str, Any]) -> Optional[str]:
+    """Format de désignation de la partie 2 d'une variante (défaut : le premier format déclaré)."""
+    return variant_config.get('format_partie2') or next(iter(config.get('formats') or {}), None)
+
+
+class ContractRenderer:
+    """
+    Règles d'une variante de contrat compilées une fois.
+
+    Un rendu applique au template (mis en cache par template_cache ou
+    fast_render) la table du format de la partie 2 en une seule passe,
+    puis chaque règle de tableau aux cellules contenant un de ses
+    marqueurs (dans sa colonne si elle en déclare une). Aucun code propre au type de contrat : tout vient du
+    config.yaml du template.
+    """
+
+    def __init__(self, family: str, variant: str, config: Dict[str, Any], template_path: Path):
+        variant_config = config['variants'][variant]
+        self.family = family
+        self.variant = variant
+        self.template_path = Path(template_path)
+        self.format = variant_format(config, variant_config)
+        self.replacements = ReplacementTable((config.get('formats') or {}).get(self.format) or {})
+        self.tables = [(tuple(rule['markers']), rule.get('column'), ReplacementTable(rule['replacements']))
+                       for rule in config.get('tables') or []]
+        self.placeholders = tuple(config.get('placeholders') or ())
+        self.fields = tuple(dict.fromkeys(chain(self.replacements.fields,
+                                                *(table.fields for _, _, table in self.tables))))
+        self._checked: set = set()
+
+    def missing_fields(self, partie2: Societe) -> List[str]:
+        """
+        Champs repris par la variante mais non renseignés : fiche de l'index
+        stock (ni adresse ni capital), greffe inconnu pour la commune...
+        """
+        return [name for name in self.fields if getattr(partie2, name) == NON_RENSEIGNE]
+
+    def check_complete(self, partie2: Societe):
+        """
+        Refuse une société dont un champ repris par la variante n'est pas
+        renseigné, plutôt que d'écrire « Non renseigné » dans le contrat.
+
+        Raises:
+            IncompleteSocieteError: champs manquants
+        """
+        missing = self.missing_fields(partie2)
+        if missing:
+            raise IncompleteSocieteError(
+                partie2.siren.replace(' ', ''), missing,
+                f"{partie2}: {', '.join(missing)} non renseigné(s), requis par {self.family} {self.variant} "
+                f"(données à compléter : --defer puis resume --manual)")
+
+    def fill(self, rendering, partie2: Societe):
+        """Applique les remplacements à un rendu en cours (TemplateRendering ou FastRendering)."""
+        rendering.replace(self.replacements.bind(partie2))
+        for markers, column, table in self.tables:
+            rendering.replace_in_cells(markers, table.bind(partie2), column)
+        return rendering
+
+    def render(self, partie2: Societe, engine: str = "docx"):
+        """
+        Rendu rempli, non sauvegardé.
+
+        Args:
+            engine: "docx" (python-docx, référence) ou "fast" (réécriture
+                directe de word/document.xml)
+
+        Raises:
+            IncompleteSocieteError: champ repris par la variante non renseigné
+        """
+        self.check_complete(partie2)
+        # python-docx et lxml ne sont chargés qu'au premier rendu
+        if engine == "fast":
+            from .fast_render import get_fast_template
+            template = get_fast_template(self.template_path)
+        else:
+            from .template_cache import get_compiled_template
+            template = get_compiled_template(self.template_path)
+
+        if engine not in self._checked:
+            self._checked.add(engine)
+            self.check_placeholders(template._paragraph_texts)
+        return self.fill(template.render(), partie2)
+
+    def uncovered(self, paragraph_texts: List[str]) -> List[Tuple[str, str]]:
+        """
+        Placeholders déclarés (placeholders) qu'aucune règle ne remplace.
+
+        Returns:
+            [(placeholder, texte du paragraphe)]
+        """
+        if not self.placeholders:
+            return []
+        engines = [self.replacements.engine, *(table.engine for _, _, table in self.tables)]
+        found = []
+        for text in paragraph_texts:
+            for engine in engines:
+                if engine.pattern is not None:
+                    text = engine.pattern.sub('', text)
+            placeholder = next((p for p in self.placeholders if p in text), None)
+            if placeholder:
+                found.append((placeholder, text.strip()))
+        return found
+
+    def check_placeholders(self, paragraph_texts: List[str]):
+        """Signale une fois par template les placeholders qui resteraient dans le contrat."""
+        for placeholder, text in self.uncovered(paragraph_texts):
+            metrics.incr('placeholders_uncovered_total', template=self.family, variant=self.variant)
+            print(f"⚠️  {self.family}/{self.variant}: placeholder {placeholder} non remplacé : « {text[:80]} »")
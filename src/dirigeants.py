@@ -0,0 +1,282 @@
+# Résolution des représentants légaux (dirigeants) : fournisseurs interchangeables + cache
+
+import csv
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .cache import HIT, NEGATIVE, DirigeantCache, get_dirigeant_cache
+from .metrics import metrics
+from .models import Dirigeant
+from .settings import get_setting, resolve_path
+
+# Qualités retenues comme signataire, par ordre de préférence (comparaison sans casse)
+QUALITES_SIGNATAIRES = (
+    'président-directeur général',
+    'président',
+    'directeur général',
+    'président du directoire',
+    'gérant',
+    'co-gérant',
+    'directeur général délégué',
+)
+
+
+def choose_representant(representants: Iterable[Tuple[str, str]]) -> Optional[Dirigeant]:
+    """
+    Signataire parmi les représentants (nom, qualité) d'une société.
+
+    Le premier représentant de la qualité la mieux classée est retenu ;
+    à défaut de qualité connue, le premier de la liste.
+    """
+    best, best_rank = None, None
+    for nom, qualite in representants:
+        nom, qualite = (nom or '').strip(), (qualite or '').strip()
+        if not nom:
+            continue
+        try:
+            rank = QUALITES_SIGNATAIRES.index(qualite.lower())
+        except ValueError:
+            rank = len(QUALITES_SIGNATAIRES)
+        if best_rank is None or rank < best_rank:
+            best, best_rank = Dirigeant(nom=nom, fonction=qualite or "Représentant légal"), rank
+    return best
+
+
+class DirigeantProvider(ABC):
+    """
+    Source de représentants légaux.
+
+    Une sous-classe implémente fetch ; `remote` indique un appel réseau
+    (le fournisseur n'est alors pas interrogé en mode hors ligne).
+    """
+
+    name = 'provider'
+    remote = False
+
+    @abstractmethod
+    def fetch(self, siren: str) -> Tuple[Optional[Dirigeant], Optional[int]]:
+        """
+        Returns:
+            (Dirigeant ou None, 200 si trouvé, 404 si inconnu, autre code
+            ou None en cas d'erreur : non mémorisé dans le cache)
+        """
+
+
+class PappersProvider(DirigeantProvider):
+    """API Pappers v2 (GET /entreprise) : section representants de la fiche."""
+
+    name = 'pappers'
+    remote = True
+
+    def __init__(self, base_url: str, api_key: str, timeout: float = 10, pool_size: int = 8):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._session = None
+        self._lock = threading.Lock()
+
+    def _get_session(self):
+        # requests n'est importé qu'au premier appel (démarrage du CLI)
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update({'Accept': 'application/json', 'User-Agent': 'Contract-Generator/1.0'})
+                self._session = session
+            return self._session
+
+    @staticmethod
+    def parse_entreprise(data: Dict[str, Any]) -> Optional[Dirigeant]:
+        """Signataire d'une fiche entreprise Pappers (représentants actuels uniquement)."""
+        representants = [r for r in data.get('representants') or [] if r.get('actuel', True)]
+        return choose_representant(
+            (r.get('denomination') if r.get('personne_morale') else r.get('nom_complet'), r.get('qualite'))
+            for r in representants
+        )
+
+    def fetch(self, siren: str) -> Tuple[Optional[Dirigeant], Optional[int]]:
+        import requests
+
+        try:
+            with metrics.timer('pappers_api'):
+                response = self._get_session().get(
+                    f"{self.base_url}/entreprise",
+                    params={'siren': siren, 'api_token': self.api_key},
+                    timeout=self.timeout,
+                )
+            metrics.incr('pappers_http_responses_total', status=response.status_code)
+            if response.status_code != 200:
+                return None, response.status_code
+            dirigeant = self.parse_entreprise(response.json())
+        except requests.exceptions.RequestException:
+            metrics.incr('pappers_http_errors_total')
+            return None, None
+        except (KeyError, ValueError, TypeError, AttributeError):
+            return None, None
+        return (dirigeant, 200) if dirigeant else (None, 404)
+
+
+class LocalDumpProvider(DirigeantProvider):
+    """
+    Extrait local des dirigeants (RNE, BODACC...) : CSV avec une ligne par
+    représentant et les colonnes siren, nom (ou nom_complet, denomination)
+    et fonction (ou qualite), séparées par « ; » ou « , ».
+
+    Le fichier est chargé une fois en mémoire, au premier appel. Un
+    fichier absent ou illisible est signalé une fois puis traité comme une
+    source indisponible : aucun représentant, rien n'est mémorisé dans le
+    cache.
+    """
+
+    name = 'local'
+    remote = False
+
+    NOM_COLUMNS = ('nom', 'nom_complet', 'denomination')
+    FONCTION_COLUMNS = ('fonction', 'qualite')
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._index: Optional[Dict[str, Dirigeant]] = None
+        self._error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dirigeant]:
+        with open(self.path, 'r', encoding='utf-8', newline='') as f:
+            header = f.readline()
+            f.seek(0)
+            reader = csv.DictReader(f, delimiter=';' if ';' in header else ',')
+            fields = reader.fieldnames or []
+            nom_column = next((c for c in self.NOM_COLUMNS if c in fields), None)
+            fonction_column = next((c for c in self.FONCTION_COLUMNS if c in fields), None)
+            if 'siren' not in fields or nom_column is None:
+                raise ValueError(f"{self.path}: colonnes siren et nom (ou nom_complet) requises")
+
+            by_siren: Dict[str, List[Tuple[str, str]]] = {}
+            for row in reader:
+                siren = (row.get('siren') or '').replace(' ', '')
+                if siren:
+                    by_siren.setdefault(siren, []).append(
+                        (row.get(nom_column), row.get(fonction_column) if fonction_column else ''))
+
+        index = {}
+        for siren, representants in by_siren.items():
+            dirigeant = choose_representant(representants)
+            if dirigeant:
+                index[siren] = dirigeant
+        return index
+
+    def fetch(self, siren: str) -> Tuple[Optional[Dirigeant], Optional[int]]:
+        with self._lock:
+            if self._index is None and self._error is None:
+                try:
+                    self._index = self._load()
+                except (OSError, ValueError, csv.Error) as e:
+                    self._error = str(e)
+                    print(f"⚠️  Extrait des dirigeants inutilisable, représentants non renseignés: {e}")
+        if self._index is None:
+            return None, None
+        dirigeant = self._index.get(siren)
+        return (dirigeant, 200) if dirigeant else (None, 404)
+
+
+class DirigeantResolver:
+    """
+    Étape de résolution des représentants : cache dédié puis fournisseur.
+
+    Les recherches tournent sur un pool de threads (submit) : l'appelant
+    lance la recherche du dirigeant en même temps que celle de la fiche
+    SIRENE et récupère les deux résultats après un seul aller-retour.
+    """
+
+    def __init__(self, provider: DirigeantProvider, cache: Optional[DirigeantCache] = None, workers: int = 8):
+        self.provider = provider
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='dirigeants')
+
+    def get(self, siren: str, refresh: bool = False, offline: bool = False) -> Optional[Dirigeant]:
+        """Représentant d'une société, None s'il est inconnu ou si la source est indisponible."""
+        if self.cache and not refresh:
+            status, dirigeant = self.cache.get(siren)
+            if status == HIT:
+                return dirigeant
+            if status == NEGATIVE:
+                return None
+
+        if offline and self.provider.remote:
+            return None
+
+        with metrics.timer('dirigeant_lookup'):
+            dirigeant, status_code = self.provider.fetch(siren)
+        metrics.incr('dirigeant_lookups_total', provider=self.provider.name,
+                     result='found' if dirigeant else status_code or 'error')
+
+        if self.cache:
+            if dirigeant:
+                self.cache.put(siren, dirigeant, source=self.provider.name)
+            elif status_code == 404:
+                self.cache.put_not_found(siren, source=self.provider.name)
+        return dirigeant
+
+    def submit(self, siren: str, refresh: bool = False, offline: bool = False) -> "Future[Optional[Dirigeant]]":
+        """Lance la recherche en arrière-plan."""
+        return self._executor.submit(self.get, siren, refresh, offline)
+
+    def submit_many(self, sirens: Iterable[str], refresh: bool = False,
+                    offline: bool = False) -> Dict[str, "Future[Optional[Dirigeant]]"]:
+        return {siren: self.submit(siren, refresh, offline) for siren in dict.fromkeys(sirens)}
+
+
+def get_provider(name: str) -> Optional[DirigeantProvider]:
+    """
+    Fournisseur configuré (dirigeants.provider) : pappers, local, ou auto
+    (Pappers si pappers.api_key est renseignée, sinon l'extrait local s'il
+    est configuré). None si aucun n'est disponible.
+
+    Raises:
+        ValueError: fournisseur inconnu ou incomplet
+    """
+    api_key = get_setting('pappers', 'api_key')
+    local_path = get_setting('dirigeants', 'local_path')
+
+    if name == 'auto':
+        name = 'pappers' if api_key else 'local' if local_path else ''
+    if not name:
+        return None
+
+    if name == 'pappers':
+        if not api_key:
+            raise ValueError("dirigeants.provider: pappers requiert pappers.api_key")
+        return PappersProvider(
+            base_url=get_setting('pappers', 'base_url', 'https://api.pappers.fr/v2'),
+            api_key=api_key,
+            timeout=float(get_setting('dirigeants', 'timeout', 10)),
+            pool_size=int(get_setting('dirigeants', 'workers', 8)),
+        )
+    if name == 'local':
+        if not local_path:
+            raise ValueError("dirigeants.provider: local requiert dirigeants.local_path")
+        return LocalDumpProvider(resolve_path(local_path))
+    raise ValueError(f"dirigeants.provider inconnu: {name} (pappers, local, auto)")
+
+
+@lru_cache(maxsize=1)
+def get_dirigeant_resolver() -> Optional[DirigeantResolver]:
+    """Résolveur partagé configuré dans config/settings.yaml (None sans fournisseur)."""
+    provider = get_provider(str(get_setting('dirigeants', 'provider', 'auto')).lower())
+    if provider is None:
+        return None
+    return DirigeantResolver(
+        provider,
+        cache=get_dirigeant_cache(),
+        workers=int(get_setting('dirigeants', 'workers', 8)),
+    )
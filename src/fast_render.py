@@ -0,0 +1,390 @@
+# Rendu rapide : réécriture directe de word/document.xml, sans modèle python-docx
+
+import io
+import re
+import struct
+import threading
+import zipfile
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from lxml import etree
+
+from .metrics import metrics
+from .replacer import ReplacementEngine, compile_replacements, merge_counts, record_replacements, run_text
+
+DOCUMENT_PART = "word/document.xml"
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_W = f"{{{W_NS}}}"
+
+# Balises du XML source : déclaration, commentaire, CDATA ou élément (ouvrant, fermant, vide)
+_TOKEN = re.compile(
+    r'<\?.*?\?>|<!--.*?-->|<!\[CDATA\[.*?\]\]>'
+    r'|<(/?)([^\s/>]+)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>',
+    re.DOTALL,
+)
+_ATTRIBUTE = re.compile(r'([^\s=]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+
+# Enregistrements ZIP écrits par save (APPNOTE.TXT, sans ZIP64)
+_LOCAL_HEADER = struct.Struct('<4s5H3I2H')
+_CENTRAL_HEADER = struct.Struct('<4s6H3I5H2I')
+_DATA_DESCRIPTOR = struct.Struct('<4s3I')
+_END_RECORD = struct.Struct('<4s4H2IH')
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+
+
+class _ZipEntry:
+    """Partie de l'archive de sortie : en-tête local et enregistrement du répertoire central."""
+
+    def __init__(self, info: zipfile.ZipInfo, flags: int, compress_type: int, crc: int, compressed_size: int,
+                 file_size: int, offset: int):
+        name = info.filename.encode('utf-8' if flags & _FLAG_UTF8 else 'cp437')
+        year, month, day, hour, minute, second = info.date_time
+        dos_time = hour << 11 | minute << 5 | second // 2
+        dos_date = (year - 1980) << 9 | month << 5 | day
+        self.local_header = _LOCAL_HEADER.pack(
+            b'PK\x03\x04', 20, flags, compress_type, dos_time, dos_date,
+            0 if flags & _FLAG_DATA_DESCRIPTOR else crc,
+            0 if flags & _FLAG_DATA_DESCRIPTOR else compressed_size,
+            0 if flags & _FLAG_DATA_DESCRIPTOR else file_size,
+            len(name), 0) + name
+        self.central_record = _CENTRAL_HEADER.pack(
+            b'PK\x01\x02', info.create_system << 8 | info.create_version, 20, flags, compress_type,
+            dos_time, dos_date, crc, compressed_size, file_size, len(name), 0, 0, 0, info.internal_attr,
+            info.external_attr, offset) + name
+
+
+def _name_flags(info: zipfile.ZipInfo) -> int:
+    try:
+        info.filename.encode('ascii')
+        return 0
+    except UnicodeEncodeError:
+        return _FLAG_UTF8
+
+
+def _paragraph_runs(p) -> List:
+    """Runs directs du paragraphe (équivalent de CT_P.r_lst)."""
+    return [r for r in p if r.tag == f"{_W}r"]
+
+
+def _paragraph_text(p) -> str:
+    """Texte du paragraphe, hyperliens compris (équivalent de Paragraph.text)."""
+    pieces = []
+    for child in p:
+        if child.tag == f"{_W}r":
+            pieces.append(run_text(child))
+        elif child.tag == f"{_W}hyperlink":
+            pieces.extend(run_text(r) for r in child if r.tag == f"{_W}r")
+    return ''.join(pieces)
+
+
+class FastTemplate:
+    """
+    Template DOCX préparé pour une réécriture directe du XML.
+
+    Le template est gardé en mémoire. À la compilation :
+    - les parties autres que word/document.xml sont extraites telles
+      quelles (données compressées, sans décompression) dans une tête
+      d'archive, recopiée octet pour octet à chaque rendu ;
+    - word/document.xml est décodé en une chaîne puis découpé en balises
+      par expressions régulières (sans arbre) pour repérer les paragraphes
+      que python-docx visite : ceux du corps et ceux des cellules des
+      tableaux du corps (une cellule fusionnée verticalement n'est visitée
+      qu'une fois). Leur position dans la chaîne et leur texte sont
+      indexés ; le texte des cellules reprend les hyperliens, comme
+      cell.text.
+
+    Un rendu ne parse que les paragraphes touchés par un remplacement ;
+    le reste du XML est recopié par tranches, compressées au fil de
+    l'écriture. Le texte obtenu est le même qu'avec CompiledTemplate
+    (remplacements et règles de runs identiques).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.mtime = self.path.stat().st_mtime
+
+        # Paragraphes indexés : (début, fin) dans le XML, texte des runs directs
+        # (recherche des clés) et texte complet, hyperliens compris (cellules)
+        self._spans: List[Tuple[int, int]] = []
+        self._paragraph_texts: List[str] = []
+        self._full_texts: List[str] = []
+        # Cellules : (texte d'origine, [paragraphes], colonne dans la grille du tableau)
+        self._cells: List[Tuple[str, List[int], int]] = []
+        # Motif des clés -> paragraphes correspondants
+        self._matching: Dict[str, List[int]] = {}
+
+        with metrics.timer('template_parse'):
+            self._compile()
+
+    def _compile(self):
+        data = self.path.read_bytes()
+        head = io.BytesIO()
+        self._entries: List[_ZipEntry] = []
+        with zipfile.ZipFile(io.BytesIO(data)) as source:
+            for info in source.infolist():
+                if info.filename == DOCUMENT_PART:
+                    self._document_info = info
+                    self.xml = source.read(info).decode('utf-8')
+                    continue
+                if info.flag_bits & 0x01 or max(info.compress_size, info.file_size, head.tell()) >= 0xFFFFFFFF:
+                    raise ValueError(f"{self.path}: partie chiffrée ou ZIP64 non supportée ({info.filename})")
+                # Données compressées d'origine, après l'en-tête local (nom et extra de longueurs variables)
+                name_length, extra_length = struct.unpack_from('<2H', data, info.header_offset + 26)
+                start = info.header_offset + _LOCAL_HEADER.size + name_length + extra_length
+                entry = _ZipEntry(info, _name_flags(info), info.compress_type, info.CRC, info.compress_size,
+                                  info.file_size, head.tell())
+                head.write(entry.local_header)
+                head.write(data[start:start + info.compress_size])
+                self._entries.append(entry)
+        self.head = head.getvalue()
+        self._index()
+
+    def _index(self):
+        """Parcours en flux des balises de document.xml."""
+        stack: List[str] = []
+        prefix = None
+        body_depth = None
+
+        open_paragraph: Optional[Tuple[int, int]] = None   # (début, profondeur)
+        cell: Optional[List[int]] = None
+        cell_continues = False
+        # Colonne de la cellule ouverte et de la suivante (w:gridSpan compris), comme row.cells
+        column = next_column = span = 0
+
+        for match in _TOKEN.finditer(self.xml):
+            closing, name, attributes = match.group(1), match.group(2), match.group(3)
+            if name is None:
+                continue
+
+            if prefix is None:
+                # Élément racine : préfixe du namespace WordprocessingML et déclarations
+                self._root_name = name
+                self._root_attributes = attributes
+                prefix = next((m.group(1).split(':', 1)[1] + ':' for m in _ATTRIBUTE.finditer(attributes)
+                               if m.group(1).startswith('xmlns:') and (m.group(2) or m.group(3)) == W_NS), '')
+                p_tag, tbl_tag, tr_tag, tc_tag = (prefix + t for t in ('p', 'tbl', 'tr', 'tc'))
+                tcpr_tag, vmerge_tag, gridspan_tag = prefix + 'tcPr', prefix + 'vMerge', prefix + 'gridSpan'
+                body_tag = prefix + 'body'
+                stack.append(name)
+                continue
+
+            self_closing = not closing and attributes.endswith('/')
+
+            if closing:
+                stack.pop()
+                depth = len(stack)
+                if open_paragraph and depth == open_paragraph[1]:
+                    self._register_paragraph(open_paragraph[0], match.end(), cell)
+                    open_paragraph = None
+                elif name == tc_tag and cell is not None and depth == body_depth + 2:
+                    if not cell_continues:
+                        self._cells.append(('\n'.join(self._full_texts[i] for i in cell), cell, column))
+                    cell = None
+                    next_column = column + span
+                continue
+
+            depth = len(stack)
+            if name == body_tag and depth == 1:
+                body_depth = depth + 1
+            elif body_depth is not None and open_paragraph is None:
+                path = stack[body_depth:]
+                if name == p_tag and (not path or (path == [tbl_tag, tr_tag, tc_tag] and not cell_continues)):
+                    if self_closing:
+                        self._register_paragraph(match.start(), match.end(), cell)
+                    else:
+                        open_paragraph = (match.start(), depth)
+                elif name == tr_tag and path == [tbl_tag]:
+                    next_column = 0
+                elif name == tc_tag and path == [tbl_tag, tr_tag]:
+                    cell, cell_continues = [], False
+                    column, span = next_column, 1
+                elif name == vmerge_tag and path == [tbl_tag, tr_tag, tc_tag, tcpr_tag]:
+                    values = {m.group(1): m.group(2) or m.group(3) for m in _ATTRIBUTE.finditer(attributes)}
+                    cell_continues = values.get(prefix + 'val', 'continue') == 'continue'
+                elif name == gridspan_tag and path == [tbl_tag, tr_tag, tc_tag, tcpr_tag]:
+                    values = {m.group(1): m.group(2) or m.group(3) for m in _ATTRIBUTE.finditer(attributes)}
+                    span = max(1, int(values.get(prefix + 'val') or 1))
+
+            if not self_closing:
+                stack.append(name)
+
+    def _register_paragraph(self, start: int, end: int, cell: Optional[List[int]]):
+        paragraph_id = len(self._spans)
+        self._spans.append((start, end))
+        p = self.parse_paragraph(paragraph_id)
+        self._paragraph_texts.append(''.join(run_text(run) for run in _paragraph_runs(p)))
+        self._full_texts.append(_paragraph_text(p))
+        if cell is not None:
+            cell.append(paragraph_id)
+
+    def parse_paragraph(self, paragraph_id: int):
+        """Élément w:p d'origine (parsé avec les déclarations de namespace de la racine)."""
+        start, end = self._spans[paragraph_id]
+        wrapper = etree.fromstring(
+            f"<{self._root_name}{self._root_attributes}>{self.xml[start:end]}</{self._root_name}>"
+        )
+        return wrapper[0]
+
+    def serialize_paragraph(self, p) -> str:
+        """XML d'un w:p sans redéclarer les namespaces de la racine."""
+        xml = etree.tostring(p.getparent(), encoding='unicode')
+        return xml[xml.index('>') + 1:-len(f"</{self._root_name}>")]
+
+    def paragraphs_matching(self, engine: ReplacementEngine) -> List[int]:
+        """
+        Paragraphes dont le texte d'origine contient au moins une clé.
+
+        Le résultat ne dépend que des clés (les valeurs changent d'une
+        société à l'autre) : il est mémorisé par motif.
+        """
+        if engine.pattern is None:
+            return []
+        matching = self._matching.get(engine.pattern.pattern)
+        if matching is None:
+            matching = [i for i, text in enumerate(self._paragraph_texts) if engine.matches(text)]
+            self._matching[engine.pattern.pattern] = matching
+        return matching
+
+    def render(self) -> "FastRendering":
+        return FastRendering(self)
+
+
+class FastRendering:
+    """
+    Rendu en cours d'un FastTemplate (même interface que TemplateRendering).
+
+    Seuls les paragraphes modifiés sont parsés puis resérialisés ; leur
+    nouveau texte peut contenir une clé d'un remplacement appliqué ensuite.
+    """
+
+    def __init__(self, template: FastTemplate):
+        self.template = template
+        self._paragraphs: Dict[int, object] = {}
+        self._dirty: Set[int] = set()
+
+    def _paragraph(self, paragraph_id: int):
+        p = self._paragraphs.get(paragraph_id)
+        if p is None:
+            p = self.template.parse_paragraph(paragraph_id)
+            self._paragraphs[paragraph_id] = p
+        return p
+
+    def _apply(self, engine: ReplacementEngine, paragraph_ids: Iterable[int]) -> Dict[str, int]:
+        total: Dict[str, int] = {}
+        for paragraph_id in paragraph_ids:
+            counts = engine.apply_to_runs(_paragraph_runs(self._paragraph(paragraph_id)))
+            if counts:
+                self._dirty.add(paragraph_id)
+                merge_counts(total, counts)
+        return total
+
+    def replace(self, replacements: Union[Dict[str, str], ReplacementEngine]) -> Dict[str, int]:
+        """Remplacements dans le corps et les tableaux (voir TemplateRendering.replace)."""
+        engine = replacements if isinstance(replacements, ReplacementEngine) \
+            else compile_replacements(replacements)
+        with metrics.timer('replace'):
+            candidates = set(self.template.paragraphs_matching(engine)) | self._dirty
+            counts = self._apply(engine, sorted(candidates))
+        record_replacements(engine, counts)
+        return counts
+
+    def replace_in_cells(self, markers: Iterable[str],
+                         replacements: Union[Dict[str, str], ReplacementEngine],
+                         column: Optional[int] = None) -> Dict[str, int]:
+        """Remplacements limités aux cellules contenant un des marqueurs (texte courant), dans la colonne column."""
+        markers = tuple(markers)
+        engine = replacements if isinstance(replacements, ReplacementEngine) \
+            else compile_replacements(replacements)
+        total: Dict[str, int] = {}
+
+        with metrics.timer('replace'):
+            for cell_text, paragraph_ids, cell_column in self.template._cells:
+                if column is not None and cell_column != column:
+                    continue
+                if any(paragraph_id in self._dirty for paragraph_id in paragraph_ids):
+                    cell_text = '\n'.join(_paragraph_text(self._paragraph(i)) for i in paragraph_ids)
+                if any(marker in cell_text for marker in markers):
+                    merge_counts(total, self._apply(engine, paragraph_ids))
+
+        record_replacements(engine, total)
+        return total
+
+    def _document_pieces(self) -> Iterable[str]:
+        """word/document.xml rendu, par morceaux : tranches d'origine et paragraphes modifiés."""
+        template = self.template
+        position = 0
+        for paragraph_id in sorted(self._dirty):
+            start, end = template._spans[paragraph_id]
+            yield template.xml[position:start]
+            yield template.serialize_paragraph(self._paragraphs[paragraph_id])
+            position = end
+        yield template.xml[position:]
+
+    def document_xml(self) -> bytes:
+        """word/document.xml rendu."""
+        return ''.join(self._document_pieces()).encode('utf-8')
+
+    def save(self, stream: BinaryIO):
+        """
+        Écrit le DOCX en flux (flux non seekable accepté) : tête d'archive
+        recopiée octet pour octet, document.xml compressé au fil de l'eau
+        (tailles et CRC dans un descripteur de données), répertoire central.
+        """
+        template = self.template
+        info = template._document_info
+        flags = _name_flags(info) | _FLAG_DATA_DESCRIPTOR
+        offset = len(template.head)
+        stream.write(template.head)
+        stream.write(_ZipEntry(info, flags, zipfile.ZIP_DEFLATED, 0, 0, 0, offset).local_header)
+
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        crc = file_size = compressed_size = 0
+        for piece in self._document_pieces():
+            data = piece.encode('utf-8')
+            crc = zlib.crc32(data, crc)
+            file_size += len(data)
+            compressed = compressor.compress(data)
+            compressed_size += len(compressed)
+            stream.write(compressed)
+        compressed = compressor.flush()
+        compressed_size += len(compressed)
+        stream.write(compressed)
+        stream.write(_DATA_DESCRIPTOR.pack(b'PK\x07\x08', crc, compressed_size, file_size))
+
+        document = _ZipEntry(info, flags, zipfile.ZIP_DEFLATED, crc, compressed_size, file_size, offset)
+        central = b''.join(entry.central_record for entry in template._entries) + document.central_record
+        entries = len(template._entries) + 1
+        stream.write(central)
+        stream.write(_END_RECORD.pack(
+            b'PK\x05\x06', 0, 0, entries, entries, len(central),
+            offset + len(document.local_header) + compressed_size + _DATA_DESCRIPTOR.size, 0))
+
+
+_cache: Dict[str, FastTemplate] = {}
+_cache_lock = threading.Lock()
+
+
+def get_fast_template(path) -> FastTemplate:
+    """Template préparé pour ce fichier DOCX (recompilé si le fichier a changé)."""
+    resolved = Path(path).resolve()
+    key = str(resolved)
+    mtime = resolved.stat().st_mtime
+
+    with _cache_lock:
+        compiled = _cache.get(key)
+        if compiled is None or compiled.mtime != mtime:
+            metrics.incr('template_cache_total', result='miss')
+            compiled = FastTemplate(resolved)
+            _cache[key] = compiled
+        else:
+            metrics.incr('template_cache_total', result='hit')
+        return compiled
+
+
+def clear_fast_template_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -1,170 +1,422 @@
 # Module pour générer les contrats à partir des templates
 
+import io
 import os
-import yaml
+import threading
+import zipfile
 from datetime import datetime
+from itertools import chain
 from pathlib import Path
 from docx import Document
-from typing import Dict, Any
+from typing import Any, BinaryIO, Dict, List, Optional, Set, Tuple
+from .config_registry import get_config_registry
+from .contract_engine import ContractRenderer
+from .metrics import metrics
 from .models import Societe
+from .output_store import OutputStore
+from .replacer import apply_to_paragraphs, compile_replacements, record_replacements
+from .settings import get_setting
 
+# Moteurs de rendu : python-docx (référence) ou réécriture directe du XML
+RENDER_ENGINES = ('docx', 'fast')
 
-def load_template_config(template_name: str) -> Dict[str, Any]:
-    """Charge la configuration d'un template."""
-    config_path = Path(f"templates/{template_name}/config.yaml")
 
-    if not config_path.exists():
-        raise FileNotFoundError(f"Configuration template introuvable: {config_path}")
+def load_template_config(template_name: str) -> Dict[str, Any]:
+    """
+    Charge la configuration d'un template (validée, mise en cache par le registre).
 
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+    Le fichier n'est relu que s'il a été modifié ; le dictionnaire
+    retourné est partagé et ne doit pas être modifié.
+    """
+    return get_config_registry().get(template_name)
 
 
 def replace_in_paragraph(paragraph, old_text: str, new_text: str):
-    """Remplace du texte dans un paragraphe en préservant le formatage."""
-    if old_text in paragraph.text:
-        for run in paragraph.runs:
-            if old_text in run.text:
-                run.text = run.text.replace(old_text, new_text)
+    """Remplace du texte dans un paragraphe en préservant le formatage (même coupé sur plusieurs runs)."""
+    compile_replacements({old_text: new_text}).apply_to_paragraph(paragraph)
 
 
-def replace_in_table(table, old_text: str, new_text: str):
-    """Remplace du texte dans un tableau."""
+def iter_table_paragraphs(table):
+    """Paragraphes d'un tableau, chaque cellule fusionnée n'étant visitée qu'une fois."""
+    seen = set()
     for row in table.rows:
         for cell in row.cells:
-            for paragraph in cell.paragraphs:
-                replace_in_paragraph(paragraph, old_text, new_text)
+            if cell._tc in seen:
+                continue
+            seen.add(cell._tc)
+            yield from cell.paragraphs
+
+
+def replace_in_table(table, old_text: str, new_text: str):
+    """Remplace du texte dans un tableau."""
+    apply_to_paragraphs(compile_replacements({old_text: new_text}), iter_table_paragraphs(table))
+
+
+def replace_in_document(doc: Document, replacements: Dict[str, str]) -> Dict[str, int]:
+    """
+    Applique tous les remplacements dans le document.
 
+    Une seule passe par paragraphe (corps puis tableaux) avec un motif
+    combiné ; à position égale, la première clé de la table l'emporte.
+
+    Returns:
+        Nombre de remplacements effectués par clé
+    """
+    engine = compile_replacements(replacements)
+    with metrics.timer('replace'):
+        paragraphs = chain(doc.paragraphs, *(iter_table_paragraphs(table) for table in doc.tables))
+        counts = apply_to_paragraphs(engine, paragraphs)
+    record_replacements(engine, counts)
+    return counts
+
+
+def _variant_config(config: Dict[str, Any], variant: str) -> Dict[str, Any]:
+    if variant not in config['variants']:
+        raise ValueError(f"Variante inconnue: {variant}. Variantes disponibles: {list(config['variants'].keys())}")
+    return config['variants'][variant]
 
-def replace_in_document(doc: Document, replacements: Dict[str, str]):
-    """Applique tous les remplacements dans le document."""
-    # Remplacements dans les paragraphes
-    for paragraph in doc.paragraphs:
-        for old_text, new_text in replacements.items():
-            replace_in_paragraph(paragraph, old_text, new_text)
 
-    # Remplacements dans les tableaux
-    for table in doc.tables:
-        for old_text, new_text in replacements.items():
-            replace_in_table(table, old_text, new_text)
+# (template, variante) -> (configuration compilée, règles compilées)
+_renderers: Dict[Tuple[str, str], Tuple[Dict[str, Any], ContractRenderer]] = {}
+_renderers_lock = threading.Lock()
 
 
-def generate_nda(partie2: Societe, variant: str = "master", output_dir: str = "output") -> str:
+def contract_renderer(template_name: str, variant: str,
+                      config: Optional[Dict[str, Any]] = None) -> ContractRenderer:
     """
-    Génère un NDA entre FR Digital (partie 1) et une autre société (partie 2).
+    Règles de remplacement d'une variante, compilées une fois.
+
+    Elles sont recompilées seulement si la configuration a été rechargée
+    (config.yaml modifié) ; tous les rendus suivants les réutilisent.
+    """
+    if config is None:
+        config = load_template_config(template_name)
+    variant_config = _variant_config(config, variant)
+    key = (template_name, variant)
+
+    with _renderers_lock:
+        cached = _renderers.get(key)
+        if cached is not None and cached[0] is config:
+            return cached[1]
+
+    template_path = get_config_registry().template_path(template_name, variant_config['template'])
+    renderer = ContractRenderer(template_name, variant, config, template_path)
+    with _renderers_lock:
+        _renderers[key] = (config, renderer)
+    return renderer
+
+
+def select_variants(template_name: str, variants: Optional[List[str]] = None) -> List[str]:
+    """
+    Variantes demandées, vérifiées dans la configuration du template.
+
+    Sans variante : la première déclarée ; "all" : toutes.
+
+    Raises:
+        ValueError: type de contrat ou variante inconnus
+    """
+    try:
+        config = load_template_config(template_name)
+    except FileNotFoundError:
+        names = get_config_registry().names()
+        raise ValueError(f"Type de contrat inconnu: {template_name}. "
+                         f"Types disponibles: {', '.join(names) or 'aucun'}") from None
+    available = list(config['variants'])
+    if not variants:
+        return available[:1]
+    if 'all' in variants:
+        return available
+    unknown = [variant for variant in variants if variant not in available]
+    if unknown:
+        raise ValueError(f"Variante(s) inconnue(s): {unknown}. Variantes disponibles: {available}")
+    return list(dict.fromkeys(variants))
+
+
+def partie_fixe_siren(template_name: str, config: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """
+    SIREN (sans espaces) de la partie fixe du template (partie_fixe.siren),
+    déjà présente dans le DOCX : elle ne peut pas être aussi partie 2.
+    """
+    if config is None:
+        config = load_template_config(template_name)
+    siren = str((config.get('partie_fixe') or {}).get('siren') or '').replace(' ', '')
+    return siren or None
+
+
+def contract_label(template_name: str) -> str:
+    """Nom affiché d'un type de contrat (NDA, MSA...)."""
+    return template_name.upper()
+
+
+def start_rendering(template_name: str, partie2: Societe, variant: str,
+                    config: Optional[Dict[str, Any]] = None, engine: str = "docx"):
+    """
+    Applique au template de la variante les remplacements déclarés dans
+    templates/<template_name>/config.yaml (formats, tables).
 
     Args:
-        partie2: Données de la société partenaire
-        variant: Type de NDA (master, dev_plateforme, prestations)
-        output_dir: Répertoire de sortie
+        engine: "docx" (python-docx, référence) ou "fast" (réécriture
+            directe de word/document.xml, voir fast_render.py)
 
     Returns:
-        Chemin du fichier généré
+        Rendu rempli, non sauvegardé (TemplateRendering ou FastRendering)
     """
-    print(f"\n🔧 Génération NDA {variant}")
+    if engine not in RENDER_ENGINES:
+        raise ValueError(f"Moteur de rendu inconnu: {engine}. Moteurs disponibles: {list(RENDER_ENGINES)}")
+
+    print(f"\n🔧 Génération {contract_label(template_name)} {variant}")
     print(f"   Partie 2: {partie2.raison_sociale}")
 
-    # Charger la config
-    config = load_template_config("nda")
+    renderer = contract_renderer(template_name, variant, config)
+    if not renderer.template_path.exists():
+        raise FileNotFoundError(f"Template introuvable: {renderer.template_path}")
 
-    if variant not in config['variants']:
-        raise ValueError(f"Variante inconnue: {variant}. Variantes disponibles: {list(config['variants'].keys())}")
+    print(f"   Template: {renderer.template_path.name}")
+    print(f"   Format partie 2: {renderer.format}")
+
+    # Template parsé une seule fois par processus, rendu sur une copie
+    return renderer.render(partie2, engine)
+
+
+def render_engine() -> str:
+    """Moteur de rendu configuré (templates.engine dans config/settings.yaml)."""
+    return get_setting('templates', 'engine', 'docx')
+
+
+def contract_filename(template_name: str, partie2: Societe, variant: str,
+                      config: Optional[Dict[str, Any]] = None) -> str:
+    """Nom du fichier DOCX d'un contrat (modèle output.naming de la configuration)."""
+    if config is None:
+        config = load_template_config(template_name)
+    output = config.get('output', {})
+    naming = output.get('naming', f"{contract_label(template_name)}_{{{{TYPE}}}}_{{{{P2_RAISON_SOCIALE}}}}_{{{{DATE}}}}.docx")
+
+    date_str = datetime.now().strftime(output.get('date_format', "%d-%m-%Y"))
+    partie2_clean = partie2.raison_sociale.replace(' ', '').replace('/', '')[:20]
+
+    return (naming
+            .replace("{{TYPE}}", variant)
+            .replace("{{P2_RAISON_SOCIALE}}", partie2_clean)
+            .replace("{{DATE}}", date_str))
 
-    variant_config = config['variants'][variant]
-    template_file = variant_config['template']
-    format_partie2 = variant_config.get('format_partie2', 'simple')
-
-    # Chemin du template
-    template_path = Path(f"templates/nda/examples/{template_file}")
-
-    if not template_path.exists():
-        raise FileNotFoundError(f"Template introuvable: {template_path}")
-
-    print(f"   Template: {template_file}")
-    print(f"   Format partie 2: {format_partie2}")
-
-    # Charger le document
-    doc = Document(template_path)
-
-    # Préparer les remplacements selon le format
-    replacements = {}
-
-    if format_partie2 == 'detailed':
-        # Format DETAILED (master)
-        # XXXXX, société par actions simplifiée unipersonnelle, dont le siège social
-        # est situé à XXXXX (France), au capital de XXXXX €, inscrit au registre du
-        # commerce de XXXXX sous le numéro d'inscription XXXXX, dûment représenté par XXXXX,
-
-        # On remplace de manière séquentielle pour éviter les collisions
-        replacements = {
-            f"{partie2.raison_sociale}, société par actions simplifiée unipersonnelle":
-                f"{partie2.raison_sociale}, {partie2.forme_juridique.lower()}",
-        }
-
-        # Appliquer le premier remplacement
-        replace_in_document(doc, replacements)
-
-        # Puis les autres
-        replacements = {
-            f"situé à XXXXX (France)": f"situé à {partie2.adresse}",
-            f"capital de XXXXX €": f"capital de {partie2.capital}",
-            f"commerce de XXXXX sous": f"commerce de {partie2.ville_rcs} sous",
-            f"numéro d'inscription XXXXX": f"numéro d'inscription {partie2.siren}",
-            f"représenté par XXXXX,": f"représenté par {partie2.representant_nom},",
-        }
-
-    else:
-        # Format SIMPLE (dev_plateforme, prestations)
-        # XXXXXXX, dont le siège social est situé àXXXXXXX, inscrit au registre du
-        # commerce de XXX sous le numéro d'inscription XXXXXXX, dûment représenté par XXXXX,
-
-        replacements = {
-            "XXXXXXX, dont le siège social est situé àXXXXXXX":
-                f"{partie2.raison_sociale}, dont le siège social est situé à {partie2.adresse}",
-            "commerce de XXX sous": f"commerce de {partie2.ville_rcs} sous",
-            f"inscription XXXXXXX,": f"inscription {partie2.siren},",
-            f"par XXXXX,": f"par {partie2.representant_nom},",
-        }
-
-    # Appliquer les remplacements
-    replace_in_document(doc, replacements)
-
-    # Signatures (tableau)
-    signature_replacements = {
-        "Nom :": f"Nom : {partie2.representant_nom}",
-        "Titre :": f"Titre : {partie2.representant_fonction}",
+
+def unique_filename(filename: str, partie2: Societe, used: Set[str]) -> str:
+    """
+    Nom de fichier pas encore utilisé dans `used` (qui est complété).
+
+    La raison sociale est tronquée dans les noms : deux sociétés peuvent
+    donner le même. Le SIREN est alors ajouté, puis un numéro si besoin.
+    """
+    candidate = filename
+    if candidate in used:
+        stem, suffix = os.path.splitext(filename)
+        candidate = f"{stem}_{partie2.siren.replace(' ', '')}{suffix}"
+        number = 2
+        while candidate in used:
+            candidate = f"{stem}_{partie2.siren.replace(' ', '')}_{number}{suffix}"
+            number += 1
+    used.add(candidate)
+    return candidate
+
+
+def write_contract(template_name: str, partie2: Societe, stream: BinaryIO, variant: str,
+                   config: Optional[Dict[str, Any]] = None, engine: Optional[str] = None):
+    """
+    Écrit le contrat dans un flux binaire fourni par l'appelant.
+
+    Le flux n'a pas besoin d'être seekable (réponse HTTP, pipe, objet
+    d'upload S3...) ; il n'est pas fermé. Sans `engine`, le moteur de
+    rendu est celui de la configuration (templates.engine).
+    """
+    engine = engine or render_engine()
+    with metrics.timer('generate', variant=variant):
+        rendering = start_rendering(template_name, partie2, variant, config=config, engine=engine)
+        with metrics.timer('save'):
+            if engine == "fast":
+                rendering.save(stream)
+            else:
+                rendering.document.save(stream)
+
+
+def render_contract(template_name: str, partie2: Societe, variant: str,
+                    config: Optional[Dict[str, Any]] = None, engine: Optional[str] = None) -> bytes:
+    """
+    Génère le contrat en mémoire, sans passer par le disque.
+
+    Returns:
+        Contenu du fichier DOCX
+    """
+    buffer = io.BytesIO()
+    write_contract(template_name, partie2, buffer, variant, config=config, engine=engine)
+    return buffer.getvalue()
+
+
+def store_contract(template_name: str, partie2: Societe, store: OutputStore, variant: str,
+                   config: Optional[Dict[str, Any]] = None) -> Tuple[Path, bool]:
+    """
+    Rendu incrémental : le contrat n'est généré que si ses entrées
+    (template, configuration de la variante et ses règles, données de la
+    société) ont changé.
+
+    Returns:
+        (fichier dans le stockage, True s'il a été réutilisé sans rendu)
+    """
+    if config is None:
+        config = load_template_config(template_name)
+    variant_config = _variant_config(config, variant)
+    renderer = contract_renderer(template_name, variant, config)
+    if not renderer.template_path.exists():
+        raise FileNotFoundError(f"Template introuvable: {renderer.template_path}")
+    renderer.check_complete(partie2)
+
+    # Les règles déclarées font partie des entrées : les modifier invalide les rendus stockés
+    rules = {
+        'format': (config.get('formats') or {}).get(renderer.format),
+        'tables': config.get('tables') or [],
     }
+    engine = render_engine()
+    key = store.key(renderer.template_path, {**variant_config, 'rules': rules}, partie2, renderer=engine)
+    stored = store.lookup(key)
+    if stored is not None:
+        return stored, True
+
+    content = render_contract(template_name, partie2, variant, config=config, engine=engine)
+    return store.put(key, content, siren=partie2.siren, variant=variant), False
+
+
+def generate_contract_stored(template_name: str, partie2: Societe, store: OutputStore, variant: str,
+                             output_dir: str = "output", config: Optional[Dict[str, Any]] = None,
+                             filename: Optional[str] = None) -> Tuple[str, bool]:
+    """
+    Génère un contrat via le stockage adressé par contenu (voir store_contract).
+
+    Le fichier de sortie est un lien physique vers le fichier stocké, nommé
+    filename (défaut : contract_filename).
+
+    Returns:
+        (chemin du fichier généré, True s'il a été réutilisé sans rendu)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = Path(output_dir) / (filename or contract_filename(template_name, partie2, variant, config))
 
-    for table in doc.tables:
-        # Chercher le tableau de signatures
-        for row in table.rows:
-            for cell in row.cells:
-                cell_text = cell.text
-                if "LE PARTENAIRE" in cell_text or "Nom :" in cell_text:
-                    for old, new in signature_replacements.items():
-                        for paragraph in cell.paragraphs:
-                            if old in paragraph.text:
-                                replace_in_paragraph(paragraph, old, new)
+    stored, reused = store_contract(template_name, partie2, store, variant, config=config)
+    store.link(stored, output_path)
+
+    label = contract_label(template_name)
+    print(f"♻️  {label} inchangé, réutilisé: {output_path}" if reused else f"✅ {label} généré: {output_path}")
+    return str(output_path), reused
+
+
+def generate_contract(template_name: str, partie2: Societe, variant: str, output_dir: str = "output",
+                      store: Optional[OutputStore] = None) -> str:
+    """
+    Génère un contrat entre la partie fixe du template (partie 1) et une autre société (partie 2).
+
+    Args:
+        template_name: Type de contrat (répertoire templates/<nom>/)
+        partie2: Données de la société partenaire
+        variant: Variante déclarée dans le config.yaml du template
+        output_dir: Répertoire de sortie
+        store: Stockage adressé par contenu : un contrat dont les entrées
+            n'ont pas changé est réutilisé au lieu d'être régénéré
+
+    Returns:
+        Chemin du fichier généré
+    """
+    if store is not None:
+        return generate_contract_stored(template_name, partie2, store, variant, output_dir)[0]
 
     # Créer le répertoire de sortie
     os.makedirs(output_dir, exist_ok=True)
 
     # Nom du fichier de sortie
-    date_str = datetime.now().strftime("%d-%m-%Y")
-    partie1_clean = "FRDigital"
-    partie2_clean = partie2.raison_sociale.replace(' ', '').replace('/', '')[:20]
+    output_path = Path(output_dir) / contract_filename(template_name, partie2, variant)
 
-    output_filename = f"NDA_{variant}_{partie1_clean}_{partie2_clean}_{date_str}.docx"
-    output_path = Path(output_dir) / output_filename
+    # Rendu en mémoire puis une seule écriture : pas de fichier partiel en cas d'erreur
+    content = render_contract(template_name, partie2, variant)
+    with open(output_path, 'wb') as f:
+        f.write(content)
 
-    # Sauvegarder
-    doc.save(output_path)
-
-    print(f"✅ NDA généré: {output_path}")
+    print(f"✅ {contract_label(template_name)} généré: {output_path}")
 
     return str(output_path)
 
 
+def generate_contract_set(template_name: str, parties: List[Societe], variants: List[str],
+                          output_dir: str = "output", zip_path: Optional[str] = None,
+                          store: Optional[OutputStore] = None) -> List[str]:
+    """
+    Génère toutes les variantes demandées pour chaque société partenaire.
+
+    La configuration est lue une fois, les règles de chaque variante sont
+    compilées une fois et chaque template n'est parsé qu'une fois (cache de
+    templates) : seul le rendu est payé par contrat.
+
+    Args:
+        template_name: Type de contrat (répertoire templates/<nom>/)
+        parties: Sociétés partenaires déjà résolues (partie 2 de chaque contrat)
+        variants: Variantes à générer pour chaque société
+        output_dir: Répertoire de sortie des fichiers DOCX
+        zip_path: Si fourni, tous les contrats sont regroupés dans cette
+            archive au lieu d'être écrits séparément
+        store: Stockage adressé par contenu : seuls les contrats dont les
+            entrées ont changé sont rendus
+
+    Deux sociétés dont les raisons sociales tronquées donnent le même nom
+    de fichier sont distinguées par leur SIREN (voir unique_filename).
+
+    Returns:
+        Chemins des fichiers générés (noms des entrées de l'archive si zip_path)
+    """
+    config = load_template_config(template_name)
+    unknown = [variant for variant in variants if variant not in config['variants']]
+    if unknown:
+        raise ValueError(f"Variante(s) inconnue(s): {unknown}. Variantes disponibles: {list(config['variants'].keys())}")
+    label = contract_label(template_name)
+
+    def render(partie2: Societe, variant: str) -> bytes:
+        if store is None:
+            return render_contract(template_name, partie2, variant, config=config)
+        stored, _ = store_contract(template_name, partie2, store, variant, config=config)
+        return stored.read_bytes()
+
+    # Un nom par contrat, même quand deux raisons sociales tronquées coïncident
+    used: Set[str] = set()
+    filenames = [
+        (partie2, variant, unique_filename(contract_filename(template_name, partie2, variant, config), partie2, used))
+        for partie2 in parties
+        for variant in variants
+    ]
+    documents = ((filename, render(partie2, variant)) for partie2, variant, filename in filenames)
+
+    generated = []
+    if zip_path:
+        Path(zip_path).parent.mkdir(parents=True, exist_ok=True)
+        # Un DOCX est déjà compressé : stockage sans recompression
+        with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for filename, content in documents:
+                archive.writestr(filename, content)
+                generated.append(filename)
+        print(f"✅ Archive générée: {zip_path} ({len(generated)} {label})")
+        return generated
+
+    os.makedirs(output_dir, exist_ok=True)
+    if store is not None:
+        for partie2, variant, filename in filenames:
+            output_file, _ = generate_contract_stored(template_name, partie2, store, variant, output_dir, config,
+                                                      filename)
+            generated.append(output_file)
+        return generated
+
+    for filename, content in documents:
+        output_path = Path(output_dir) / filename
+        with open(output_path, 'wb') as f:
+            f.write(content)
+        print(f"✅ {label} généré: {output_path}")
+        generated.append(str(output_path))
+    return generated
+
+
 if __name__ == "__main__":
     # Test
     from .scraper import scrape_pappers
@@ -177,6 +429,6 @@ if __name__ == "__main__":
 
     print("\n" + "=" * 60)
     # Générer un NDA master
-    output_file = generate_nda(nexans, variant="master")
+    output_file = generate_contract("nda", nexans, variant="master")
 
     print(f"\n📄 Fichier généré: {output_file}")
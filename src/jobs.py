@@ -0,0 +1,511 @@
+# File de travaux persistante (SQLite) : résolution, rendu et écriture en étapes concurrentes
+
+import io
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import redirect_stdout
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .metrics import metrics
+from .models import Societe
+from .settings import get_setting, resolve_path
+
+# États d'un travail. Les états « en cours » ne survivent pas à un arrêt :
+# à la reprise, un travail repart de son dernier état stable.
+QUEUED = 'queued'          # à résoudre
+RESOLVING = 'resolving'
+RESOLVED = 'resolved'      # société résolue (conservée en base), à rendre
+RENDERING = 'rendering'
+SAVING = 'saving'
+DONE = 'done'
+FAILED = 'failed'
+
+JOB_STATUSES = (QUEUED, RESOLVING, RESOLVED, RENDERING, SAVING, DONE, FAILED)
+
+# État en cours -> état stable depuis lequel reprendre
+RECOVERY = {RESOLVING: QUEUED, RENDERING: RESOLVED, SAVING: RESOLVED}
+
+# Travaux terminés pris en compte pour le débit (estimation de fin)
+ETA_WINDOW = 50
+
+
+class JobStore:
+    """
+    Lots de génération et leurs travaux, persistés dans SQLite.
+
+    Un lot (run) regroupe les travaux d'un fichier d'entrée ; un travail
+    est un contrat (partie, type de contrat, variante). Chaque changement d'état est écrit
+    immédiatement : l'avancement est consultable depuis un autre processus
+    pendant l'exécution, et une exécution interrompue reprend au dernier
+    travail terminé.
+
+    Utilisable depuis plusieurs threads (mode WAL, verrou partagé).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    source TEXT,
+                    output_dir TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id INTEGER NOT NULL REFERENCES runs(id),
+                    line INTEGER,
+                    party TEXT NOT NULL,
+                    template TEXT NOT NULL DEFAULT 'nda',
+                    variant TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    societe TEXT,
+                    output TEXT,
+                    error TEXT,
+                    failed_stage TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    started_at REAL,
+                    finished_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS jobs_run_status ON jobs (run_id, status);
+            """)
+            # Base créée avant les autres types de contrats : ses travaux sont des NDA
+            if 'template' not in {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}:
+                conn.execute("ALTER TABLE jobs ADD COLUMN template TEXT NOT NULL DEFAULT 'nda'")
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _execute(self, sql: str, params: Tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(sql, params)
+            conn.commit()
+            return cursor
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            cursor = self._connection().execute(sql, params)
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def create_run(self, rows: List[Dict[str, Any]], output_dir: str, source: Optional[str] = None) -> int:
+        """
+        Enregistre un lot (lignes de read_batch_file).
+
+        Les lignes déjà invalides à la lecture sont enregistrées en échec.
+
+        Returns:
+            Identifiant du lot
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            run_id = conn.execute(
+                "INSERT INTO runs (source, output_dir, created_at) VALUES (?, ?, ?)",
+                (source, os.path.abspath(output_dir), now)
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO jobs (run_id, line, party, template, variant, status, error, failed_stage, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, row['line'], row['party'], row.get('template', 'nda'), row['variant'],
+                  FAILED if row.get('error') else QUEUED,
+                  row.get('error') or None,
+                  'input' if row.get('error') else None,
+                  now if row.get('error') else None)
+                 for row in rows]
+            )
+            conn.commit()
+        return run_id
+
+    def get_run(self, run_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Lot demandé, ou le plus récent."""
+        if run_id is None:
+            runs = self._query("SELECT * FROM runs ORDER BY id DESC LIMIT 1")
+        else:
+            runs = self._query("SELECT * FROM runs WHERE id = ?", (run_id,))
+        return runs[0] if runs else None
+
+    def runs(self) -> List[Dict[str, Any]]:
+        return self._query("SELECT * FROM runs ORDER BY id")
+
+    def jobs(self, run_id: int, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        if status is None:
+            return self._query("SELECT * FROM jobs WHERE run_id = ? ORDER BY id", (run_id,))
+        return self._query("SELECT * FROM jobs WHERE run_id = ? AND status = ? ORDER BY id", (run_id, status))
+
+    def recover(self, run_id: int) -> int:
+        """
+        Remet les travaux interrompus dans leur dernier état stable.
+
+        Returns:
+            Nombre de travaux repris
+        """
+        recovered = 0
+        for current, stable in RECOVERY.items():
+            recovered += self._execute(
+                "UPDATE jobs SET status = ? WHERE run_id = ? AND status = ?", (stable, run_id, current)
+            ).rowcount
+        return recovered
+
+    def claim(self, run_id: int, limit: int) -> List[Dict[str, Any]]:
+        """Prend jusqu'à `limit` travaux à résoudre (passés en RESOLVING)."""
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute(
+                "SELECT id, party, template, variant FROM jobs WHERE run_id = ? AND status = ? ORDER BY id LIMIT ?",
+                (run_id, QUEUED, limit)
+            ).fetchall()
+            now = time.time()
+            conn.executemany(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, "
+                "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                [(RESOLVING, now, row[0]) for row in rows]
+            )
+            conn.commit()
+        return [{'id': row[0], 'party': row[1], 'template': row[2], 'variant': row[3]} for row in rows]
+
+    def set_status(self, job_id: int, status: str):
+        self._execute("UPDATE jobs SET status = ? WHERE id = ?", (status, job_id))
+
+    def resolved(self, job_id: int, societe: Societe):
+        self._execute(
+            "UPDATE jobs SET status = ?, societe = ? WHERE id = ?",
+            (RESOLVED, json.dumps(asdict(societe), ensure_ascii=False), job_id)
+        )
+
+    def done(self, job_id: int, output: str):
+        self._execute(
+            "UPDATE jobs SET status = ?, output = ?, error = NULL, failed_stage = NULL, finished_at = ? WHERE id = ?",
+            (DONE, output, time.time(), job_id)
+        )
+
+    def fail(self, job_id: int, stage: str, error: str):
+        self._execute(
+            "UPDATE jobs SET status = ?, error = ?, failed_stage = ?, finished_at = ? WHERE id = ?",
+            (FAILED, error, stage, time.time(), job_id)
+        )
+
+    def retry(self, run_id: int, job_ids: Optional[List[int]] = None) -> int:
+        """
+        Remet en file les travaux en échec : à l'étape de rendu si la
+        société avait été résolue, sinon à la résolution. Les échecs
+        d'entrée (ligne invalide, identifiant invalide, nom inconnu ou
+        ambigu) ne sont pas repris : il faut corriger le fichier.
+
+        Returns:
+            Nombre de travaux remis en file
+        """
+        sql = ("UPDATE jobs SET status = CASE WHEN societe IS NULL THEN ? ELSE ? END, "
+               "error = NULL, failed_stage = NULL, finished_at = NULL "
+               "WHERE run_id = ? AND status = ? AND COALESCE(failed_stage, '') != 'input'")
+        params: Tuple = (QUEUED, RESOLVED, run_id, FAILED)
+        if job_ids:
+            sql += f" AND id IN ({','.join('?' * len(job_ids))})"
+            params += tuple(job_ids)
+        return self._execute(sql, params).rowcount
+
+    def progress(self, run_id: int) -> Dict[str, Any]:
+        """
+        Avancement d'un lot.
+
+        Returns:
+            {total, <état>: nombre, remaining, rate (travaux/s), eta_s}
+            rate et eta_s sont estimés sur les derniers travaux terminés
+            (None tant qu'il n'y en a pas assez)
+        """
+        counts = {status: 0 for status in JOB_STATUSES}
+        for row in self._query("SELECT status, COUNT(*) AS n FROM jobs WHERE run_id = ? GROUP BY status", (run_id,)):
+            counts[row['status']] = row['n']
+        total = sum(counts.values())
+        remaining = total - counts[DONE] - counts[FAILED]
+
+        finished = [row['finished_at'] for row in self._query(
+            "SELECT finished_at FROM jobs WHERE run_id = ? AND status = ? ORDER BY finished_at DESC LIMIT ?",
+            (run_id, DONE, ETA_WINDOW)
+        )]
+        rate = estimate_rate(finished)
+        return {
+            'total': total,
+            **counts,
+            'remaining': remaining,
+            'rate': rate,
+            'eta_s': round(remaining / rate, 1) if rate and remaining else (0.0 if not remaining else None),
+        }
+
+
+def estimate_rate(finished_at: List[float]) -> Optional[float]:
+    """Débit (travaux/s) d'après les dates de fin des derniers travaux terminés."""
+    if len(finished_at) < 2:
+        return None
+    span = max(finished_at) - min(finished_at)
+    return (len(finished_at) - 1) / span if span > 0 else None
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "?"
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def format_contract(row: Dict[str, Any]) -> str:
+    """Variante d'une ligne ou d'un travail, précédée du type de contrat s'il ne s'agit pas d'un NDA."""
+    template = row.get('template', 'nda')
+    return row['variant'] if template == 'nda' else f"{template}/{row['variant']}"
+
+
+def format_progress(progress: Dict[str, Any]) -> str:
+    """Ligne d'avancement : terminés, en échec, en cours, estimation de fin."""
+    in_progress = progress['total'] - progress[DONE] - progress[FAILED] - progress[QUEUED]
+    return (f"{progress[DONE]}/{progress['total']} terminé(s), {progress[FAILED]} en échec, "
+            f"{in_progress} en cours, {progress[QUEUED]} à résoudre"
+            + (f" — ~{progress['rate']:.1f}/s, fin dans {format_duration(progress['eta_s'])}"
+               if progress['remaining'] and progress['rate'] else ""))
+
+
+def resolve_failure_stage(error: Exception) -> str:
+    """
+    Étape d'échec d'une résolution : 'input' pour un identifiant invalide,
+    un nom inconnu ou ambigu (extract_siren : définitif, retry ne le reprend
+    pas), 'resolve' pour une société introuvable ou une source indisponible.
+    """
+    from .scraper import SocieteNotFoundError
+
+    if isinstance(error, ValueError) and not isinstance(error, SocieteNotFoundError):
+        return 'input'
+    return 'resolve'
+
+
+def _render_job(template_name: str, partie2: Societe, variant: str) -> bytes:
+    """Rendu d'un contrat dans un processus du pool (logs détaillés capturés)."""
+    from .generator import render_contract
+
+    with redirect_stdout(io.StringIO()):
+        return render_contract(template_name, partie2, variant)
+
+
+class JobRunner:
+    """
+    Exécute (ou reprend) un lot en trois étapes concurrentes :
+
+    - résolution : un thread prend les travaux par paquets (resolve_chunk)
+      et les résout avec resolve_many (recherches groupées, resolve_workers
+      requêtes simultanées) ;
+    - rendu : pool de render_workers processus, alimenté dès qu'une
+      société est résolue : le réseau et le CPU travaillent en même temps ;
+    - écriture : save_workers threads écrivent les DOCX (renommage atomique).
+
+    Le nombre de rendus en cours ou en attente d'écriture est borné
+    (2 x render_workers) : la mémoire ne dépend pas de la taille du lot.
+    """
+
+    def __init__(self, store: JobStore, run_id: int, resolve_workers: int = 8, resolve_chunk: int = 50,
+                 render_workers: Optional[int] = None, save_workers: int = 2,
+                 refresh: bool = False, offline: bool = False,
+                 on_job: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None):
+        self.store = store
+        self.run_id = run_id
+        self.resolve_workers = max(1, resolve_workers)
+        self.resolve_chunk = max(1, resolve_chunk)
+        self.render_workers = max(1, render_workers or os.cpu_count() or 1)
+        self.save_workers = max(1, save_workers)
+        self.refresh = refresh
+        self.offline = offline
+        self.on_job = on_job
+
+        run = store.get_run(run_id)
+        if run is None:
+            raise ValueError(f"Lot {run_id} introuvable")
+        self.output_dir = Path(run['output_dir'])
+
+        self._progress_lock = threading.Lock()
+        self._finished: Deque[float] = deque(maxlen=ETA_WINDOW)
+        self._counts = {DONE: 0, FAILED: 0}
+        self._remaining = 0
+
+    def _report(self, job: Dict[str, Any], status: str, **fields):
+        """Met à jour l'avancement en mémoire et notifie on_job."""
+        with self._progress_lock:
+            self._counts[status] += 1
+            self._remaining -= 1
+            self._finished.append(time.time())
+            rate = estimate_rate(list(self._finished))
+            progress = {
+                **self._counts,
+                'remaining': self._remaining,
+                'rate': rate,
+                'eta_s': round(self._remaining / rate, 1) if rate and self._remaining else None,
+            }
+        metrics.incr('jobs_total', status=status)
+        if self.on_job:
+            self.on_job({**job, 'status': status, **fields}, progress)
+
+    def _fail(self, job: Dict[str, Any], stage: str, error: str):
+        self.store.fail(job['id'], stage, error)
+        self._report(job, FAILED, failed_stage=stage, error=error)
+
+    def _resolve_stage(self, resolved: "queue.Queue[Optional[Tuple[Dict[str, Any], Societe]]]"):
+        """Thread de résolution : alimente la file des travaux à rendre."""
+        from .scraper import resolve_many
+
+        try:
+            # Travaux résolus lors d'une exécution précédente
+            for job in self.store.jobs(self.run_id, RESOLVED):
+                resolved.put((job, Societe(**json.loads(job['societe']))))
+
+            while True:
+                chunk = self.store.claim(self.run_id, self.resolve_chunk)
+                if not chunk:
+                    break
+                try:
+                    with metrics.timer('job_resolve'), redirect_stdout(io.StringIO()):
+                        outcomes = resolve_many([job['party'] for job in chunk], refresh=self.refresh,
+                                                offline=self.offline, workers=self.resolve_workers)
+                except Exception as e:
+                    # Échec du paquet entier : reprenable, quelle que soit l'exception
+                    for job in chunk:
+                        self._fail(job, 'resolve', str(e) or type(e).__name__)
+                    continue
+
+                for job in chunk:
+                    outcome = outcomes.get(job['party'])
+                    if isinstance(outcome, Societe):
+                        self.store.resolved(job['id'], outcome)
+                        resolved.put((job, outcome))
+                    else:
+                        self._fail(job, resolve_failure_stage(outcome), str(outcome))
+        finally:
+            resolved.put(None)
+
+    def _save(self, job: Dict[str, Any], partie2: Societe, content: bytes, config: Dict[str, Any]) -> str:
+        from .generator import contract_filename
+
+        self.store.set_status(job['id'], SAVING)
+        with metrics.timer('job_save'):
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            output_path = self.output_dir / contract_filename(job['template'], partie2, job['variant'], config)
+            tmp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, output_path)
+        self.store.done(job['id'], str(output_path))
+        return str(output_path)
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Exécute les travaux non terminés du lot.
+
+        Returns:
+            Avancement final (JobStore.progress) avec duration_s
+        """
+        from .generator import load_template_config
+
+        start = time.perf_counter()
+        self.store.recover(self.run_id)
+        progress = self.store.progress(self.run_id)
+        # Avancement de tout le lot, exécutions précédentes comprises
+        self._counts = {DONE: progress[DONE], FAILED: progress[FAILED]}
+        self._remaining = progress['remaining']
+        # Configuration de chaque type de contrat du lot, chargée une fois
+        configs: Dict[str, Dict[str, Any]] = {}
+
+        in_flight = threading.BoundedSemaphore(2 * self.render_workers)
+        resolved: "queue.Queue[Optional[Tuple[Dict[str, Any], Societe]]]" = queue.Queue(maxsize=4 * self.render_workers)
+        resolver = threading.Thread(target=self._resolve_stage, args=(resolved,), name='jobs-resolve', daemon=True)
+
+        def saved(job: Dict[str, Any], future: Future):
+            in_flight.release()
+            try:
+                self._report(job, DONE, output=future.result())
+            except Exception as e:
+                self._fail(job, 'save', str(e))
+
+        def rendered(job: Dict[str, Any], partie2: Societe, config: Dict[str, Any], future: Future):
+            try:
+                content = future.result()
+            except Exception as e:
+                in_flight.release()
+                self._fail(job, 'render', str(e) or type(e).__name__)
+                return
+            save_pool.submit(self._save, job, partie2, content, config).add_done_callback(
+                lambda f: saved(job, f))
+
+        resolver.start()
+        with ThreadPoolExecutor(max_workers=self.save_workers, thread_name_prefix='jobs-save') as save_pool:
+            with ProcessPoolExecutor(max_workers=self.render_workers) as render_pool:
+                while True:
+                    item = resolved.get()
+                    if item is None:
+                        break
+                    job, partie2 = item
+                    in_flight.acquire()
+                    self.store.set_status(job['id'], RENDERING)
+                    try:
+                        if job['template'] not in configs:
+                            configs[job['template']] = load_template_config(job['template'])
+                        config = configs[job['template']]
+                        future = render_pool.submit(_render_job, job['template'], partie2, job['variant'])
+                    except Exception as e:
+                        # Pool cassé (worker tué), template supprimé : le travail reste reprenable avec retry
+                        in_flight.release()
+                        self._fail(job, 'render', str(e) or type(e).__name__)
+                        continue
+                    future.add_done_callback(
+                        lambda f, job=job, partie2=partie2, config=config: rendered(job, partie2, config, f))
+            # Sortie du pool de rendu : tous les rendus sont terminés et leurs écritures soumises
+        resolver.join()
+
+        progress = self.store.progress(self.run_id)
+        progress['duration_s'] = round(time.perf_counter() - start, 2)
+        return progress
+
+
+_job_store: Optional[JobStore] = None
+
+
+def get_job_store() -> JobStore:
+    """File de travaux configurée dans config/settings.yaml (jobs.path)."""
+    global _job_store
+
+    if _job_store is None:
+        _job_store = JobStore(resolve_path(get_setting('jobs', 'path', '.cache/jobs.sqlite')))
+    return _job_store
+
+
+def get_job_runner(run_id: int, refresh: bool = False, offline: bool = False,
+                   on_job: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None) -> JobRunner:
+    """Exécuteur avec les limites de concurrence de config/settings.yaml (section jobs)."""
+    return JobRunner(
+        get_job_store(), run_id,
+        resolve_workers=int(get_setting('jobs', 'resolve_workers', 8)),
+        resolve_chunk=int(get_setting('jobs', 'resolve_chunk', 50)),
+        render_workers=int(get_setting('jobs', 'render_workers', 0)) or None,
+        save_workers=int(get_setting('jobs', 'save_workers', 2)),
+        refresh=refresh,
+        offline=offline,
+        on_job=on_job,
+    )
@@ -0,0 +1,114 @@
+# Tables de correspondance SIRENE : catégories juridiques INSEE et greffes des tribunaux de commerce
+
+import csv
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Tuple
+
+from .settings import get_setting, resolve_path
+
+# Tables livrées avec le projet (CSV « ; », première ligne de commentaire : « # version: ... »)
+DATA_DIR = Path(__file__).parent / "data"
+CATEGORIES_PATH = DATA_DIR / "categories_juridiques.csv"
+GREFFES_PATH = DATA_DIR / "greffes.csv"
+
+NON_RENSEIGNE = "Non renseigné"
+
+# Valeur d'un département à plusieurs greffes : seul le code commune fait foi
+PAR_COMMUNE = "*"
+
+_VERSION = re.compile(r'#\s*version:\s*([^;\n]+)')
+
+
+def read_table(path: Path, value_column: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Lit une table code -> valeur.
+
+    Returns:
+        (version déclarée dans l'en-tête, {code: valeur})
+
+    Raises:
+        FileNotFoundError: fichier absent
+        ValueError: colonne code ou value_column absente
+    """
+    version, lines = '', []
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for line in f:
+            if line.startswith('#'):
+                match = _VERSION.match(line)
+                if match and not version:
+                    version = match.group(1).strip()
+                continue
+            lines.append(line)
+
+    reader = csv.DictReader(lines, delimiter=';')
+    missing = [c for c in ('code', value_column) if c not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"{path}: colonne(s) manquante(s): {', '.join(missing)}")
+    return version, {row['code'].strip(): row[value_column].strip() for row in reader if row['code']}
+
+
+@lru_cache(maxsize=1)
+def categories_juridiques() -> Tuple[str, Dict[str, str]]:
+    """Catégories juridiques INSEE (niveau III) -> libellé pour les contrats, chargées une fois."""
+    return read_table(CATEGORIES_PATH, 'libelle')
+
+
+@lru_cache(maxsize=1)
+def greffes() -> Tuple[str, Dict[str, str]]:
+    """
+    Code département ou code commune INSEE -> greffe, chargé une fois.
+
+    lookups.greffes_path permet de remplacer la table livrée par un
+    fichier plus complet au même format.
+    """
+    configured = get_setting('lookups', 'greffes_path')
+    return read_table(resolve_path(configured) if configured else GREFFES_PATH, 'greffe')
+
+
+def forme_juridique_label(code: str) -> str:
+    """Libellé de la forme juridique (« Code XXXX » si le code est inconnu)."""
+    code = (code or '').strip()
+    if not code:
+        return NON_RENSEIGNE
+    return categories_juridiques()[1].get(code) or f"Code {code}"
+
+
+def departement(code_commune: str) -> str:
+    """Département d'un code commune INSEE (2A/2B pour la Corse, 3 caractères outre-mer)."""
+    return code_commune[:3] if code_commune.startswith('97') else code_commune[:2]
+
+
+def greffe_for_commune(code_commune: str) -> str:
+    """
+    Ville du greffe compétent pour une commune : entrée propre à la
+    commune, sinon greffe du département s'il est le seul. « Non renseigné »
+    si le code est absent ou inconnu, ou si la commune n'est pas listée dans
+    un département à plusieurs greffes (PAR_COMMUNE), plutôt qu'une ville
+    fausse : les variantes qui reprennent ville_rcs refusent alors le
+    contrat (ContractRenderer.check_complete).
+    """
+    code_commune = (code_commune or '').strip()
+    if not code_commune:
+        return NON_RENSEIGNE
+    table = greffes()[1]
+    greffe = table.get(code_commune) or table.get(departement(code_commune))
+    if not greffe or greffe == PAR_COMMUNE:
+        return NON_RENSEIGNE
+    return greffe
+
+
+def lookups_version() -> str:
+    """Version combinée des tables (invalide les fiches construites avec d'anciennes tables)."""
+    return f"categories:{categories_juridiques()[0]},greffes:{greffes()[0]}"
+
+
+if __name__ == "__main__":
+    # Résumé des tables chargées
+    for name, (version, table) in (('categories_juridiques', categories_juridiques()), ('greffes', greffes())):
+        print(f"📚 {name}: {len(table)} entrées (version {version or '?'})")
+    for code in ('5499', '5599', '5710', '5720'):
+        print(f"   {code} -> {forme_juridique_label(code)}")
+    for code in ('92026', '78586', '13001', '13055', '13047', '2A004', '97411'):
+        print(f"   {code} -> {greffe_for_commune(code)}")
@@ -0,0 +1,181 @@
+# Instrumentation : chronos par étape et compteurs (cache, API, remplacements)
+
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Optional, TextIO, Tuple
+
+# Libellé d'un compteur : (nom, ((clé, valeur), ...))
+CounterKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+# Ordre d'affichage des étapes dans le récapitulatif --profile
+STAGE_ORDER = (
+    'resolve', 'sirene_api', 'stock_lookup', 'template_parse', 'render_copy',
+    'replace', 'save', 'generate',
+)
+
+
+class Metrics:
+    """
+    Registre de métriques d'un processus.
+
+    - timer(stage) : durée cumulée, nombre d'appels et maximum par étape ;
+    - incr(nom, **labels) : compteurs étiquetés (ex. statut HTTP) ;
+    - snapshot()/merge() : agrégation des workers d'un pool de processus.
+
+    Si un journal est ouvert (open_log), chaque étape chronométrée y est
+    écrite en JSON (une ligne par événement).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timers: Dict[str, Dict[str, float]] = {}
+        self._counters: Dict[CounterKey, float] = {}
+        self._log: Optional[TextIO] = None
+
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+
+    def open_log(self, path: str):
+        """Active le journal JSON structuré (JSONL, ajout en fin de fichier)."""
+        self._log = open(path, 'a', encoding='utf-8')
+
+    def close_log(self):
+        if self._log:
+            self._log.close()
+            self._log = None
+
+    def _write_log(self, event: Dict[str, Any]):
+        if self._log:
+            event = {'ts': datetime.now().isoformat(timespec='milliseconds'), **event}
+            with self._lock:
+                self._log.write(json.dumps(event, ensure_ascii=False) + "\n")
+                self._log.flush()
+
+    def observe(self, stage: str, seconds: float, **fields):
+        """Enregistre une durée pour une étape."""
+        with self._lock:
+            timer = self._timers.setdefault(stage, {'count': 0, 'total_s': 0.0, 'max_s': 0.0})
+            timer['count'] += 1
+            timer['total_s'] += seconds
+            timer['max_s'] = max(timer['max_s'], seconds)
+        if self._log:
+            self._write_log({'event': 'stage', 'stage': stage, 'duration_ms': round(seconds * 1000, 3), **fields})
+
+    @contextmanager
+    def timer(self, stage: str, **fields):
+        """Chronomètre le bloc et l'enregistre sous `stage` (même en cas d'exception)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **fields)
+
+    def timed(self, stage: str):
+        """Décorateur : chronomètre chaque appel de la fonction sous `stage`."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def incr(self, name: str, value: float = 1, **labels):
+        """Incrémente un compteur étiqueté."""
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """État sérialisable (JSON, pickle) des métriques."""
+        with self._lock:
+            return {
+                'timers': {stage: dict(timer) for stage, timer in self._timers.items()},
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+            }
+
+    def merge(self, snapshot: Dict[str, Any]):
+        """Ajoute les métriques d'un autre processus (snapshot)."""
+        with self._lock:
+            for stage, other in snapshot.get('timers', {}).items():
+                timer = self._timers.setdefault(stage, {'count': 0, 'total_s': 0.0, 'max_s': 0.0})
+                timer['count'] += other['count']
+                timer['total_s'] += other['total_s']
+                timer['max_s'] = max(timer['max_s'], other['max_s'])
+            for counter in snapshot.get('counters', []):
+                key = (counter['name'], tuple(sorted(counter['labels'].items())))
+                self._counters[key] = self._counters.get(key, 0) + counter['value']
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self, prefix: str = 'contract_generator') -> str:
+        """Export au format texte Prometheus."""
+        snapshot = self.snapshot()
+        lines = []
+
+        if snapshot['timers']:
+            name = f"{prefix}_stage_seconds"
+            lines.append(f"# HELP {name} Durée des étapes de génération")
+            lines.append(f"# TYPE {name} summary")
+            for stage, timer in sorted(snapshot['timers'].items()):
+                lines.append(f'{name}_count{{stage="{stage}"}} {timer["count"]}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {timer["total_s"]:.6f}')
+
+        declared = set()
+        for counter in snapshot['counters']:
+            name = f"{prefix}_{counter['name']}"
+            if name not in declared:
+                lines.append(f"# TYPE {name} counter")
+                declared.add(name)
+            labels = ','.join(f'{k}="{_escape_label(v)}"' for k, v in counter['labels'].items())
+            lines.append(f"{name}{{{labels}}} {counter['value']:g}" if labels else f"{name} {counter['value']:g}")
+
+        return "\n".join(lines) + "\n"
+
+    def format_report(self) -> str:
+        """Récapitulatif lisible par étape (option --profile)."""
+        snapshot = self.snapshot()
+        timers = snapshot['timers']
+        stages = [s for s in STAGE_ORDER if s in timers] + sorted(s for s in timers if s not in STAGE_ORDER)
+
+        lines = ["⏱️  Temps par étape:",
+                 f"   {'étape':<16}{'appels':>8}{'total (ms)':>14}{'moyenne (ms)':>15}{'max (ms)':>12}"]
+        for stage in stages:
+            timer = timers[stage]
+            lines.append(
+                f"   {stage:<16}{timer['count']:>8}{timer['total_s'] * 1000:>14.1f}"
+                f"{timer['total_s'] * 1000 / timer['count']:>15.2f}{timer['max_s'] * 1000:>12.2f}"
+            )
+
+        if snapshot['counters']:
+            lines.append("📈 Compteurs:")
+            for counter in snapshot['counters']:
+                labels = ', '.join(f"{k}={v}" for k, v in counter['labels'].items())
+                label_text = f" ({labels})" if labels else ''
+                lines.append(f"   {counter['name']}{label_text}: {counter['value']:g}")
+
+        return "\n".join(lines)
+
+    def write(self, path: str):
+        """Écrit les métriques : format Prometheus si le fichier finit par .prom, JSON sinon."""
+        content = self.to_prometheus() if path.endswith('.prom') else self.to_json()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Registre du processus courant
+metrics = Metrics()
@@ -1,12 +1,31 @@
 # Modèles de données pour les contrats et entreprises
 
+import sys
 from dataclasses import dataclass
 from typing import Optional
 
+# Champs à faible cardinalité (quelques centaines de valeurs) : une seule
+# copie de chaque valeur en mémoire, partagée par toutes les sociétés. Capital
+# et adresse, presque propres à chaque société, ne sont pas internés : la
+# table des chaînes internées grossirait sans jamais être partagée
+INTERNED_FIELDS = ('forme_juridique', 'ville_rcs', 'representant_fonction')
+
 
 @dataclass
 class Societe:
-    """Modèle de données pour une société."""
+    """
+    Modèle de données pour une société.
+
+    Sans __dict__ par instance (__slots__) et avec les champs répétitifs
+    internés : des centaines de milliers de sociétés en mémoire (cache,
+    batch) ne paient leurs valeurs communes qu'une fois. Pour des volumes
+    plus importants, voir SocieteTable (src/societe_table.py).
+    """
+    __slots__ = (
+        'siren', 'raison_sociale', 'forme_juridique', 'capital', 'adresse',
+        'ville_rcs', 'representant_nom', 'representant_fonction',
+    )
+
     siren: str
     raison_sociale: str
     forme_juridique: str
@@ -16,5 +35,18 @@ class Societe:
     representant_nom: str
     representant_fonction: str
 
+    def __post_init__(self):
+        for name in INTERNED_FIELDS:
+            value = getattr(self, name)
+            if type(value) is str:
+                setattr(self, name, sys.intern(value))
+
     def __str__(self) -> str:
         return f"{self.raison_sociale} (SIREN: {self.siren})"
+
+
+@dataclass
+class Dirigeant:
+    """Représentant légal d'une société (signataire du contrat)."""
+    nom: str
+    fonction: str
@@ -0,0 +1,633 @@
+# Index local des raisons sociales : recherche approchée d'une société par son nom
+
+import argparse
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .metrics import metrics
+from .settings import get_setting, resolve_path
+
+# Mentions de forme juridique ignorées dans les noms (« NEXANS SA » = « NEXANS »)
+FORMES_IGNOREES = frozenset({
+    'sa', 'sas', 'sasu', 'sarl', 'eurl', 'sci', 'snc', 'selarl', 'selas', 'scop', 'scp', 'gie',
+})
+
+# Candidats lus par requête SQL, puis classés par distance d'édition
+CANDIDATES = 200
+# Recherche approchée : candidats lus par requête, puis candidats (partageant le
+# plus de trigrammes avec le nom cherché) dont la distance est calculée
+FUZZY_LIMIT = 400
+FUZZY_CANDIDATES = 50
+# Noms lus par requête FTS5 (deux fautes) : un jeu de trigrammes qui en trouve
+# davantage est trop peu sélectif pour que le bon nom y soit en tête
+MATCH_LIMIT = 200
+# Trigrammes (les plus rares) combinés dans une requête FTS5
+MATCH_TRIGRAMS = 2
+# Trigrammes présents dans plus de noms : trop coûteux à intersecter (la liste
+# entière est parcourue), écartés de la requête tant qu'il en reste un plus rare
+MATCH_MAX_DOCS = 10_000
+# Longueur des clés de la table words (texte à partir de chaque début de mot) :
+# couvre les variantes à une faute des noms cherchés avec une faute tolérée
+WORD_KEY_LENGTH = 12
+# Caractères des noms normalisés (variantes à une faute)
+NAME_ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789 '
+
+# Lignes insérées par transaction pendant la construction
+INSERT_CHUNK = 50_000
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def normalize_name(name: str) -> str:
+    """
+    Forme de comparaison d'un nom : minuscules sans accents, ponctuation
+    remplacée par des espaces, mentions de forme juridique retirées.
+    """
+    text = name or ''
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    text = text.lower()
+    words = _NON_ALNUM.sub(' ', text.replace('&', ' et ')).split()
+    kept = [word for word in words if word not in FORMES_IGNOREES]
+    return ' '.join(kept or words)
+
+
+# Peu de communes distinctes : leur forme normalisée est mémorisée
+_normalize_commune = lru_cache(maxsize=65536)(normalize_name)
+
+
+def commune_of(adresse: str) -> str:
+    """Commune d'une adresse de fiche (« Courbevoie (France) », « 12 rue X, 92400 Courbevoie »)."""
+    adresse = (adresse or '').strip()
+    if adresse.endswith('(France)'):
+        adresse = adresse[:-len('(France)')].strip()
+    if adresse == 'Non renseigné':
+        return ''
+    commune = adresse.rsplit(',', 1)[-1].strip()
+    return re.sub(r'^\d{5}\s+', '', commune)
+
+
+def max_distance_for(query: str) -> int:
+    """
+    Fautes tolérées selon la longueur du nom cherché (à deux fautes, la
+    recherche approchée découpe le nom en quatre morceaux d'au moins 3
+    caractères).
+    """
+    if len(query) < 4:
+        return 0
+    return 1 if len(query) < 12 else 2
+
+
+def _word_starts(name: str) -> List[int]:
+    return [0] + [m.end() for m in re.finditer(' ', name)]
+
+
+def word_keys(name: str) -> Set[str]:
+    """Clés d'un nom normalisé dans la table words : le texte à partir de chaque début de mot, tronqué."""
+    return {name[start:start + WORD_KEY_LENGTH] for start in _word_starts(name)}
+
+
+def edit_variants(text: str) -> Set[str]:
+    """
+    Textes à une faute de text (substitution, suppression, insertion) : un
+    nom est à une faute de text si l'un de ses mots commence par l'une de
+    ces variantes (ou par text lui-même).
+    """
+    variants = set()
+    for i in range(len(text)):
+        variants.add(text[:i] + text[i + 1:])
+        for char in NAME_ALPHABET:
+            variants.add(text[:i] + char + text[i + 1:])
+            variants.add(text[:i] + char + text[i:])
+    variants.discard(text)
+    variants.discard('')
+    return variants
+
+
+def _prefix_distance(query: str, text: str, max_distance: int) -> int:
+    """
+    Distance d'édition entre query et le préfixe de text le plus proche
+    (max_distance + 1 au-delà). Seule la bande |i - j| <= max_distance de
+    la matrice est calculée.
+    """
+    text = text[:len(query) + max_distance]
+    size, beyond = len(text), max_distance + 1
+    previous = [j if j <= max_distance else beyond for j in range(size + 1)]
+    for i, query_char in enumerate(query, 1):
+        low, high = max(1, i - max_distance), min(size, i + max_distance)
+        current = [beyond] * (size + 1)
+        if i <= max_distance:
+            current[0] = i
+        for j in range(low, high + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (query_char != text[j - 1]))
+        if min(current[low - 1:high + 1]) > max_distance:
+            return beyond
+        previous = current
+    return min(min(previous[max(0, len(query) - max_distance):]), beyond)
+
+
+def name_distance(query: str, name: str, max_distance: int) -> int:
+    """
+    Distance entre le nom cherché et un nom indexé (formes normalisées) :
+    le nom cherché est comparé au début de chacun des mots du nom indexé,
+    « nexans » est donc à 0 de « nexans » comme de « groupe nexans france ».
+    """
+    starts = _word_starts(name)
+    if any(name.startswith(query, start) for start in starts):
+        return 0
+    best = max_distance + 1
+    for start in starts:
+        best = min(best, _prefix_distance(query, name[start:], best - 1))
+        if best <= 1:
+            break
+    return best
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _fuzzy_trigram_sets(query: str, max_distance: int) -> List[Set[str]]:
+    """
+    Ensembles de trigrammes dont l'un au moins est intact dans un nom à
+    max_distance fautes de query : query est découpé en max_distance + 2
+    morceaux ; pour chaque choix de max_distance morceaux (ceux qui
+    portent les fautes), les trigrammes des deux morceaux restants. Deux
+    morceaux intacts, même courts, donnent une requête sélective : le
+    plafond de candidats n'écarte pas le bon nom.
+    """
+    count = max_distance + 2
+    size = len(query) // count
+    spans = [(i * size, (i + 1) * size if i < count - 1 else len(query)) for i in range(count)]
+    sets = []
+    for damaged in combinations(spans, max_distance):
+        terms = {query[i:i + 3] for i in range(len(query) - 2)
+                 if not any(i < end and i + 3 > start for start, end in damaged)}
+        if terms:
+            sets.append(terms)
+    return sets
+
+
+@dataclass
+class NameMatch:
+    """Société trouvée par son nom."""
+    siren: str
+    raison_sociale: str
+    commune: str
+    source: str
+    distance: int
+
+    def __str__(self) -> str:
+        commune = f", {self.commune}" if self.commune else ''
+        return f"{self.raison_sociale} (SIREN: {self.siren[:3]} {self.siren[3:6]} {self.siren[6:]}{commune})"
+
+
+class NameIndex:
+    """
+    Index SQLite des raisons sociales (fichier stock SIRENE et cache des
+    sociétés).
+
+    Les noms normalisés sont indexés par ordre alphabétique, par début de
+    mot (table `words` : le texte à partir de chaque mot, tronqué à
+    WORD_KEY_LENGTH) et en trigrammes (FTS5, tokenizer trigram). Une
+    recherche interroge le nom exact et les noms dont un mot commence par
+    le nom cherché (B-tree). S'il n'est pas trouvé tel quel :
+
+    - une faute tolérée (noms de moins de 12 caractères) : toutes les
+      variantes à une faute du nom sont cherchées en début de mot, en une
+      requête (json_each) ; aucun nom à une faute n'est manqué ;
+    - deux fautes : les trigrammes que deux fautes laisseraient intacts
+      (deux morceaux sur quatre) sont cherchés dans l'index FTS5, en
+      retenant les plus rares (table `trigrams` : nombre de noms par
+      trigramme, calculé à la construction).
+
+    Les candidats sont classés par distance d'édition, en quelques
+    millisecondes sur plusieurs millions de noms.
+
+    build reconstruit tout l'index (fichier temporaire remplacé
+    atomiquement) ; sync_cache y ajoute les fiches du cache des sociétés
+    enregistrées depuis la dernière synchronisation.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    @staticmethod
+    def _create_tables(conn: sqlite3.Connection):
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS names (
+                siren INTEGER PRIMARY KEY,
+                raison_sociale TEXT NOT NULL,
+                nom TEXT NOT NULL,
+                commune TEXT NOT NULL,
+                commune_key TEXT NOT NULL,
+                source TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS words (
+                key TEXT NOT NULL,
+                siren INTEGER NOT NULL,
+                PRIMARY KEY (key, siren)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS trigrams (term TEXT PRIMARY KEY, doc INTEGER NOT NULL) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+
+    @staticmethod
+    def _create_indexes(conn: sqlite3.Connection):
+        # Index texte tenu à jour par triggers (UPSERT -> trigger UPDATE). names_nom
+        # est créé après : présent pendant un 'rebuild', il ferait lire les noms dans
+        # l'ordre alphabétique et non dans celui des rowid (plusieurs fois plus lent)
+        conn.executescript("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS names_fts USING fts5(
+                nom, content='names', content_rowid='siren', tokenize='trigram', detail='none'
+            );
+            CREATE TRIGGER IF NOT EXISTS names_ai AFTER INSERT ON names BEGIN
+                INSERT INTO names_fts (rowid, nom) VALUES (new.siren, new.nom);
+            END;
+            CREATE TRIGGER IF NOT EXISTS names_ad AFTER DELETE ON names BEGIN
+                INSERT INTO names_fts (names_fts, rowid, nom) VALUES ('delete', old.siren, old.nom);
+            END;
+            CREATE TRIGGER IF NOT EXISTS names_au AFTER UPDATE ON names BEGIN
+                INSERT INTO names_fts (names_fts, rowid, nom) VALUES ('delete', old.siren, old.nom);
+                INSERT INTO names_fts (rowid, nom) VALUES (new.siren, new.nom);
+            END;
+        """)
+
+    @staticmethod
+    def _create_name_index(conn: sqlite3.Connection):
+        conn.execute("CREATE INDEX IF NOT EXISTS names_nom ON names (nom)")
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._create_tables(conn)
+            self._create_indexes(conn)
+            self._create_name_index(conn)
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'words'").fetchone() is None:
+                # Index construit avant la table words : elle est remplie une fois
+                self._index_words(conn)
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def _row(siren: str, raison_sociale: str, commune: str, source: str) -> tuple:
+        return (int(siren.replace(' ', '')), raison_sociale, normalize_name(raison_sociale),
+                commune, _normalize_commune(commune), source)
+
+    _UPSERT = (
+        "INSERT INTO names (siren, raison_sociale, nom, commune, commune_key, source) VALUES (?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (siren) DO UPDATE SET raison_sociale = excluded.raison_sociale, nom = excluded.nom, "
+        "commune = excluded.commune, commune_key = excluded.commune_key, source = excluded.source"
+    )
+
+    @staticmethod
+    def _index_words(conn: sqlite3.Connection):
+        """Remplit la table words depuis names (insertion triée : B-tree écrit dans l'ordre)."""
+        conn.execute("DELETE FROM words")
+        conn.execute("CREATE TEMP TABLE new_words (key TEXT, siren INTEGER)")
+        chunk = []
+        for siren, nom in conn.execute("SELECT siren, nom FROM names"):
+            chunk.extend((key, siren) for key in word_keys(nom))
+            if len(chunk) >= INSERT_CHUNK:
+                conn.executemany("INSERT INTO temp.new_words VALUES (?, ?)", chunk)
+                chunk = []
+        conn.executemany("INSERT INTO temp.new_words VALUES (?, ?)", chunk)
+        conn.execute("INSERT INTO words SELECT key, siren FROM temp.new_words ORDER BY key, siren")
+        conn.execute("DROP TABLE temp.new_words")
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('words', '1')")
+
+    def _upsert(self, conn: sqlite3.Connection, rows: List[tuple]):
+        """Ajoute ou remplace des noms, et leurs clés dans words."""
+        stale = []
+        for row in rows:
+            for (nom,) in conn.execute("SELECT nom FROM names WHERE siren = ?", (row[0],)):
+                stale.extend((key, row[0]) for key in word_keys(nom))
+        conn.executemany("DELETE FROM words WHERE key = ? AND siren = ?", stale)
+        conn.executemany(self._UPSERT, rows)
+        conn.executemany("INSERT OR IGNORE INTO words VALUES (?, ?)",
+                         [(key, row[0]) for row in rows for key in word_keys(row[2])])
+
+    def build(self, rows: Iterable[Tuple[str, str, str, str]], cache=None) -> int:
+        """
+        Reconstruit l'index.
+
+        Args:
+            rows: (siren, raison sociale, commune, source), par exemple
+                les unités légales actives du fichier stock
+            cache: CompanyCache dont les fiches complètent et remplacent
+                les lignes (commune du siège connue)
+
+        Returns:
+            Nombre de noms indexés
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+        conn = sqlite3.connect(str(tmp_path))
+        try:
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._create_tables(conn)
+
+            chunk = []
+            for siren, raison_sociale, commune, source in rows:
+                if raison_sociale:
+                    chunk.append(self._row(siren, raison_sociale, commune, source))
+                if len(chunk) >= INSERT_CHUNK:
+                    conn.executemany("INSERT OR REPLACE INTO names VALUES (?, ?, ?, ?, ?, ?)", chunk)
+                    chunk = []
+            conn.executemany("INSERT OR REPLACE INTO names VALUES (?, ?, ?, ?, ?, ?)", chunk)
+            conn.commit()
+
+            # Index texte construit en une fois, triggers ensuite
+            self._create_indexes(conn)
+            conn.execute("INSERT INTO names_fts (names_fts) VALUES ('rebuild')")
+            self._index_words(conn)
+            self._create_name_index(conn)
+            conn.execute("CREATE VIRTUAL TABLE temp.vocab USING fts5vocab(main, names_fts, 'row')")
+            conn.execute("INSERT INTO trigrams SELECT term, doc FROM temp.vocab")
+            conn.commit()
+            self._sync_cache(conn, cache)
+            count = conn.execute("SELECT COUNT(*) FROM names").fetchone()[0]
+        finally:
+            conn.close()
+
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            for suffix in ('-wal', '-shm'):
+                stale = self.path.with_name(self.path.name + suffix)
+                if stale.exists():
+                    stale.unlink()
+            os.replace(tmp_path, self.path)
+        return count
+
+    def _sync_cache(self, conn: sqlite3.Connection, cache) -> int:
+        from .scraper import TEST_DATA
+
+        added = 0
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        if 'test_data' not in meta:
+            # Sociétés de test : toujours trouvables par leur nom
+            self._upsert(conn, [
+                self._row(siren, societe.raison_sociale, commune_of(societe.adresse), 'test')
+                for siren, societe in TEST_DATA.items()
+            ])
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('test_data', '1')")
+            added += len(TEST_DATA)
+
+        if cache is not None:
+            since = float(meta.get('cache_synced_at') or 0)
+            rows = []
+            for siren, societe, fetched_at in cache.found_since(since):
+                if societe.raison_sociale:
+                    rows.append(self._row(siren, societe.raison_sociale, commune_of(societe.adresse), 'cache'))
+                since = fetched_at
+            if rows:
+                self._upsert(conn, rows)
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('cache_synced_at', ?)", (repr(since),))
+                added += len(rows)
+        if added:
+            conn.commit()
+        return added
+
+    def sync_cache(self, cache) -> int:
+        """
+        Ajoute les fiches du cache des sociétés enregistrées depuis la
+        dernière synchronisation (aucune si le cache n'a pas grandi).
+
+        Returns:
+            Nombre de noms ajoutés ou mis à jour
+        """
+        with self._lock:
+            return self._sync_cache(self._connection(), cache)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM names").fetchone()[0]
+
+    def _match_expression(self, conn: sqlite3.Connection, trigrams: Set[str]) -> Optional[str]:
+        """Requête FTS5 sur les plus rares des trigrammes (None s'il n'y en a aucun)."""
+        terms = sorted(trigrams)
+        if not terms:
+            return None
+        counts = dict(conn.execute(
+            f"SELECT term, doc FROM trigrams WHERE term IN ({', '.join('?' * len(terms))})", terms))
+        # Trigramme inconnu des statistiques : absent de l'index, ou ajouté depuis la
+        # construction (cache) ; dans les deux cas le plus sélectif
+        terms.sort(key=lambda term: counts.get(term, 0))
+        rarest = [term for term in terms if counts.get(term, 0) <= MATCH_MAX_DOCS][:MATCH_TRIGRAMS] or terms[:1]
+        return ' AND '.join('"{}"'.format(term.replace('"', '""')) for term in rarest)
+
+    def search(self, query: str, commune: Optional[str] = None, limit: int = 10) -> List[NameMatch]:
+        """
+        Sociétés dont le nom ressemble à query, les plus proches d'abord
+        (distance d'édition, puis nom exact, puis longueur la plus proche).
+
+        Args:
+            commune: ne garder que les sociétés de cette commune (les noms
+                venant du seul fichier stock, sans commune, sont exclus)
+        """
+        query = normalize_name(query)
+        if not query:
+            return []
+        max_distance = max_distance_for(query)
+        commune_key = _normalize_commune(commune) if commune else ''
+
+        where, params = '', []
+        if commune_key:
+            # « Paris » correspond aussi à « PARIS 8 »
+            where, params = " AND (n.commune_key = ? OR n.commune_key LIKE ?)", [commune_key, commune_key + ' %']
+
+        # Candidats : {siren: nom normalisé}
+        candidates: Dict[int, str] = {}
+        with metrics.timer('name_search'), self._lock:
+            conn = self._connection()
+
+            def select(sql: str, args: list, limit: int = CANDIDATES) -> List[int]:
+                found = {}
+                if None not in args:
+                    # Un nom peut être lu plusieurs fois (plusieurs mots ou variantes)
+                    found = dict(conn.execute(sql + where + f" LIMIT {limit}", args + params))
+                    candidates.update(found)
+                return list(found)
+
+            key = query[:WORD_KEY_LENGTH]
+            select("SELECT n.siren, n.nom FROM names n WHERE n.nom = ?", [query])
+            # Un mot du nom commence par le nom cherché (clé tronquée : texte complet vérifié)
+            select("SELECT n.siren, n.nom FROM words w JOIN names n ON n.siren = w.siren "
+                   "WHERE w.key >= ? AND w.key < ? AND instr(n.nom, ?) > 0", [key, key + '~', query])
+
+            scored = [(0, siren) for siren, nom in candidates.items() if name_distance(query, nom, 0) == 0]
+            if max_distance and not scored:
+                # Un mot commence par une variante à une faute (et aucun par le nom
+                # cherché, sinon scored ne serait pas vide) : distance 1. Au-delà de
+                # WORD_KEY_LENGTH, les clés ne comparent que le début du nom
+                variants = {variant[:WORD_KEY_LENGTH] for variant in edit_variants(query[:WORD_KEY_LENGTH + 1])}
+                found = select("SELECT n.siren, n.nom FROM json_each(?) v JOIN words w ON w.key >= v.value "
+                               "AND w.key < v.value || '~' JOIN names n ON n.siren = w.siren WHERE 1",
+                               [json.dumps(sorted(variants))], FUZZY_LIMIT)
+                scored = [(1, siren) for siren in found
+                          if len(query) <= WORD_KEY_LENGTH or name_distance(query, candidates[siren], 1) == 1]
+            if max_distance > 1 and not scored:
+                # Noms contenant les trigrammes intacts d'un choix de morceaux : identifiants
+                # lus dans l'index FTS5 (plafonnés par requête), noms lus une fois pour tous
+                rowids = set()
+                for expression in {self._match_expression(conn, trigrams)
+                                   for trigrams in _fuzzy_trigram_sets(query, max_distance)} - {None}:
+                    rowids.update(rowid for (rowid,) in conn.execute(
+                        f"SELECT rowid FROM names_fts WHERE names_fts MATCH ? LIMIT {MATCH_LIMIT}", [expression]))
+                select("SELECT n.siren, n.nom FROM json_each(?) r JOIN names n ON n.siren = r.value WHERE 1",
+                       [json.dumps(sorted(rowids))], len(rowids))
+
+                # Une faute touche au plus 3 trigrammes : les candidats qui en partagent
+                # trop peu avec le nom cherché sont écartés avant le calcul de distance
+                query_trigrams = _trigrams(query)
+                minimum = len(query_trigrams) - 3 * max_distance
+                shared = [(sum([term in nom for term in query_trigrams]), siren, nom)
+                          for siren, nom in candidates.items()]
+                shared = sorted((item for item in shared if item[0] >= minimum), reverse=True)
+                for _, siren, nom in shared[:FUZZY_CANDIDATES]:
+                    distance = name_distance(query, nom, max_distance)
+                    if distance <= max_distance:
+                        scored.append((distance, siren))
+
+            scored.sort(key=lambda item: (item[0], candidates[item[1]] != query,
+                                          abs(len(candidates[item[1]]) - len(query)), item[1]))
+            scored = scored[:limit]
+            details = {row[0]: row for row in conn.execute(
+                f"SELECT siren, raison_sociale, commune, source FROM names "
+                f"WHERE siren IN ({', '.join('?' * len(scored))})", [siren for _, siren in scored])}
+
+        metrics.incr('name_searches_total', result='found' if scored else 'none')
+        return [
+            NameMatch(siren=f"{siren:09d}", raison_sociale=details[siren][1], commune=details[siren][2],
+                      source=details[siren][3], distance=distance)
+            for distance, siren in scored
+        ]
+
+
+def stock_rows(stock_path: Path) -> Iterable[Tuple[str, str, str, str]]:
+    """Unités légales actives de l'index stock (src/stock_index.py), sans commune."""
+    conn = sqlite3.connect(f"file:{stock_path}?mode=ro", uri=True)
+    try:
+        for siren, denomination in conn.execute(
+                "SELECT siren, denomination FROM unites_legales WHERE etat != 'C'"):
+            yield f"{siren:09d}", denomination or '', '', 'stock'
+    finally:
+        conn.close()
+
+
+_name_index: Optional[NameIndex] = None
+
+
+def get_name_index() -> NameIndex:
+    """Index configuré dans config/settings.yaml (names.path)."""
+    global _name_index
+
+    if _name_index is None:
+        _name_index = NameIndex(resolve_path(get_setting('names', 'path', '.cache/names.sqlite')))
+    return _name_index
+
+
+def rebuild_name_index() -> int:
+    """Reconstruit l'index des noms depuis l'index stock (s'il existe) et le cache des sociétés."""
+    from .cache import get_company_cache
+    from .stock_index import get_stock_index
+
+    stock = get_stock_index()
+    return get_name_index().build(stock_rows(stock.path) if stock else [], cache=get_company_cache())
+
+
+def search_companies(query: str, commune: Optional[str] = None, limit: int = 10) -> List[NameMatch]:
+    """Recherche dans l'index des noms, après y avoir ajouté les nouvelles fiches du cache."""
+    from .cache import get_company_cache
+
+    index = get_name_index()
+    index.sync_cache(get_company_cache())
+    return index.search(query, commune=commune, limit=limit)
+
+
+def _synthetic_names(rows: int, seed: int = 42) -> Iterable[Tuple[str, str, str, str]]:
+    """Raisons sociales plausibles (mots inventés + suffixes courants)."""
+    rng = random.Random(seed)
+    syllables = [c + v for c in 'bcdfghjklmnprstvxz' for v in 'aeiouy'] + ['an', 'on', 'in', 'or', 'ex', 'al']
+    words = [''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))).upper() for _ in range(30000)]
+    suffixes = ['', '', '', 'FRANCE', 'CONSEIL', 'SERVICES', 'HOLDING', 'IMMOBILIER', 'TRANSPORTS', 'GROUPE', 'SAS']
+    communes = ['Paris', 'Lyon', 'Marseille', 'Nanterre', 'Courbevoie', 'Lille', '']
+    for i in range(rows):
+        name = ' '.join([rng.choice(words) for _ in range(rng.randint(1, 2))] + [rng.choice(suffixes)]).strip()
+        yield f"{100000000 + i * 7:09d}", name, rng.choice(communes), 'stock'
+
+
+def _bench(rows: int, queries: int = 1000):
+    """Mesure construction et recherches (exactes, préfixes, avec une faute) sur des noms synthétiques."""
+    import resource
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = NameIndex(Path(tmp) / 'names.sqlite')
+        print(f"🧪 Index synthétique: {rows:,} raisons sociales".replace(',', ' '))
+        start = time.perf_counter()
+        count = index.build(_synthetic_names(rows))
+        print(f"   Construction: {count:,} noms en {time.perf_counter() - start:.1f} s, "
+              f"{index.path.stat().st_size / 1e6:.0f} Mo".replace(',', ' '))
+
+        rng = random.Random(1)
+        names = [name for _, name, _, _ in _synthetic_names(rows) if rng.random() < queries / rows][:queries]
+
+        def typo(name: str) -> str:
+            word = max(name.split(), key=len)
+            i = len(word) // 2
+            return name.replace(word, word[:i] + ('E' if word[i] != 'E' else 'A') + word[i + 1:], 1)
+
+        cases = {
+            'nom exact': names,
+            'premier mot': [name.split()[0] for name in names],
+            'une faute': [typo(name) for name in names],
+            'commune': names,
+        }
+        for label, texts in cases.items():
+            durations, found = [], 0
+            for text in texts:
+                start = time.perf_counter()
+                matches = index.search(text, commune='Paris' if label == 'commune' else None)
+                durations.append((time.perf_counter() - start) * 1000)
+                found += bool(matches)
+            durations.sort()
+            print(f"   {label}: p50 {durations[len(durations) // 2]:.2f} ms, "
+                  f"p99 {durations[int(len(durations) * 0.99)]:.2f} ms, {found}/{len(texts)} avec résultat")
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"   RSS max: {peak_mb:.0f} Mo")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index local des raisons sociales")
+    parser.add_argument('--bench', type=int, metavar='NOMS',
+                        help='Benchmark sur NOMS raisons sociales synthétiques')
+    parser.add_argument('--queries', type=int, default=1000, help='Nombre de recherches par cas')
+    args = parser.parse_args()
+
+    _bench(args.bench or 1_000_000, args.queries)
@@ -0,0 +1,178 @@
+# Stockage adressé par contenu des contrats générés (régénération incrémentale)
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from .metrics import metrics
+from .models import Societe
+from .settings import get_setting, resolve_path
+
+# Version du rendu : à incrémenter quand le code de génération change
+# (remplacements, signatures...) pour invalider les fichiers déjà stockés
+RENDER_VERSION = 1
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class OutputStore:
+    """
+    Contrats déjà rendus, indexés par l'empreinte de leurs entrées.
+
+    La clé est le SHA-256 des octets du template, de la configuration de
+    la variante et des champs de la Societe résolue : si aucun ne change,
+    le DOCX stocké est réutilisé (lien physique vers le fichier de sortie)
+    au lieu d'être régénéré.
+
+    Disposition sur disque :
+    - objects/<2 premiers caractères>/<clé>.docx : fichiers rendus ;
+    - manifest.jsonl : clé -> empreinte du fichier, taille, SIREN, variante.
+
+    L'empreinte du fichier est revérifiée avant chaque réutilisation : un
+    fichier de sortie modifié sur place (il partage l'inode de l'objet)
+    n'est jamais resservi, il est régénéré.
+
+    Utilisable depuis plusieurs processus (pool du mode batch) : les
+    objets sont écrits par renommage atomique et le manifest en ajout.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.manifest_path = self.root / "manifest.jsonl"
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._manifest_offset = 0
+        # (chemin, mtime, taille) -> SHA-256 des octets du template
+        self._template_digests: Dict[Tuple[str, int, int], str] = {}
+
+    def _template_digest(self, template_path: Path) -> str:
+        stat = template_path.stat()
+        signature = (str(template_path), stat.st_mtime_ns, stat.st_size)
+        digest = self._template_digests.get(signature)
+        if digest is None:
+            digest = _sha256_file(template_path)
+            self._template_digests[signature] = digest
+        return digest
+
+    def key(self, template_path: Path, variant_config: Dict[str, Any], partie2: Societe,
+            renderer: str = 'docx') -> str:
+        """Empreinte des entrées du rendu (moteur, template, variante, société)."""
+        payload = json.dumps({
+            'render_version': RENDER_VERSION,
+            'renderer': renderer,
+            'template': self._template_digest(Path(template_path)),
+            'variant': variant_config,
+            'societe': asdict(partie2),
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def object_path(self, key: str) -> Path:
+        return self.objects_dir / key[:2] / f"{key}.docx"
+
+    def _refresh_entries(self):
+        """Lit les entrées ajoutées au manifest depuis la dernière lecture (autres processus)."""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                f.seek(self._manifest_offset)
+                for line in f:
+                    if not line.endswith("\n"):
+                        # Ligne en cours d'écriture par un autre processus
+                        break
+                    self._manifest_offset += len(line.encode('utf-8'))
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._entries[entry['key']] = entry
+        except FileNotFoundError:
+            pass
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """Fichier déjà rendu pour cette clé, None s'il est absent ou altéré."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._refresh_entries()
+                entry = self._entries.get(key)
+
+        path = self.object_path(key)
+        if entry is None or not path.exists():
+            metrics.incr('output_store_total', result='miss')
+            return None
+
+        if path.stat().st_size != entry['size'] or _sha256_file(path) != entry['digest']:
+            metrics.incr('output_store_total', result='corrupt')
+            return None
+
+        metrics.incr('output_store_total', result='hit')
+        return path
+
+    def put(self, key: str, content: bytes, **fields) -> Path:
+        """Stocke un contrat rendu et l'enregistre dans le manifest."""
+        path = self.object_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Nouvel inode : les liens vers un ancien objet altéré ne sont pas touchés
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+        entry = {
+            'key': key,
+            'digest': hashlib.sha256(content).hexdigest(),
+            'size': len(content),
+            'created_at': time.time(),
+            **fields,
+        }
+        with self._lock:
+            with open(self.manifest_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._entries[key] = entry
+        return path
+
+    @staticmethod
+    def link(object_path: Path, dest: Path):
+        """
+        Place le fichier stocké à `dest` par lien physique (copie si le
+        système de fichiers ne le permet pas), en remplaçant l'existant.
+        """
+        dest = Path(dest)
+        try:
+            if os.path.samefile(object_path, dest):
+                return
+        except FileNotFoundError:
+            pass
+
+        tmp_dest = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            os.link(object_path, tmp_dest)
+        except OSError:
+            # Autre système de fichiers, lien non supporté...
+            shutil.copyfile(object_path, tmp_dest)
+        os.replace(tmp_dest, dest)
+
+
+_output_store: Optional[OutputStore] = None
+
+
+def get_output_store() -> OutputStore:
+    """Stockage configuré dans config/settings.yaml (output_store.path)."""
+    global _output_store
+
+    if _output_store is None:
+        _output_store = OutputStore(resolve_path(get_setting('output_store', 'path', '.cache/outputs')))
+    return _output_store
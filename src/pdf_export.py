@@ -0,0 +1,231 @@
+# Export PDF des contrats générés : conversion par lots avec LibreOffice headless
+
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .metrics import metrics
+from .settings import get_setting, resolve_path
+
+# Exécutables LibreOffice recherchés dans le PATH
+SOFFICE_NAMES = ('soffice', 'libreoffice')
+
+
+class PdfExportError(RuntimeError):
+    """Conversion PDF impossible (LibreOffice absent, lot en échec...)."""
+
+
+def find_soffice(configured: Optional[str] = None) -> str:
+    """
+    Chemin de l'exécutable LibreOffice (pdf.soffice, sinon recherche dans le PATH).
+
+    Raises:
+        PdfExportError: LibreOffice introuvable
+    """
+    candidates = [configured] if configured else list(SOFFICE_NAMES)
+    for candidate in candidates:
+        path = shutil.which(candidate)
+        if path:
+            return path
+    raise PdfExportError(
+        "LibreOffice introuvable (soffice) : installer libreoffice-writer "
+        "ou renseigner pdf.soffice dans config/settings.yaml"
+    )
+
+
+class PdfExporter:
+    """
+    Conversion DOCX -> PDF par lots avec LibreOffice headless.
+
+    Les documents soumis sont regroupés en lots (batch_size) : chaque lot
+    est converti par un seul appel `soffice --convert-to pdf f1 f2 ...`,
+    le démarrage de LibreOffice est donc payé une fois par lot et non par
+    fichier. Aucune instance n'est gardée entre deux lots : chaque lot
+    lance son propre soffice, qui se termine avec lui ; au plus `workers`
+    lots sont convertis en même temps. Chaque worker garde son propre
+    profil utilisateur (UserInstallation) d'un lot à l'autre : les
+    instances parallèles ne se bloquent pas entre elles et le profil n'est
+    initialisé qu'au premier lancement.
+
+    Le PDF est écrit à côté du DOCX (ou dans output_dir), via un répertoire
+    temporaire : un PDF d'une exécution précédente n'est jamais pris pour
+    le résultat du lot. Un appel soffice convertissant tout le lot, aucune
+    durée n'est mesurée par document : chaque résultat porte la durée du
+    lot (batch_ms) et sa part amortie (amortized_ms = batch_ms / taille du
+    lot, démarrage compris).
+
+    Fonctionne entièrement hors ligne.
+    """
+
+    def __init__(self, workers: int = 2, batch_size: int = 20, timeout: float = 300,
+                 soffice: Optional[str] = None, profile_dir: Optional[Path] = None,
+                 on_result: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.soffice = find_soffice(soffice)
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.timeout = timeout
+        self.profile_dir = Path(profile_dir) if profile_dir else Path(tempfile.gettempdir()) / "contract-generator-lo"
+        self.on_result = on_result
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='pdf-export')
+        self._slots: "queue.Queue[int]" = queue.Queue()
+        for slot in range(self.workers):
+            self._slots.put(slot)
+        self._lock = threading.Lock()
+        # Lots en cours de constitution, par répertoire de sortie
+        self._pending: Dict[Path, List[Path]] = {}
+        self._futures: List[Future] = []
+
+    def __enter__(self) -> "PdfExporter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def submit(self, docx_path: str, output_dir: Optional[str] = None):
+        """Ajoute un document à convertir ; le lot part dès qu'il est complet."""
+        source = Path(docx_path).resolve()
+        target_dir = Path(output_dir).resolve() if output_dir else source.parent
+
+        with self._lock:
+            batch = self._pending.setdefault(target_dir, [])
+            if any(path.stem == source.stem for path in batch):
+                # Même nom de PDF dans le lot : le lot courant part d'abord
+                self._dispatch(target_dir)
+                batch = self._pending.setdefault(target_dir, [])
+            batch.append(source)
+            if len(batch) >= self.batch_size:
+                self._dispatch(target_dir)
+
+    def flush(self):
+        """Envoie les lots incomplets."""
+        with self._lock:
+            for target_dir in list(self._pending):
+                self._dispatch(target_dir)
+
+    def close(self) -> List[Dict[str, Any]]:
+        """
+        Convertit les documents restants et attend la fin de tous les lots.
+
+        Returns:
+            Un résultat par document {source, pdf, status, error, batch_size,
+            batch_ms, amortized_ms}, dans l'ordre des lots
+        """
+        self.flush()
+        results = []
+        for future in self._futures:
+            results.extend(future.result())
+        self._executor.shutdown()
+        return results
+
+    def convert(self, docx_paths: List[str], output_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Convertit une liste de documents (soumission puis close)."""
+        for docx_path in docx_paths:
+            self.submit(docx_path, output_dir)
+        return self.close()
+
+    def _dispatch(self, target_dir: Path):
+        batch = self._pending.pop(target_dir, None)
+        if batch:
+            self._futures.append(self._executor.submit(self._run_batch, batch, target_dir))
+
+    def _command(self, slot: int, files: List[Path], outdir: Path) -> List[str]:
+        profile = (self.profile_dir / f"worker-{slot}").resolve()
+        return [
+            self.soffice,
+            f"-env:UserInstallation={profile.as_uri()}",
+            '--headless', '--invisible', '--nologo', '--nodefault', '--norestore', '--nolockcheck',
+            '--convert-to', 'pdf', '--outdir', str(outdir),
+            *(str(path) for path in files),
+        ]
+
+    def _soffice(self, slot: int, files: List[Path], outdir: Path) -> Optional[str]:
+        """Lance LibreOffice sur un lot ; retourne le message d'erreur éventuel."""
+        try:
+            completed = subprocess.run(
+                self._command(slot, files, outdir),
+                capture_output=True, text=True, timeout=self.timeout,
+            )
+        except subprocess.TimeoutExpired:
+            return f"soffice: délai de {self.timeout:.0f} s dépassé"
+        except OSError as e:
+            return f"soffice: {e}"
+        if completed.returncode != 0:
+            return f"soffice (code {completed.returncode}): {completed.stderr.strip()[-500:]}"
+        return None
+
+    def _run_batch(self, files: List[Path], target_dir: Path) -> List[Dict[str, Any]]:
+        results = [
+            {'source': str(source), 'pdf': None, 'status': 'error', 'error': None}
+            for source in files
+        ]
+
+        slot = self._slots.get()
+        start = time.perf_counter()
+        try:
+            target_dir.mkdir(parents=True, exist_ok=True)
+            with tempfile.TemporaryDirectory(prefix='.pdf-', dir=target_dir) as outdir:
+                error = self._soffice(slot, files, Path(outdir))
+                # LibreOffice peut sortir en 0 sans avoir converti un fichier (et inversement)
+                for source, result in zip(files, results):
+                    converted = Path(outdir) / f"{source.stem}.pdf"
+                    if converted.exists():
+                        pdf_path = target_dir / converted.name
+                        os.replace(converted, pdf_path)
+                        result.update(status='ok', pdf=str(pdf_path))
+                    else:
+                        result['error'] = error or "PDF non produit par LibreOffice"
+        except OSError as e:
+            for result in results:
+                if result['status'] != 'ok':
+                    result['error'] = f"Export PDF: {e}"
+        finally:
+            self._slots.put(slot)
+        batch_seconds = time.perf_counter() - start
+
+        metrics.observe('pdf_export', batch_seconds, documents=len(files))
+        for result in results:
+            result['batch_size'] = len(files)
+            result['batch_ms'] = round(batch_seconds * 1000, 1)
+            result['amortized_ms'] = round(batch_seconds * 1000 / len(files), 1)
+            metrics.incr('pdf_documents_total', result=result['status'])
+            if self.on_result:
+                self.on_result(result)
+        return results
+
+
+def get_pdf_exporter(on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> PdfExporter:
+    """
+    Exportateur configuré dans config/settings.yaml (section pdf).
+
+    Raises:
+        PdfExportError: LibreOffice introuvable
+    """
+    return PdfExporter(
+        workers=int(get_setting('pdf', 'workers', 2)),
+        batch_size=int(get_setting('pdf', 'batch_size', 20)),
+        timeout=float(get_setting('pdf', 'timeout', 300)),
+        soffice=get_setting('pdf', 'soffice') or None,
+        profile_dir=resolve_path(get_setting('pdf', 'profile_dir', '.cache/libreoffice')),
+        on_result=on_result,
+    )
+
+
+def format_pdf_result(result: Dict[str, Any]) -> str:
+    """Ligne de log d'un document converti (durée amortie sur son lot)."""
+    if result['status'] == 'ok':
+        return (f"📑 PDF: {result['pdf']} (~{result['amortized_ms']:.0f} ms/document amorti, "
+                f"lot de {result['batch_size']})")
+    return f"❌ PDF: {result['source']}: {result['error']}"
+
+
+def pdf_export_default() -> bool:
+    """Export PDF activé par défaut (defaults.output_format: pdf)."""
+    return str(get_setting('defaults', 'output_format', 'docx')).lower() == 'pdf'
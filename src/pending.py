@@ -0,0 +1,163 @@
+# File d'attente des contrats dont la société n'a pas pu être résolue (option --defer)
+
+import csv
+import json
+import os
+import threading
+import time
+from dataclasses import fields
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .models import Societe
+from .scraper import format_adresse, format_siren
+from .settings import get_setting, resolve_path
+
+# Colonnes du CSV de données manuelles (une ligne par société)
+MANUAL_COLUMNS = tuple(f.name for f in fields(Societe))
+
+
+class PendingQueue:
+    """
+    Contrats mis de côté faute de données sur la société partenaire.
+
+    Fichier JSONL, une entrée par contrat : {siren, party, template,
+    variant, output_dir, reason, parked_at}. Un même contrat (SIREN, type
+    de contrat, variante, répertoire) n'est enregistré qu'une fois. Les entrées sont retirées
+    quand `resume` a généré le contrat à partir des données manuelles.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def entry_key(entry: Dict[str, Any]) -> Tuple[str, str, str, str]:
+        # Entrées antérieures aux autres types de contrats : NDA
+        return entry['siren'], entry.get('template', 'nda'), entry['variant'], entry['output_dir']
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Contrats en attente, dans l'ordre de mise en attente."""
+        entries: Dict[Tuple[str, str, str, str], Dict[str, Any]] = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    entries.setdefault(self.entry_key(entry), entry)
+        except FileNotFoundError:
+            pass
+        return list(entries.values())
+
+    def park(self, siren: str, party: str, variant: str, output_dir: str, reason: str,
+             template: str = 'nda') -> bool:
+        """
+        Met un contrat en attente.
+
+        Returns:
+            False si ce contrat était déjà en attente
+        """
+        entry = {
+            'siren': siren,
+            'party': party,
+            'template': template,
+            'variant': variant,
+            # Chemin absolu : resume peut être lancé depuis un autre répertoire
+            'output_dir': os.path.abspath(output_dir),
+            'reason': reason,
+            'parked_at': time.time(),
+        }
+        with self._lock:
+            if any(self.entry_key(e) == self.entry_key(entry) for e in self.entries()):
+                return False
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return True
+
+    def remove(self, done: List[Dict[str, Any]]):
+        """Retire les contrats générés (réécriture atomique du fichier)."""
+        keys = {self.entry_key(entry) for entry in done}
+        with self._lock:
+            remaining = [entry for entry in self.entries() if self.entry_key(entry) not in keys]
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in remaining:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+
+    def write_template(self, path: str) -> int:
+        """
+        Écrit le CSV à compléter : une ligne par SIREN en attente, colonnes
+        de MANUAL_COLUMNS vides sauf siren.
+
+        Returns:
+            Nombre de sociétés à compléter
+        """
+        sirens = list(dict.fromkeys(entry['siren'] for entry in self.entries()))
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=MANUAL_COLUMNS, delimiter=';')
+            writer.writeheader()
+            for siren in sirens:
+                writer.writerow({'siren': siren})
+        return len(sirens)
+
+
+def read_manual_data(path: str) -> Tuple[Dict[str, Societe], List[str]]:
+    """
+    Lit le CSV de données manuelles (séparateur « ; » ou « , », colonnes
+    de MANUAL_COLUMNS). L'adresse (ville) est complétée comme en saisie
+    interactive : « Courbevoie » devient « Courbevoie (France) ».
+
+    Returns:
+        ({SIREN sans espaces: Societe}, erreurs par ligne incomplète)
+
+    Raises:
+        FileNotFoundError: fichier absent
+        ValueError: colonnes manquantes
+    """
+    societes: Dict[str, Societe] = {}
+    errors: List[str] = []
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        header = f.readline()
+        f.seek(0)
+        reader = csv.DictReader(f, delimiter=';' if ';' in header else ',')
+        missing = [c for c in MANUAL_COLUMNS if c not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"{path}: colonne(s) manquante(s): {', '.join(missing)}")
+
+        # Ligne 1 = en-tête
+        for line_number, record in enumerate(reader, start=2):
+            values = {column: (record.get(column) or '').strip() for column in MANUAL_COLUMNS}
+            siren = values['siren'].replace(' ', '')
+            empty = [column for column, value in values.items() if not value]
+            if empty:
+                # Ligne du modèle pas encore remplie : la société reste en attente
+                if len(empty) < len(MANUAL_COLUMNS) - 1:
+                    errors.append(f"ligne {line_number} ({siren or '?'}): champ(s) vide(s): {', '.join(empty)}")
+                continue
+            if len(siren) != 9 or not siren.isdigit():
+                errors.append(f"ligne {line_number}: SIREN invalide: {values['siren']}")
+                continue
+            values['siren'] = format_siren(siren)
+            # Même forme que la saisie interactive : « Courbevoie (France) »
+            values['adresse'] = format_adresse(values['adresse'])
+            societes[siren] = Societe(**values)
+    return societes, errors
+
+
+_pending_queue: Optional[PendingQueue] = None
+
+
+def get_pending_queue(path: Optional[str] = None) -> PendingQueue:
+    """File configurée dans config/settings.yaml (pending.path), ou le fichier indiqué."""
+    global _pending_queue
+
+    if path:
+        return PendingQueue(Path(path))
+    if _pending_queue is None:
+        _pending_queue = PendingQueue(resolve_path(get_setting('pending', 'path', '.cache/pending.jsonl')))
+    return _pending_queue
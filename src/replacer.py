@@ -0,0 +1,232 @@
+# Moteur de remplacement multi-motifs en une seule passe
+
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+from .metrics import metrics
+
+# Éléments WordprocessingML des runs (w:r)
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_T = f"{_W}t"
+_XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+
+def child_text(child) -> str:
+    """Texte d'un enfant de w:r, avec les mêmes équivalences que python-docx (CT_R.text)."""
+    tag = child.tag
+    if tag == _T:
+        return child.text or ''
+    if tag in (f"{_W}tab", f"{_W}ptab"):
+        return '\t'
+    if tag == f"{_W}br":
+        return '\n' if child.get(f"{_W}type", 'textWrapping') == 'textWrapping' else ''
+    if tag == f"{_W}cr":
+        return '\n'
+    if tag == f"{_W}noBreakHyphen":
+        return '-'
+    return ''
+
+
+def run_text(r) -> str:
+    """Texte d'un w:r (équivalent de CT_R.text)."""
+    return ''.join(child_text(child) for child in r)
+
+
+_BREAKS = re.compile(r'([\t\r\n])')
+
+
+def _fill_t(t, text: str):
+    t.text = text
+    if len(text.strip()) < len(text):
+        t.set(_XML_SPACE, 'preserve')
+
+
+def _set_t(t, text: str):
+    """
+    Réécrit un w:t ; supprimé s'il devient vide. Tabulations et sauts de
+    ligne du texte deviennent des w:tab et w:br, comme avec CT_R.text.
+    """
+    if not _BREAKS.search(text):
+        if text:
+            _fill_t(t, text)
+        else:
+            t.getparent().remove(t)
+        return
+
+    for piece in _BREAKS.split(text):
+        if not piece:
+            continue
+        if piece == '\t':
+            t.addprevious(t.makeelement(f"{_W}tab", {}))
+        elif piece in '\r\n':
+            t.addprevious(t.makeelement(f"{_W}br", {}))
+        else:
+            new_t = t.makeelement(_T, {})
+            _fill_t(new_t, piece)
+            t.addprevious(new_t)
+    t.getparent().remove(t)
+
+
+class ReplacementEngine:
+    """
+    Applique une table de remplacements en une seule passe par paragraphe.
+
+    Toutes les clés sont combinées dans une alternance regex ; à position
+    égale, la première clé de la table est prioritaire. Le texte des runs
+    est joint une fois par paragraphe, ce qui permet de remplacer des
+    placeholders coupés sur plusieurs runs : le texte de remplacement est
+    placé dans le w:t où commence le placeholder (dont le run donne le
+    formatage) et les caractères restants sont retirés des w:t suivants.
+    Un texte déjà remplacé n'est jamais réexaminé.
+
+    Seuls les nœuds w:t touchés par un placeholder sont réécrits : les
+    autres enfants des runs (champs w:fldChar/w:instrText, images,
+    tabulations, sauts de ligne...) restent en place, sauf une tabulation
+    ou un saut de ligne faisant partie d'un placeholder.
+    """
+
+    def __init__(self, replacements: Dict[str, str]):
+        self.replacements = {old: new for old, new in replacements.items() if old}
+        if self.replacements:
+            self.pattern = re.compile('|'.join(re.escape(old) for old in self.replacements))
+        else:
+            self.pattern = None
+
+    def bind(self, replacements: Dict[str, str]) -> "ReplacementEngine":
+        """
+        Moteur de même motif avec d'autres valeurs (mêmes clés, même ordre).
+
+        Le motif n'est pas recompilé : une table déclarée est compilée une
+        fois et liée aux valeurs de chaque société.
+        """
+        engine = ReplacementEngine.__new__(ReplacementEngine)
+        engine.replacements = replacements
+        engine.pattern = self.pattern
+        return engine
+
+    def matches(self, text: str) -> bool:
+        """Indique si le texte contient au moins une clé."""
+        return self.pattern is not None and self.pattern.search(text) is not None
+
+    def apply_to_runs(self, runs) -> Dict[str, int]:
+        """
+        Applique les remplacements à une séquence de runs (éléments w:r).
+
+        Seuls les w:t dont le texte change sont réécrits.
+
+        Returns:
+            Nombre de remplacements effectués par clé
+        """
+        counts: Dict[str, int] = {}
+        if self.pattern is None or not runs:
+            return counts
+
+        # Enfants porteurs de texte dans l'ordre du paragraphe, et leur position dans le texte joint
+        segments: List[Tuple[object, str]] = []
+        starts: List[int] = []
+        position = 0
+        for run in runs:
+            for child in run:
+                text = child_text(child)
+                if text:
+                    segments.append((child, text))
+                    starts.append(position)
+                    position += len(text)
+
+        joined = ''.join(text for _, text in segments)
+        matches = list(self.pattern.finditer(joined))
+        if not matches:
+            return counts
+
+        # w:t qui reçoit le remplacement : le premier touché par le placeholder
+        targets = []
+        for match in matches:
+            first = bisect_right(starts, match.start()) - 1
+            target = first
+            while target < len(segments) and starts[target] < match.end() and segments[target][0].tag != _T:
+                target += 1
+            if target < len(segments) and starts[target] < match.end():
+                targets.append(target)
+            else:
+                # Placeholder sans w:t (tabulation seule...) : nouveau w:t avant son premier élément
+                element = segments[first][0]
+                t = element.makeelement(_T, {})
+                element.addprevious(t)
+                _set_t(t, self.replacements[match.group(0)])
+                targets.append(None)
+            counts[match.group(0)] = counts.get(match.group(0), 0) + 1
+
+        index = 0
+        for i, (element, text) in enumerate(segments):
+            start = starts[i]
+            end = start + len(text)
+            while index < len(matches) and matches[index].end() <= start:
+                index += 1
+            if index == len(matches) or matches[index].start() >= end:
+                continue
+
+            if element.tag != _T:
+                # Tabulation, saut de ligne... compris dans un placeholder
+                element.getparent().remove(element)
+                continue
+
+            pieces = []
+            cursor = start
+            for j in range(index, len(matches)):
+                match = matches[j]
+                if match.start() >= end:
+                    break
+                if match.start() > cursor:
+                    pieces.append(joined[cursor:match.start()])
+                if targets[j] == i:
+                    pieces.append(self.replacements[match.group(0)])
+                cursor = max(cursor, min(match.end(), end))
+            if cursor < end:
+                pieces.append(joined[cursor:end])
+
+            new_text = ''.join(pieces)
+            if new_text != text:
+                _set_t(element, new_text)
+
+        return counts
+
+    def apply_to_paragraph(self, paragraph) -> Dict[str, int]:
+        """Applique les remplacements à un paragraphe python-docx."""
+        return self.apply_to_runs(paragraph._p.r_lst)
+
+
+@lru_cache(maxsize=256)
+def _compile(items: Tuple[Tuple[str, str], ...]) -> ReplacementEngine:
+    return ReplacementEngine(dict(items))
+
+
+def compile_replacements(replacements: Dict[str, str]) -> ReplacementEngine:
+    """Retourne le moteur compilé pour cette table (mis en cache)."""
+    return _compile(tuple(replacements.items()))
+
+
+def merge_counts(total: Dict[str, int], counts: Dict[str, int]):
+    """Ajoute des compteurs de remplacements à un total."""
+    for key, count in counts.items():
+        total[key] = total.get(key, 0) + count
+
+
+def record_replacements(engine: ReplacementEngine, counts: Dict[str, int]):
+    """
+    Compte les remplacements appliqués par clé (métriques).
+
+    Les clés sans occurrence sont comptées à 0 : un placeholder absent du
+    template reste visible dans les métriques.
+    """
+    for key in engine.replacements:
+        metrics.incr('replacements_total', counts.get(key, 0), key=key)
+
+
+def apply_to_paragraphs(engine: ReplacementEngine, paragraphs: Iterable) -> Dict[str, int]:
+    """Applique le moteur à une suite de paragraphes python-docx."""
+    total: Dict[str, int] = {}
+    for paragraph in paragraphs:
+        merge_counts(total, engine.apply_to_paragraph(paragraph))
+    return total
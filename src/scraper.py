@@ -1,9 +1,45 @@
 # Module pour récupérer les informations d'entreprise via API SIRENE (INSEE)
 
 import re
-import requests
-from typing import Optional
-from .models import Societe
+from concurrent.futures import Future
+from dataclasses import replace
+from typing import Any, Dict, List, Optional, Tuple, Union
+from .cache import HIT, NEGATIVE, get_company_cache
+from .dirigeants import get_dirigeant_resolver
+from .lookups import NON_RENSEIGNE, forme_juridique_label, greffe_for_commune
+from .metrics import metrics
+from .models import Dirigeant, Societe
+from .settings import get_setting
+from .stock_index import get_stock_index
+
+# requests et le client SIRENE (.sirene_client) sont importés à la demande :
+# une société servie par les données de test, le cache ou l'index stock ne
+# paie pas leur import
+
+class SocieteNotFoundError(ValueError):
+    """Aucune source n'a fourni la société (contrat à mettre en attente avec --defer)."""
+
+    def __init__(self, siren: str, message: str):
+        super().__init__(message)
+        self.siren = siren
+
+
+class AmbiguousNameError(ValueError):
+    """Plusieurs sociétés correspondent à la raison sociale donnée à la place d'un SIREN."""
+
+    def __init__(self, name: str, matches: list):
+        listing = '; '.join(str(match) for match in matches)
+        super().__init__(f"Plusieurs sociétés correspondent à « {name} » : {listing} (préciser le SIREN)")
+        self.name = name
+        self.matches = matches
+
+
+# Sociétés proposées quand une raison sociale est ambiguë
+NAME_CANDIDATES = 5
+
+# Représentant d'une fiche SIRENE (l'API ne fournit pas les dirigeants)
+REPRESENTANT_NON_DISPONIBLE = "Non disponible (API SIRENE)"
+FONCTION_NON_DISPONIBLE = "Non disponible"
 
 
 def format_capital(capital_value: float) -> str:
@@ -23,6 +59,14 @@ def format_siren(siren: str) -> str:
     return siren
 
 
+def format_adresse(commune: str) -> str:
+    """Adresse du siège telle qu'écrite dans les contrats : « Courbevoie (France) »."""
+    commune = commune.strip()
+    if commune.endswith('(France)'):
+        return commune
+    return f"{commune} (France)"
+
+
 def extract_siren_from_url(url: str) -> Optional[str]:
     """Extrait le SIREN d'une URL Pappers."""
     # Format: https://www.pappers.fr/entreprise/nom-entreprise-123456789
@@ -32,40 +76,94 @@ def extract_siren_from_url(url: str) -> Optional[str]:
     return None
 
 
+# Données de test pour FR Digital et Nexans
+TEST_DATA = {
+    "901995308": Societe(
+        siren="901 995 308",
+        raison_sociale="FR DIGITAL",
+        forme_juridique="Société par actions simplifiée unipersonnelle",
+        capital="5 000 €",
+        adresse="Sartrouville (France)",
+        ville_rcs="Versailles",
+        representant_nom="Frédéric Ramet",
+        representant_fonction="Président"
+    ),
+    "393525852": Societe(
+        siren="393 525 852",
+        raison_sociale="NEXANS",
+        forme_juridique="Société anonyme",
+        capital="44 551 877 €",
+        adresse="Courbevoie (France)",
+        ville_rcs="Nanterre",
+        representant_nom="Christopher Guérin",
+        representant_fonction="Directeur Général"
+    )
+}
+
+
 def get_test_data(siren: str) -> Optional[Societe]:
     """Données de test pour FR Digital et Nexans."""
-    test_data = {
-        "901995308": Societe(
-            siren="901 995 308",
-            raison_sociale="FR DIGITAL",
-            forme_juridique="Société par actions simplifiée unipersonnelle",
-            capital="5 000 €",
-            adresse="Sartrouville (France)",
-            ville_rcs="Versailles",
-            representant_nom="Frédéric Ramet",
-            representant_fonction="Président"
-        ),
-        "393525852": Societe(
-            siren="393 525 852",
-            raison_sociale="NEXANS",
-            forme_juridique="Société anonyme",
-            capital="44 551 877 €",
-            adresse="Courbevoie (France)",
-            ville_rcs="Nanterre",
-            representant_nom="Christopher Guérin",
-            representant_fonction="Directeur Général"
-        )
-    }
+    return TEST_DATA.get(siren.replace(' ', ''))
+
 
-    siren_clean = siren.replace(' ', '')
-    return test_data.get(siren_clean)
+def societe_from_unite_legale(unite_legale: Dict[str, Any], siren: str) -> Societe:
+    """
+    Construit une Societe à partir d'une unité légale de l'API SIRENE.
+
+    Raises:
+        KeyError, ValueError, TypeError: données SIRENE inattendues
+    """
+    # L'API SIRENE retourne une structure complexe
+    periode = unite_legale.get('periodesUniteLegale', [{}])[0]
+
+    # Extraire les données
+    raison_sociale = (
+        periode.get('denominationUniteLegale', '') or
+        periode.get('denominationUsuelle1UniteLegale', '') or
+        ''
+    )
+
+    # Libellé complet depuis la table INSEE (src/data/categories_juridiques.csv)
+    forme_juridique_nom = forme_juridique_label(periode.get('categorieJuridiqueUniteLegale', ''))
+
+    # Capital social
+    capital_raw = periode.get('capitalVariable', '') or periode.get('montantCapitalUniteLegale')
+    capital = format_capital(float(capital_raw)) if capital_raw else NON_RENSEIGNE
+
+    # Adresse du siège
+    adresse_siege = unite_legale.get('adresseEtablissement', {})
+    commune = adresse_siege.get('libelleCommuneEtablissement', '')
+    adresse = format_adresse(commune) if commune else NON_RENSEIGNE
+
+    # RCS : greffe compétent pour la commune du siège (src/data/greffes.csv)
+    ville_rcs = greffe_for_commune(adresse_siege.get('codeCommuneEtablissement', ''))
+
+    return Societe(
+        siren=format_siren(siren),
+        raison_sociale=raison_sociale,
+        forme_juridique=forme_juridique_nom,
+        capital=capital,
+        adresse=adresse,
+        ville_rcs=ville_rcs,
+        representant_nom=REPRESENTANT_NON_DISPONIBLE,
+        representant_fonction=FONCTION_NON_DISPONIBLE
+    )
 
 
 def fetch_from_sirene_api(siren: str) -> Optional[Societe]:
     """
     Récupère les données d'une société depuis l'API SIRENE v3.11 (INSEE).
 
-    Note: L'API SIRENE requiert une clé API gratuite.
+    Voir query_sirene_api pour le détail (code HTTP inclus).
+    """
+    return query_sirene_api(siren)[0]
+
+
+def query_sirene_api(siren: str) -> Tuple[Optional[Societe], Optional[int]]:
+    """
+    Interroge l'API SIRENE v3.11 (INSEE) pour un SIREN.
+
+    Note: L'API SIRENE requiert une clé API gratuite (config/settings.yaml > sirene.api_key).
 
     Pour obtenir une clé API:
     1. Se connecter sur https://portail-api.insee.fr/
@@ -75,131 +173,386 @@ def fetch_from_sirene_api(siren: str) -> Optional[Societe]:
 
     Documentation: https://portail-api.insee.fr/ > API Sirene > Documentation
     État du service: https://www.sirene.fr/sirene/public/accueil
+
+    Les requêtes passent par le client partagé (session poolée, quota par
+    minute, reprises sur 429/5xx avec Retry-After).
+
+    Returns:
+        (Societe ou None, code HTTP ou None en cas d'erreur de connexion)
     """
-    # Vérifier si une clé API est configurée (future implémentation)
-    api_key = None  # TODO: Charger depuis config/settings.yaml
+    import requests
+    from .sirene_client import get_sirene_client
 
-    # URL correcte de l'API SIRENE v3.11
-    url = f"https://api.insee.fr/api-sirene/3.11/siren/{siren}"
+    try:
+        status_code, data = get_sirene_client().get_unite_legale(siren)
 
-    headers = {
-        'Accept': 'application/json',
-        'User-Agent': 'Contract-Generator/1.0'
-    }
+        if status_code == 200:
+            societe = societe_from_unite_legale(data.get('uniteLegale', {}), siren)
 
-    # La clé API se transmet dans le header X-INSEE-Api-Key-Integration
-    if api_key:
-        headers['X-INSEE-Api-Key-Integration'] = api_key
+            print(f"✅ Données récupérées depuis l'API SIRENE:")
+            print(f"   Raison sociale: {societe.raison_sociale}")
+            print(f"   Forme juridique: {societe.forme_juridique}")
+            print(f"   Capital: {societe.capital}")
+            print(f"   Adresse: {societe.adresse}")
+            print(f"   SIREN: {societe.siren}")
 
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
+            return societe, status_code
+
+        elif status_code == 403:
+            print(f"⚠️  API SIRENE requiert une clé API (gratuite)")
+            print(f"   Pour l'obtenir: https://portail-api.insee.fr/")
+            return None, status_code
 
-        if response.status_code == 200:
-            data = response.json()
+        elif status_code == 404:
+            print(f"⚠️  SIREN {siren} non trouvé dans la base SIRENE")
+            return None, status_code
 
-            # L'API SIRENE retourne une structure complexe
-            unite_legale = data.get('uniteLegale', {})
-            periode = unite_legale.get('periodesUniteLegale', [{}])[0]
+        elif status_code == 429:
+            print(f"⚠️  Rate limit atteint sur l'API SIRENE (reprises épuisées)")
+            return None, status_code
 
-            # Extraire les données
-            raison_sociale = (
-                periode.get('denominationUniteLegale', '') or
-                periode.get('denominationUsuelle1UniteLegale', '') or
-                ''
-            )
+        else:
+            print(f"⚠️  Erreur API SIRENE: {status_code}")
+            return None, status_code
 
-            forme_juridique = periode.get('categorieJuridiqueUniteLegale', '')
+    except requests.exceptions.RequestException as e:
+        print(f"⚠️  Erreur de connexion à l'API SIRENE: {e}")
+        return None, None
+    except (KeyError, ValueError, TypeError) as e:
+        print(f"⚠️  Erreur de parsing des données SIRENE: {e}")
+        return None, None
 
-            # Mapping des codes de forme juridique vers des noms complets
-            formes_juridiques = {
-                '5499': 'Société par actions simplifiée',
-                '5710': 'Société par actions simplifiée unipersonnelle',
-                '5599': 'Société à responsabilité limitée',
-                '5498': 'Société anonyme',
-            }
-            forme_juridique_nom = formes_juridiques.get(forme_juridique, f"Code {forme_juridique}")
 
-            # Capital social
-            capital_raw = periode.get('capitalVariable', '') or periode.get('montantCapitalUniteLegale')
-            capital = format_capital(float(capital_raw)) if capital_raw else "Non renseigné"
+def fetch_many_from_sirene_api(sirens: List[str], workers: Optional[int] = None
+                               ) -> Dict[str, Tuple[Optional[Societe], Optional[int]]]:
+    """
+    Interroge l'API SIRENE pour plusieurs SIREN.
 
-            # Adresse du siège
-            adresse_siege = unite_legale.get('adresseEtablissement', {})
-            commune = adresse_siege.get('libelleCommuneEtablissement', '')
-            adresse = f"{commune} (France)" if commune else "Non renseigné"
+    Si sirene.bulk est activé, les SIREN sont d'abord regroupés dans des
+    recherches multicritères (q=siren:(A OR B ...), jusqu'à
+    sirene.bulk_chunk_size par requête). Les SIREN absents d'une réponse,
+    ou d'un lot en échec, sont ensuite interrogés un par un, ce qui donne
+    un code HTTP exact (404) pour chacun. Les requêtes partagent la
+    session HTTP et le quota du client.
 
-            # RCS (tribunal)
-            ville_rcs = commune  # Approximation, l'API ne donne pas directement le greffe
+    Returns:
+        {siren: (Societe ou None, code HTTP ou None)}
+    """
+    sirens = list(dict.fromkeys(sirens))
+    results: Dict[str, Tuple[Optional[Societe], Optional[int]]] = {}
+    if not sirens:
+        return results
 
-            siren_formatted = format_siren(siren)
+    from .sirene_client import MAX_SEARCH_RESULTS, get_sirene_client
+    client = get_sirene_client()
 
-            print(f"✅ Données récupérées depuis l'API SIRENE:")
-            print(f"   Raison sociale: {raison_sociale}")
-            print(f"   Forme juridique: {forme_juridique_nom}")
-            print(f"   Capital: {capital}")
-            print(f"   Adresse: {adresse}")
-            print(f"   SIREN: {siren_formatted}")
-
-            return Societe(
-                siren=siren_formatted,
-                raison_sociale=raison_sociale,
-                forme_juridique=forme_juridique_nom,
-                capital=capital,
-                adresse=adresse,
-                ville_rcs=ville_rcs,
-                representant_nom="Non disponible (API SIRENE)",
-                representant_fonction="Non disponible"
-            )
-
-        elif response.status_code == 403:
-            print(f"⚠️  API SIRENE requiert une clé API (gratuite)")
-            print(f"   Pour l'obtenir: https://portail-api.insee.fr/")
-            return None
+    if get_setting('sirene', 'bulk', True) and len(sirens) > 1:
+        chunk_size = min(int(get_setting('sirene', 'bulk_chunk_size', MAX_SEARCH_RESULTS)), MAX_SEARCH_RESULTS)
+        chunks = [sirens[i:i + chunk_size] for i in range(0, len(sirens), chunk_size)]
+        for found in client.map(search_sirene_api, chunks, workers=workers):
+            results.update(found)
 
-        elif response.status_code == 404:
-            print(f"⚠️  SIREN {siren} non trouvé dans la base SIRENE")
-            return None
+    missing = [siren for siren in sirens if siren not in results]
+    for siren, outcome in zip(missing, client.map(query_sirene_api, missing, workers=workers)):
+        results[siren] = outcome
 
-        elif response.status_code == 429:
-            print(f"⚠️  Rate limit atteint sur l'API SIRENE")
-            return None
+    return results
 
-        else:
-            print(f"⚠️  Erreur API SIRENE: {response.status_code}")
-            return None
 
+def search_sirene_api(sirens: List[str]) -> Dict[str, Tuple[Optional[Societe], Optional[int]]]:
+    """
+    Recherche groupée d'un lot de SIREN (une requête API).
+
+    Returns:
+        {siren: (Societe, 200)} pour les unités légales trouvées uniquement
+    """
+    import requests
+    from .sirene_client import get_sirene_client
+
+    found: Dict[str, Tuple[Optional[Societe], Optional[int]]] = {}
+    try:
+        status_code, unites_legales = get_sirene_client().search_unites_legales(sirens)
     except requests.exceptions.RequestException as e:
-        print(f"⚠️  Erreur de connexion à l'API SIRENE: {e}")
+        print(f"⚠️  Erreur de connexion à l'API SIRENE (recherche groupée): {e}")
+        return found
+
+    if status_code not in (200, 404):
+        print(f"⚠️  Recherche groupée SIRENE en échec ({status_code}), repli sur les requêtes unitaires")
+        return found
+
+    wanted = set(sirens)
+    for unite_legale in unites_legales:
+        siren = str(unite_legale.get('siren', ''))
+        if siren not in wanted:
+            continue
+        try:
+            found[siren] = (societe_from_unite_legale(unite_legale, siren), 200)
+        except (KeyError, ValueError, TypeError) as e:
+            print(f"⚠️  Erreur de parsing des données SIRENE ({siren}): {e}")
+
+    print(f"✅ Recherche groupée SIRENE: {len(found)}/{len(sirens)} unité(s) légale(s) trouvée(s)")
+    return found
+
+
+def query_stock_index(siren: str) -> Optional[Societe]:
+    """
+    Recherche un SIREN dans l'index local du fichier stock SIRENE.
+
+    Returns:
+        Societe (sans adresse ni capital, absents du fichier stock) ou None
+        si l'index n'est pas construit ou ne contient pas ce SIREN
+    """
+    index = get_stock_index()
+    if index is None:
         return None
-    except (KeyError, ValueError, TypeError) as e:
-        print(f"⚠️  Erreur de parsing des données SIRENE: {e}")
+    with metrics.timer('stock_lookup'):
+        unite_legale = index.get_unite_legale(siren)
+    metrics.incr('stock_lookups_total', result='hit' if unite_legale else 'miss')
+    if unite_legale is None:
         return None
+    return societe_from_unite_legale(unite_legale, siren)
 
 
-def scrape_pappers(identifier: str) -> Societe:
+def stock_before_api(offline: bool) -> bool:
     """
-    Récupère les informations d'une société.
+    L'index stock passe avant l'API quand celle-ci est inutilisable
+    (mode hors ligne ou pas de clé API) ; sinon il sert de repli, l'API
+    fournissant en plus l'adresse et le capital.
+    """
+    return offline or not get_setting('sirene', 'api_key')
 
-    Sources (dans l'ordre) :
-    1. Données de test (FR Digital, Nexans)
-    2. API SIRENE de l'INSEE (gratuite)
-    3. Saisie manuelle
 
-    Args:
-        identifier: URL Pappers ou SIREN
+def start_dirigeant_lookup(siren: str, refresh: bool = False, offline: bool = False
+                           ) -> Optional["Future[Optional[Dirigeant]]"]:
+    """
+    Lance la recherche du représentant légal en arrière-plan (src/dirigeants.py),
+    None si aucun fournisseur n'est configuré.
+    """
+    resolver = get_dirigeant_resolver()
+    return resolver.submit(siren, refresh=refresh, offline=offline) if resolver else None
 
-    Returns:
-        Objet Societe avec les données
+
+def with_dirigeant(societe: Societe, dirigeant_future: Optional["Future[Optional[Dirigeant]]"]) -> Societe:
+    """
+    Complète une fiche SIRENE avec le représentant trouvé en parallèle.
+
+    Les fiches qui ont déjà un représentant (données de test, saisie
+    manuelle) sont laissées telles quelles.
+    """
+    if dirigeant_future is None or societe.representant_nom != REPRESENTANT_NON_DISPONIBLE:
+        return societe
+    dirigeant = dirigeant_future.result()
+    if dirigeant is None:
+        return societe
+    return replace(societe, representant_nom=dirigeant.nom, representant_fonction=dirigeant.fonction)
+
+
+def siren_from_name(name: str, commune: Optional[str] = None) -> str:
+    """
+    SIREN d'une société désignée par sa raison sociale (index local des
+    noms, src/name_index.py).
+
+    Le nom est retenu s'il désigne une seule société : seule à porter
+    exactement ce nom, ou seule à lui ressembler.
+
+    Raises:
+        AmbiguousNameError: plusieurs sociétés possibles (voir choose_match)
+        ValueError: aucune société de ce nom dans l'index
+    """
+    from .name_index import normalize_name, search_companies
+
+    matches = search_companies(name, commune=commune, limit=NAME_CANDIDATES)
+    if not matches:
+        raise ValueError(f"Aucune société nommée « {name} » dans l'index local "
+                         f"(python -m src.cli search --rebuild, ou indiquer le SIREN)")
+    key = normalize_name(name)
+    exact = [match for match in matches if normalize_name(match.raison_sociale) == key]
+    chosen = exact or matches
+    if len(chosen) > 1:
+        raise AmbiguousNameError(name, chosen)
+    print(f"🔎 « {name} » : {chosen[0]}")
+    return chosen[0].siren
+
+
+def choose_match(error: AmbiguousNameError) -> str:
+    """
+    Fait choisir la société parmi les candidates (terminal interactif).
+
+    Raises:
+        AmbiguousNameError: aucun choix
+    """
+    print(f"\n🔎 Plusieurs sociétés correspondent à « {error.name} » :")
+    for number, match in enumerate(error.matches, start=1):
+        print(f"   {number}. {match}")
+    while True:
+        answer = input("Numéro de la société (vide pour annuler): ").strip()
+        if not answer:
+            raise error
+        if answer.isdigit() and 1 <= int(answer) <= len(error.matches):
+            return error.matches[int(answer) - 1].siren
+
+
+def extract_siren(identifier: str, commune: Optional[str] = None) -> str:
+    """
+    Extrait le SIREN d'un identifiant (URL Pappers, SIREN ou raison sociale).
+
+    Une raison sociale est cherchée dans l'index local des noms
+    (names.resolve dans config/settings.yaml), parmi les sociétés de
+    `commune` si elle est indiquée.
+
+    Raises:
+        ValueError: identifiant invalide, nom inconnu ou ambigu (AmbiguousNameError)
     """
-    # Extraire le SIREN
     if identifier.startswith('http'):
         siren = extract_siren_from_url(identifier)
         if not siren:
             raise ValueError(f"Impossible d'extraire le SIREN de l'URL: {identifier}")
     else:
         siren = identifier.replace(' ', '')
+        if any(c.isalpha() for c in siren) and get_setting('names', 'resolve', True):
+            return siren_from_name(identifier, commune)
         if len(siren) != 9:
             raise ValueError(f"SIREN invalide: {siren} (doit contenir 9 chiffres)")
+    return siren
+
+
+@metrics.timed('resolve')
+def resolve_many(identifiers: List[str], refresh: bool = False, offline: bool = False,
+                 workers: Optional[int] = None) -> Dict[str, Union[Societe, Exception]]:
+    """
+    Résout plusieurs sociétés en une fois, sans saisie manuelle.
+
+    Même ordre de sources que scrape_pappers (test, cache, index stock,
+    API SIRENE) ; chaque SIREN n'est interrogé qu'une fois et les appels API sont
+    parallélisés. Les représentants légaux sont recherchés en même temps
+    que les fiches SIRENE. Utilisé par le mode batch.
+
+    Returns:
+        {identifiant: Societe ou exception expliquant l'échec}
+    """
+    results: Dict[str, Union[Societe, Exception]] = {}
+    pending: Dict[str, List[str]] = {}
+    sirens: Dict[str, str] = {}
+    cache = get_company_cache()
+
+    for identifier in dict.fromkeys(identifiers):
+        try:
+            siren = extract_siren(identifier)
+        except ValueError as e:
+            results[identifier] = e
+            continue
+
+        test_societe = get_test_data(siren)
+        if test_societe:
+            results[identifier] = test_societe
+            continue
+        sirens[identifier] = siren
+
+        if cache and not refresh:
+            cached_status, cached_societe = cache.get(siren)
+            if cached_status == HIT:
+                results[identifier] = cached_societe
+                continue
+            if cached_status == NEGATIVE:
+                results[identifier] = SocieteNotFoundError(siren, f"SIREN {siren} introuvable (cache)")
+                continue
+
+        pending.setdefault(siren, []).append(identifier)
+
+    # Représentants légaux : en parallèle des recherches SIRENE ci-dessous
+    resolver = get_dirigeant_resolver()
+    dirigeants = resolver.submit_many(sirens.values(), refresh=refresh, offline=offline) if resolver else {}
+
+    stock_first = stock_before_api(offline)
+    from_stock: Dict[str, Societe] = {}
+    if stock_first:
+        for siren in pending:
+            stock_societe = query_stock_index(siren)
+            if stock_societe:
+                from_stock[siren] = stock_societe
+
+    if offline:
+        fetched = {}
+    else:
+        fetched = fetch_many_from_sirene_api([s for s in pending if s not in from_stock], workers=workers)
+
+    for siren, siren_identifiers in pending.items():
+        societe, status_code = fetched.get(siren, (None, None))
+        if not societe and not stock_first:
+            # Repli sur l'index stock quand l'API n'a rien donné
+            from_stock[siren] = query_stock_index(siren)
+
+        if from_stock.get(siren):
+            # Source locale : pas d'écriture dans le cache
+            outcome = from_stock[siren]
+        elif societe:
+            if cache:
+                cache.put(siren, societe)
+            outcome = societe
+        else:
+            if status_code == 404 and cache:
+                cache.put_not_found(siren)
+            if offline:
+                outcome = SocieteNotFoundError(siren, f"SIREN {siren} absent du cache et de l'index stock "
+                                                      f"(mode hors ligne)")
+            else:
+                outcome = SocieteNotFoundError(siren, f"Aucune source de données disponible pour le SIREN {siren} "
+                                                      f"(API SIRENE: {status_code or 'erreur de connexion'})")
+        for identifier in siren_identifiers:
+            results[identifier] = outcome
+
+    for identifier, siren in sirens.items():
+        if isinstance(results[identifier], Societe):
+            results[identifier] = with_dirigeant(results[identifier], dirigeants.get(siren))
+
+    return results
+
+
+@metrics.timed('resolve')
+def scrape_pappers(identifier: str, refresh: bool = False, offline: bool = False,
+                   interactive: Optional[bool] = None, commune: Optional[str] = None) -> Societe:
+    """
+    Récupère les informations d'une société.
+
+    Sources (dans l'ordre) :
+    1. Données de test (FR Digital, Nexans)
+    2. Cache local (config/settings.yaml > cache)
+    3. Index local du fichier stock SIRENE, s'il a été construit
+       (avant l'API si celle-ci est inutilisable, sinon en repli)
+    4. API SIRENE de l'INSEE (gratuite)
+    5. Saisie manuelle (terminal interactif uniquement)
+
+    Le représentant légal, absent des données SIRENE, est recherché en
+    parallèle (config/settings.yaml > dirigeants) et complète la fiche.
+
+    Args:
+        identifier: URL Pappers, SIREN ou raison sociale
+        refresh: Ignorer le cache et réinterroger l'API (le cache est mis à jour)
+        offline: Ne jamais appeler l'API (cache, index stock et données de test uniquement)
+        interactive: Proposer la saisie manuelle en dernier recours, et le
+            choix entre homonymes (défaut : si l'entrée standard est un
+            terminal) ; False pour ne jamais bloquer
+        commune: Commune du siège, pour départager les homonymes quand
+            identifier est une raison sociale
+
+    Returns:
+        Objet Societe avec les données
+
+    Raises:
+        SocieteNotFoundError: aucune source disponible et pas de saisie manuelle
+        AmbiguousNameError: raison sociale ambiguë et pas de choix interactif
+    """
+    import sys
+    if interactive is None:
+        interactive = sys.stdin.isatty()
+
+    # Extraire le SIREN
+    try:
+        siren = extract_siren(identifier, commune)
+    except AmbiguousNameError as e:
+        if not interactive:
+            raise
+        siren = choose_match(e)
 
     print(f"📥 Récupération des données pour SIREN {siren}...")
 
@@ -209,36 +562,75 @@ def scrape_pappers(identifier: str) -> Societe:
         print(f"ℹ️  Utilisation des données de test")
         return test_societe
 
-    # 2. Essayer l'API SIRENE
-    print(f"🔍 Recherche dans l'API SIRENE (INSEE)...")
-    sirene_societe = fetch_from_sirene_api(siren)
-    if sirene_societe:
-        return sirene_societe
-
-    # 3. Fallback : erreur ou saisie manuelle
+    # Représentant légal : recherché pendant la résolution de la fiche
+    dirigeant_future = start_dirigeant_lookup(siren, refresh=refresh, offline=offline)
+
+    # 2. Cache local
+    cache = get_company_cache()
+    cached_status = None
+    if cache and not refresh:
+        cached_status, cached_societe = cache.get(siren)
+        if cached_status == HIT:
+            print(f"⚡ Données du cache local")
+            return with_dirigeant(cached_societe, dirigeant_future)
+        if cached_status == NEGATIVE:
+            print(f"ℹ️  SIREN {siren} introuvable lors d'une recherche récente (cache)")
+
+    # 3. Index stock SIRENE (hors réseau)
+    stock_first = stock_before_api(offline)
+    if stock_first:
+        stock_societe = query_stock_index(siren)
+        if stock_societe:
+            print(f"⚡ Données de l'index stock SIRENE (hors réseau)")
+            return with_dirigeant(stock_societe, dirigeant_future)
+
+    # 4. Essayer l'API SIRENE
+    if offline:
+        print(f"ℹ️  Mode hors ligne : API SIRENE non interrogée")
+    elif cached_status != NEGATIVE:
+        print(f"🔍 Recherche dans l'API SIRENE (INSEE)...")
+        sirene_societe, status_code = query_sirene_api(siren)
+        if sirene_societe:
+            if cache:
+                cache.put(siren, sirene_societe)
+            return with_dirigeant(sirene_societe, dirigeant_future)
+        if not stock_first:
+            stock_societe = query_stock_index(siren)
+            if stock_societe:
+                print(f"⚡ Données de l'index stock SIRENE (repli hors réseau)")
+                return with_dirigeant(stock_societe, dirigeant_future)
+        if status_code == 404 and cache:
+            cache.put_not_found(siren)
+
+    # 5. Fallback : erreur ou saisie manuelle
     print(f"\n❌ Impossible de récupérer les données automatiquement.")
     print(f"   Solutions:")
     print(f"   1. Utiliser un SIREN de test (901995308 ou 393525852)")
     print(f"   2. Obtenir une clé API SIRENE gratuite: https://portail-api.insee.fr/")
-    print(f"   3. Saisir les données manuellement (si terminal interactif)")
+    print(f"   3. Construire l'index stock SIRENE: python -m src.cli stock-import --input StockUniteLegale_utf8.zip")
+    print(f"   4. Saisir les données manuellement (si terminal interactif)")
+    print(f"   5. Mettre le contrat en attente (--defer) puis le terminer avec resume --manual")
 
-    import sys
-    if sys.stdin.isatty():
+    if interactive:
         # Terminal interactif, on peut demander la saisie
         print(f"\n⌨️  Saisie manuelle:")
-        return Societe(
+        societe = Societe(
             siren=format_siren(siren),
             raison_sociale=input("Raison sociale: "),
             forme_juridique=input("Forme juridique: "),
             capital=input("Capital (ex: 5 000 €): "),
-            adresse=input("Adresse (ville): ") + " (France)",
+            adresse=format_adresse(input("Adresse (ville): ")),
             ville_rcs=input("Ville RCS: "),
             representant_nom=input("Nom représentant: "),
             representant_fonction=input("Fonction représentant: ")
         )
+        # La saisie est conservée pour les prochains contrats
+        if cache:
+            cache.put(siren, societe, source='manual', data_version='')
+        return societe
     else:
-        # Pas de terminal interactif, lever une erreur
-        raise ValueError(f"Aucune source de données disponible pour le SIREN {siren}")
+        # Pas de saisie possible : l'appelant peut mettre le contrat en attente
+        raise SocieteNotFoundError(siren, f"Aucune source de données disponible pour le SIREN {siren}")
 
 
 if __name__ == "__main__":
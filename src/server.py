@@ -0,0 +1,229 @@
+# Serveur HTTP de génération : templates chauds, pool de rendu borné
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import quote
+
+from .config_registry import get_config_registry
+from .contract_engine import IncompleteSocieteError
+from .fast_render import get_fast_template
+from .generator import contract_filename, contract_renderer, partie_fixe_siren, render_contract, render_engine
+from .metrics import metrics
+from .scraper import extract_siren, resolve_many
+from .template_cache import get_compiled_template
+
+DOCX_MIME = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+
+class NdaServer(ThreadingHTTPServer):
+    """
+    Serveur de génération de contrats (NDA et autres types déclarés dans
+    templates/<nom>/config.yaml).
+
+    Les configurations, leurs règles compilées et tous les templates des
+    variantes sont chargés au démarrage puis gardés en mémoire. Le rendu s'exécute sur un pool de
+    `workers` threads ; au-delà de `workers + queue_size` demandes en
+    cours, le serveur répond immédiatement 503 avec Retry-After
+    (contre-pression) au lieu d'accumuler les requêtes.
+    """
+
+    daemon_threads = True
+    # File d'attente TCP : la contre-pression est gérée par le serveur (503)
+    request_queue_size = 128
+
+    def __init__(self, address: Tuple[str, int], workers: int = 4, queue_size: int = 16,
+                 timeout: float = 30, offline: bool = False):
+        super().__init__(address, NdaRequestHandler)
+        self.offline = offline
+        self.timeout_seconds = timeout
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.in_flight = 0
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='nda-render')
+        self.configs = get_config_registry().load_all()
+        self.stats = {'requests': 0, 'ok': 0, 'errors': 0, 'rejected': 0}
+        self._lock = threading.Lock()
+
+        # Préchauffage : règles compilées, chaque template parsé et indexé une fois (moteur configuré)
+        compile_template = get_fast_template if render_engine() == "fast" else get_compiled_template
+        for template_name, config in self.configs.items():
+            for variant in config['variants']:
+                compile_template(contract_renderer(template_name, variant, config).template_path)
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def try_acquire(self) -> bool:
+        """Réserve une place de rendu, False si le serveur est saturé."""
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, *_):
+        with self._lock:
+            self.in_flight -= 1
+
+    def render(self, template_name: str, siren: str, variant: str) -> Tuple[bytes, str]:
+        """Résout la société puis rend le contrat (exécuté sur le pool)."""
+        societe = resolve_many([siren], offline=self.offline)[siren]
+        if isinstance(societe, Exception):
+            raise LookupError(str(societe))
+
+        config = self.configs[template_name]
+        return (render_contract(template_name, societe, variant, config=config),
+                contract_filename(template_name, societe, variant, config))
+
+    def server_close(self):
+        self.executor.shutdown(wait=False)
+        super().server_close()
+
+
+class NdaRequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes : POST /<template> {"siren", "variant"} -> DOCX (POST /nda, POST /msa...) ;
+    GET /health -> JSON ; GET /metrics -> Prometheus.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # En-têtes et corps sont écrits séparément : sans TCP_NODELAY, Nagle et
+    # l'ACK retardé ajoutent ~40 ms par réponse en keep-alive
+    disable_nagle_algorithm = True
+    server: NdaServer
+
+    def log_message(self, format, *args):
+        sys.stderr.write(f"{self.log_date_time_string()} {self.address_string()} {format % args}\n")
+
+    def _send(self, status: int, body: bytes, content_type: str,
+              headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'),
+                   'application/json; charset=utf-8', headers)
+
+    def do_GET(self):
+        if self.path.split('?')[0] == '/health':
+            self._send_json(200, {'status': 'ok', 'workers': self.server.workers,
+                                  'in_flight': self.server.in_flight, **self.server.stats})
+            return
+        if self.path.split('?')[0] == '/metrics':
+            self._send(200, metrics.to_prometheus().encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8')
+            return
+        self._send_json(404, {'error': 'Route inconnue'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+
+        template_name = self.path.split('?')[0].strip('/')
+        config = self.server.configs.get(template_name)
+        if config is None:
+            self._send_json(404, {'error': 'Route inconnue', 'templates': list(self.server.configs)})
+            return
+
+        self.server.count('requests')
+        try:
+            payload = json.loads(body or b'{}')
+            if not isinstance(payload, dict):
+                raise ValueError("objet JSON attendu")
+            siren = payload.get('siren') or payload.get('party') or ''
+            variant = payload.get('variant') or payload.get('type') or next(iter(config['variants']))
+            # Valeurs JSON non textuelles (listes, objets...) : refusées avant tout usage
+            if not isinstance(siren, str):
+                raise ValueError("siren: chaîne attendue")
+            if not isinstance(variant, str):
+                raise ValueError("variant: chaîne attendue")
+            siren = extract_siren(siren)
+        except ValueError as e:
+            self.server.count('errors')
+            self._send_json(400, {'error': f"Requête invalide: {e}"})
+            return
+
+        if variant not in config['variants']:
+            self.server.count('errors')
+            self._send_json(400, {'error': f"Variante inconnue: {variant}",
+                                  'variants': list(config['variants'])})
+            return
+
+        if siren == partie_fixe_siren(template_name, config):
+            self.server.count('errors')
+            self._send_json(400, {'error': f"SIREN {siren}: partie 1 du contrat (partie_fixe), "
+                                           f"pas une société partenaire"})
+            return
+
+        # Contre-pression : pas de file d'attente illimitée
+        if not self.server.try_acquire():
+            self.server.count('rejected')
+            self._send_json(503, {'error': 'Serveur saturé, réessayer plus tard'}, {'Retry-After': '1'})
+            return
+
+        start = time.perf_counter()
+        try:
+            future = self.server.executor.submit(self.server.render, template_name, siren, variant)
+            future.add_done_callback(self.server.release)
+        except RuntimeError:
+            self.server.release()
+            raise
+
+        try:
+            content, filename = future.result(timeout=self.server.timeout_seconds)
+        except LookupError as e:
+            self.server.count('errors')
+            self._send_json(404, {'error': str(e)})
+            return
+        except IncompleteSocieteError as e:
+            # Contrat refusé plutôt que « Non renseigné » dans le document
+            self.server.count('errors')
+            self._send_json(422, {'error': str(e), 'missing': e.missing})
+            return
+        except Exception as e:
+            self.server.count('errors')
+            self._send_json(500, {'error': f"Erreur de génération: {e}"})
+            return
+
+        self.server.count('ok')
+        self._send(200, content, DOCX_MIME, {
+            'Content-Disposition': f"attachment; filename*=UTF-8''{quote(filename)}",
+            'X-Render-Time-Ms': f"{(time.perf_counter() - start) * 1000:.1f}",
+        })
+
+
+def serve(host: str = '127.0.0.1', port: int = 8080, workers: int = 4, queue_size: int = 16,
+          timeout: float = 30, offline: bool = False):
+    """Démarre le serveur et bloque jusqu'à Ctrl+C."""
+    server = NdaServer((host, port), workers=workers, queue_size=queue_size,
+                       timeout=timeout, offline=offline)
+    print(f"🚀 Serveur de génération: http://{host}:{server.server_address[1]}")
+    print(f"   POST /nda {{\"siren\": \"393525852\", \"variant\": \"master\"}} -> DOCX")
+    for template_name in server.configs:
+        if template_name != 'nda':
+            print(f"   POST /{template_name} {{\"siren\": \"...\", \"variant\": \"...\"}} -> DOCX")
+    print(f"   Pool de rendu: {workers} thread(s), file: {queue_size}")
+    sys.stdout.flush()
+
+    # Les messages de génération ne sont pas utiles en mode serveur :
+    # le journal des requêtes passe par stderr
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sys.stdout = sys.__stdout__
+        server.server_close()
+        print("\n👋 Serveur arrêté")
@@ -0,0 +1,36 @@
+# Chargement de la configuration globale (config/settings.yaml)
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict
+
+import yaml
+
+# Racine du projet : les chemins relatifs de la configuration en dépendent,
+# pas du répertoire courant
+PROJECT_ROOT = Path(__file__).parent.parent
+SETTINGS_PATH = PROJECT_ROOT / "config" / "settings.yaml"
+
+
+@lru_cache(maxsize=1)
+def load_settings() -> Dict[str, Any]:
+    """Charge config/settings.yaml (une seule fois par processus)."""
+    if not SETTINGS_PATH.exists():
+        return {}
+
+    with open(SETTINGS_PATH, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
+
+
+def get_setting(section: str, key: str, default: Any = None) -> Any:
+    """Retourne settings[section][key] ou la valeur par défaut."""
+    value = (load_settings().get(section) or {}).get(key)
+    return default if value is None else value
+
+
+def resolve_path(path: str) -> Path:
+    """Résout un chemin de la configuration par rapport à la racine du projet."""
+    resolved = Path(path).expanduser()
+    if not resolved.is_absolute():
+        resolved = PROJECT_ROOT / resolved
+    return resolved
@@ -0,0 +1,241 @@
+# Client HTTP de l'API SIRENE : session poolée, quota, Retry-After et reprises
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import metrics
+from .settings import get_setting
+
+# Codes HTTP pour lesquels une nouvelle tentative a un sens
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Nombre maximal de résultats par page de la recherche multicritères
+MAX_SEARCH_RESULTS = 1000
+
+
+class TokenBucket:
+    """
+    Seau à jetons partagé entre threads pour respecter un quota par minute.
+
+    Un Retry-After reçu de l'API suspend toutes les requêtes jusqu'à
+    l'échéance indiquée (pause_until).
+    """
+
+    def __init__(self, requests_per_minute: float, burst: Optional[int] = None):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst or max(1, int(requests_per_minute // 6)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Attend qu'un jeton soit disponible puis le consomme."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause_until(self, deadline: float):
+        """Bloque toutes les acquisitions jusqu'à deadline (horloge monotonic)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, deadline)
+            self._tokens = 0.0
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Délai en secondes d'un en-tête Retry-After (secondes ou date HTTP)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class SireneClient:
+    """
+    Client réutilisable de l'API SIRENE v3.11.
+
+    - une seule session HTTP (keep-alive, pool de connexions) ;
+    - un seau à jetons pour rester sous le quota par minute de l'INSEE ;
+    - les réponses 429/5xx et erreurs réseau sont retentées avec un
+      backoff exponentiel, en respectant Retry-After quand il est fourni.
+
+    base_url est configurable pour viser un serveur de test local
+    (voir src/sirene_stub.py).
+    """
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None,
+                 requests_per_minute: float = 30, max_retries: int = 4,
+                 backoff_seconds: float = 1.0, timeout: float = 10, pool_size: int = 10):
+        self.base_url = base_url.rstrip('/')
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+        self.bucket = TokenBucket(requests_per_minute)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'Accept': 'application/json',
+            'User-Agent': 'Contract-Generator/1.0'
+        })
+        # La clé API se transmet dans le header X-INSEE-Api-Key-Integration
+        if api_key:
+            self.session.headers['X-INSEE-Api-Key-Integration'] = api_key
+
+    def _backoff(self, attempt: int) -> float:
+        return self.backoff_seconds * (2 ** attempt) * (0.5 + random.random() / 2)
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Envoie une requête en respectant le quota et la politique de reprise.
+
+        Returns:
+            Dernière réponse obtenue (éventuellement 429/5xx si les reprises
+            sont épuisées)
+
+        Raises:
+            requests.exceptions.RequestException: erreur réseau persistante
+        """
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        with metrics.timer('sirene_api'):
+            return self._request_with_retries(method, url, **kwargs)
+
+    def _request_with_retries(self, method: str, url: str, **kwargs) -> requests.Response:
+        attempt = 0
+
+        while True:
+            self.bucket.acquire()
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                metrics.incr('sirene_http_errors_total')
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            # Chaque réponse est comptée, reprises comprises (403/404/429...)
+            metrics.incr('sirene_http_responses_total', status=response.status_code)
+            if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                return response
+
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if response.status_code == 429:
+                # Quota dépassé : tous les threads attendent
+                self.bucket.pause_until(time.monotonic() + (retry_after or self._backoff(attempt)))
+            else:
+                time.sleep(retry_after if retry_after is not None else self._backoff(attempt))
+            attempt += 1
+
+    def get_unite_legale(self, siren: str) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """
+        GET /siren/{siren}.
+
+        Returns:
+            (code HTTP, JSON de la réponse si 200)
+        """
+        response = self.request('GET', f"siren/{siren}")
+        if response.status_code == 200:
+            return response.status_code, response.json()
+        return response.status_code, None
+
+    def search_unites_legales(self, sirens: List[str]) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Recherche multicritères : plusieurs unités légales en une requête.
+
+        Envoie q=siren:(A OR B OR ...) en POST (formulaire) pour ne pas
+        dépendre de la longueur maximale d'URL.
+
+        Returns:
+            (code HTTP, liste des unités légales trouvées ; 404 = aucune)
+        """
+        if len(sirens) > MAX_SEARCH_RESULTS:
+            raise ValueError(f"Au plus {MAX_SEARCH_RESULTS} SIREN par recherche")
+
+        response = self.request('POST', "siren", data={
+            'q': f"siren:({' OR '.join(sirens)})",
+            'nombre': len(sirens),
+        })
+        if response.status_code == 200:
+            return response.status_code, response.json().get('unitesLegales', [])
+        return response.status_code, []
+
+    def map(self, func, items: Iterable, workers: Optional[int] = None) -> list:
+        """Applique func à chaque élément sur un pool de threads partageant la session."""
+        items = list(items)
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=workers or get_setting('sirene', 'workers', 8)) as pool:
+            return list(pool.map(func, items))
+
+
+_client: Optional[SireneClient] = None
+_client_lock = threading.Lock()
+
+
+def get_sirene_client() -> SireneClient:
+    """Client partagé configuré dans config/settings.yaml (section sirene)."""
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            _client = SireneClient(
+                base_url=get_setting('sirene', 'base_url', 'https://api.insee.fr/api-sirene/3.11'),
+                api_key=get_setting('sirene', 'api_key') or None,
+                requests_per_minute=float(get_setting('sirene', 'requests_per_minute', 30)),
+                max_retries=int(get_setting('sirene', 'max_retries', 4)),
+                backoff_seconds=float(get_setting('sirene', 'backoff_seconds', 1.0)),
+                timeout=float(get_setting('sirene', 'timeout', 10)),
+                pool_size=int(get_setting('sirene', 'workers', 8)),
+            )
+        return _client
+
+
+if __name__ == "__main__":
+    # Test du client contre le serveur SIRENE simulé (aucun appel réseau externe)
+    from .sirene_stub import start_stub_server
+
+    print("Test du client SIRENE contre un serveur local\n")
+    server, base_url = start_stub_server(quota=20, window=1.0, retry_after=1, fail_every=7)
+    client = SireneClient(base_url, requests_per_minute=1200, backoff_seconds=0.05)
+
+    sirens = [f"{552100000 + i}" for i in range(40)] + ["999000001"]
+    start = time.perf_counter()
+    results = client.map(client.get_unite_legale, sirens, workers=8)
+    elapsed = time.perf_counter() - start
+
+    statuses: Dict[int, int] = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    print(f"   SIREN demandés: {len(sirens)} en {elapsed:.2f} s")
+    print(f"   Statuts finaux: {statuses}")
+    print(f"   Réponses du serveur (reprises incluses): {server.RequestHandlerClass.state.statuses}")
+    server.shutdown()
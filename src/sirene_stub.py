@@ -0,0 +1,221 @@
+# Serveur HTTP local imitant l'API SIRENE et l'API Pappers (tests et benchmarks hors réseau)
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+COMMUNES = [
+    ('PARIS', '75056'),
+    ('COURBEVOIE', '92026'),
+    ('LYON', '69123'),
+    ('SARTROUVILLE', '78586'),
+    ('MARSEILLE', '13055'),
+    ('NANTES', '44109'),
+]
+CATEGORIES = ['5710', '5499', '5599', '5498', '5720']
+
+
+def fake_unite_legale(siren: str) -> Dict[str, Any]:
+    """Unité légale synthétique, déterministe pour un SIREN donné."""
+    n = int(siren)
+    commune, code_commune = COMMUNES[n % len(COMMUNES)]
+    return {
+        'siren': siren,
+        'periodesUniteLegale': [{
+            'denominationUniteLegale': f"SOCIETE TEST {siren}",
+            'categorieJuridiqueUniteLegale': CATEGORIES[n % len(CATEGORIES)],
+            'montantCapitalUniteLegale': (n % 1000) * 1000,
+        }],
+        'adresseEtablissement': {
+            'libelleCommuneEtablissement': commune,
+            'codeCommuneEtablissement': code_commune,
+        },
+    }
+
+
+def fake_entreprise_pappers(siren: str) -> Dict[str, Any]:
+    """Fiche entreprise Pappers synthétique (section representants uniquement)."""
+    n = int(siren)
+    return {
+        'siren': siren,
+        'representants': [
+            {'qualite': 'Commissaire aux comptes titulaire', 'personne_morale': True,
+             'denomination': 'AUDIT TEST', 'actuel': True},
+            {'qualite': 'Président', 'personne_morale': False,
+             'nom_complet': f"Dirigeant Test {n % 1000}", 'actuel': True},
+        ],
+    }
+
+
+class StubState:
+    """
+    Comportement du serveur simulé.
+
+    - SIREN commençant par "999" : 404
+    - quota : au-delà de `quota` requêtes par fenêtre de `window` secondes,
+      réponse 429 avec Retry-After
+    - `fail_every` : une requête sur N répond 503 (erreur transitoire)
+    - `latency` : délai ajouté à chaque réponse (secondes)
+    """
+
+    def __init__(self, quota: Optional[int] = None, window: float = 60.0,
+                 retry_after: int = 1, fail_every: int = 0, latency: float = 0.0):
+        self.quota = quota
+        self.window = window
+        self.retry_after = retry_after
+        self.fail_every = fail_every
+        self.latency = latency
+        self.requests = 0
+        self.statuses: Dict[int, int] = {}
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._lock = threading.Lock()
+
+    def admit(self) -> Tuple[Optional[int], Dict[str, str]]:
+        """Retourne (code d'erreur simulé ou None, en-têtes)."""
+        with self._lock:
+            self.requests += 1
+            now = time.monotonic()
+            if now - self._window_start >= self.window:
+                self._window_start = now
+                self._window_count = 0
+            self._window_count += 1
+
+            if self.quota is not None and self._window_count > self.quota:
+                return 429, {'Retry-After': str(self.retry_after)}
+            if self.fail_every and self.requests % self.fail_every == 0:
+                return 503, {}
+            return None, {}
+
+    def record(self, status: int):
+        with self._lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Routes : GET /siren/{siren}, recherche GET/POST /siren?q=siren:(A OR B ...),
+    GET /entreprise?siren=... (Pappers).
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # En-têtes et corps sont écrits séparément : sans TCP_NODELAY, Nagle et
+    # l'ACK retardé ajoutent ~40 ms par réponse en keep-alive
+    disable_nagle_algorithm = True
+    state: StubState = StubState()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.state.record(status)
+
+    def _admit(self) -> bool:
+        if self.state.latency:
+            time.sleep(self.state.latency)
+
+        error, headers = self.state.admit()
+        if error:
+            self._send(error, {'header': {'statut': error, 'message': 'Erreur simulée'}}, headers)
+            return False
+        return True
+
+    def _search(self, params: Dict[str, List[str]]):
+        query = ' '.join(params.get('q', []))
+        sirens = [s for s in dict.fromkeys(re.findall(r'\d{9}', query)) if not s.startswith('999')]
+        if not sirens:
+            self._send(404, {'header': {'statut': 404, 'message': 'Aucun élément trouvé'}})
+            return
+        self._send(200, {
+            'header': {'statut': 200, 'total': len(sirens), 'nombre': len(sirens)},
+            'unitesLegales': [fake_unite_legale(siren) for siren in sirens],
+        })
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8')
+        if not self._admit():
+            return
+
+        if re.fullmatch(r'.*/siren/?', self.path.split('?')[0]):
+            self._search(parse_qs(body))
+            return
+
+        self._send(404, {'header': {'statut': 404, 'message': 'Route inconnue'}})
+
+    def do_GET(self):
+        if not self._admit():
+            return
+
+        path, _, query = self.path.partition('?')
+        if re.fullmatch(r'.*/siren/?', path):
+            self._search(parse_qs(query))
+            return
+
+        if re.fullmatch(r'.*/entreprise/?', path):
+            siren = ''.join(parse_qs(query).get('siren', []))
+            if not re.fullmatch(r'\d{9}', siren) or siren.startswith('999'):
+                self._send(404, {'statusCode': 404, 'error': 'Entreprise non trouvée'})
+            else:
+                self._send(200, fake_entreprise_pappers(siren))
+            return
+
+        match = re.fullmatch(r'.*/siren/(\d{9})', path)
+        if match:
+            siren = match.group(1)
+            if siren.startswith('999'):
+                self._send(404, {'header': {'statut': 404, 'message': 'Aucun élément trouvé'}})
+            else:
+                self._send(200, {'header': {'statut': 200}, 'uniteLegale': fake_unite_legale(siren)})
+            return
+
+        self._send(404, {'header': {'statut': 404, 'message': 'Route inconnue'}})
+
+
+def start_stub_server(host: str = '127.0.0.1', port: int = 0, **options) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Démarre le serveur simulé dans un thread.
+
+    Returns:
+        (serveur, URL de base à passer à SireneClient)
+    """
+    handler = type('ConfiguredStubHandler', (StubHandler,), {'state': StubState(**options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur local imitant l'API SIRENE")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--quota', type=int, help='Requêtes autorisées par fenêtre (429 au-delà)')
+    parser.add_argument('--window', type=float, default=60.0, help='Durée de la fenêtre de quota (s)')
+    parser.add_argument('--fail-every', type=int, default=0, help='Une requête sur N répond 503')
+    parser.add_argument('--latency', type=float, default=0.0, help='Latence ajoutée (s)')
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(
+        args.host, args.port, quota=args.quota, window=args.window,
+        fail_every=args.fail_every, latency=args.latency
+    )
+    print(f"🧪 Serveur SIRENE simulé: {base_url}")
+    print(f"   Dans config/settings.yaml : sirene.base_url: \"{base_url}\"")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,479 @@
+# Table de sociétés en colonnes : stockage compact et fichier binaire pour les gros volumes
+
+import argparse
+import csv
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from bisect import bisect_left
+from dataclasses import fields
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from .models import INTERNED_FIELDS, Societe
+
+# Colonnes, dans l'ordre des champs de Societe
+COLUMNS = tuple(f.name for f in fields(Societe))
+
+# Colonnes catégorielles (dictionnaire de valeurs + codes) ; les autres
+# colonnes de texte sont stockées en UTF-8 concaténé + offsets
+CATEGORY_COLUMNS = INTERNED_FIELDS
+
+MAGIC = b'SOCTAB\x00'
+FORMAT_VERSION = 1
+
+# Sections compressées au-delà de cette taille (zlib niveau 1 : rapide)
+COMPRESS_MIN_BYTES = 4096
+
+
+def _le_bytes(values: array) -> bytes:
+    """Octets d'un array en petit-boutiste (format du fichier)."""
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _le_array(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+class _TextColumn:
+    """Chaînes UTF-8 mises bout à bout ; offsets[i]:offsets[i+1] délimite la ligne i."""
+
+    __slots__ = ('data', 'offsets')
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('Q', [0])
+
+    def append(self, value: str):
+        self.data += value.encode('utf-8')
+        self.offsets.append(len(self.data))
+
+    def __getitem__(self, i: int) -> str:
+        return self.data[self.offsets[i]:self.offsets[i + 1]].decode('utf-8')
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def nbytes(self) -> int:
+        return len(self.data) + self.offsets.itemsize * len(self.offsets)
+
+
+class _CategoryColumn:
+    """Valeurs distinctes (internées) + un code par ligne."""
+
+    __slots__ = ('values', 'codes', '_lookup')
+
+    def __init__(self, values: Optional[List[str]] = None, codes: Optional[array] = None):
+        self.values: List[str] = [sys.intern(v) for v in values or []]
+        self.codes = codes if codes is not None else array('I')
+        self._lookup: Dict[str, int] = {v: code for code, v in enumerate(self.values)}
+
+    def append(self, value: str):
+        code = self._lookup.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(sys.intern(value))
+            self._lookup[value] = code
+        self.codes.append(code)
+
+    def __getitem__(self, i: int) -> str:
+        return self.values[self.codes[i]]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def nbytes(self) -> int:
+        return self.codes.itemsize * len(self.codes) + sum(len(v.encode('utf-8')) for v in self.values)
+
+
+class SocieteTable:
+    """
+    Ensemble de sociétés stocké par colonnes.
+
+    Le SIREN est un entier (4 octets), les colonnes répétitives (forme
+    juridique, greffe, fonction) un code par ligne vers une liste de
+    valeurs distinctes, les autres colonnes (raison sociale, capital,
+    adresse, représentant) des chaînes UTF-8 mises bout à bout. Un million de
+    sociétés tient en quelques dizaines de Mo, contre plusieurs centaines
+    pour autant d'objets Societe.
+
+    Les Societe ne sont construites qu'à la lecture (table[i], itération,
+    find). save/load écrivent et relisent un fichier binaire compact (une
+    section par colonne, compressée par zlib) sans analyse ligne à ligne.
+    """
+
+    def __init__(self):
+        self.sirens = array('I')
+        self.columns = {
+            name: _CategoryColumn() if name in CATEGORY_COLUMNS else _TextColumn()
+            for name in COLUMNS if name != 'siren'
+        }
+        # Informations libres enregistrées avec la table (version des tables de correspondance...)
+        self.metadata: Dict[str, str] = {}
+        # Index de recherche par SIREN, construit au premier find()
+        self._order: Optional[array] = None
+        self._sorted_sirens: Optional[array] = None
+
+    @classmethod
+    def from_societes(cls, societes: Iterable[Societe]) -> "SocieteTable":
+        table = cls()
+        table.extend(societes)
+        return table
+
+    def append_values(self, values: Sequence[str]):
+        """Ajoute une ligne (valeurs dans l'ordre de COLUMNS, SIREN avec ou sans espaces)."""
+        siren = values[0].replace(' ', '')
+        if len(siren) != 9 or not siren.isdigit():
+            raise ValueError(f"SIREN invalide: {values[0]}")
+        self.sirens.append(int(siren))
+        for column, value in zip(self.columns.values(), values[1:]):
+            column.append(value)
+        self._order = self._sorted_sirens = None
+
+    def append(self, societe: Societe):
+        self.append_values([getattr(societe, name) for name in COLUMNS])
+
+    def extend(self, societes: Iterable[Societe]):
+        for societe in societes:
+            self.append(societe)
+
+    def __len__(self) -> int:
+        return len(self.sirens)
+
+    def siren(self, i: int) -> str:
+        """SIREN formaté de la ligne i ("123 456 789")."""
+        digits = f"{self.sirens[i]:09d}"
+        return f"{digits[:3]} {digits[3:6]} {digits[6:]}"
+
+    def __getitem__(self, i: int) -> Societe:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return Societe(self.siren(i), *(column[i] for column in self.columns.values()))
+
+    def __iter__(self) -> Iterator[Societe]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def find(self, siren: str) -> Optional[Societe]:
+        """Société d'un SIREN (avec ou sans espaces), None si absente de la table."""
+        siren = siren.replace(' ', '')
+        if len(siren) != 9 or not siren.isdigit():
+            return None
+        if self._order is None:
+            order = sorted(range(len(self)), key=self.sirens.__getitem__)
+            self._order = array('I', order)
+            self._sorted_sirens = array('I', (self.sirens[i] for i in order))
+        key = int(siren)
+        pos = bisect_left(self._sorted_sirens, key)
+        if pos < len(self._sorted_sirens) and self._sorted_sirens[pos] == key:
+            return self[self._order[pos]]
+        return None
+
+    def nbytes(self) -> int:
+        """Taille approximative des données en mémoire."""
+        return self.sirens.itemsize * len(self.sirens) + sum(c.nbytes() for c in self.columns.values())
+
+    # Fichier binaire
+
+    @staticmethod
+    def _write_section(f, data: bytes):
+        compressed = len(data) >= COMPRESS_MIN_BYTES
+        if compressed:
+            data = zlib.compress(data, 1)
+        f.write(struct.pack('<BQ', compressed, len(data)))
+        f.write(data)
+
+    @staticmethod
+    def _read_section(f) -> bytes:
+        header = f.read(9)
+        if len(header) != 9:
+            raise ValueError("fichier tronqué")
+        compressed, length = struct.unpack('<BQ', header)
+        data = f.read(length)
+        if len(data) != length:
+            raise ValueError("fichier tronqué")
+        return zlib.decompress(data) if compressed else data
+
+    def save(self, path: str):
+        """
+        Écrit la table (écriture atomique).
+
+        Format : MAGIC, longueur et en-tête JSON {version, rows, columns, metadata},
+        puis les sections de chaque colonne dans l'ordre de l'en-tête
+        (sirens ; codes + dictionnaire ; offsets + données UTF-8).
+        """
+        header = json.dumps({
+            'version': FORMAT_VERSION,
+            'rows': len(self),
+            'columns': [[name, 'category' if name in CATEGORY_COLUMNS else 'text']
+                        for name in self.columns],
+            'metadata': self.metadata,
+        }).encode('utf-8')
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            self._write_section(f, _le_bytes(self.sirens))
+            for column in self.columns.values():
+                if isinstance(column, _CategoryColumn):
+                    self._write_section(f, _le_bytes(column.codes))
+                    self._write_section(f, json.dumps(column.values, ensure_ascii=False).encode('utf-8'))
+                else:
+                    self._write_section(f, _le_bytes(column.offsets))
+                    self._write_section(f, bytes(column.data))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SocieteTable":
+        """
+        Relit une table écrite par save.
+
+        Raises:
+            FileNotFoundError: fichier absent
+            ValueError: fichier invalide, tronqué ou d'une version inconnue
+        """
+        table = cls()
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path}: pas une table de sociétés")
+            (header_length,) = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(header_length).decode('utf-8'))
+            if header.get('version') != FORMAT_VERSION:
+                raise ValueError(f"{path}: version de format non supportée: {header.get('version')}")
+            if [name for name, _ in header['columns']] != list(table.columns):
+                raise ValueError(f"{path}: colonnes inattendues")
+
+            rows = header['rows']
+            table.metadata = header.get('metadata') or {}
+            table.sirens = _le_array('I', cls._read_section(f))
+            for name, kind in header['columns']:
+                if kind == 'category':
+                    codes = _le_array('I', cls._read_section(f))
+                    values = json.loads(cls._read_section(f).decode('utf-8'))
+                    column = _CategoryColumn(values, codes)
+                    count = len(codes)
+                else:
+                    column = _TextColumn()
+                    column.offsets = _le_array('Q', cls._read_section(f))
+                    column.data = bytearray(cls._read_section(f))
+                    count = len(column)
+                if count != rows:
+                    raise ValueError(f"{path}: colonne {name}: {count} lignes au lieu de {rows}")
+                table.columns[name] = column
+        if len(table.sirens) != rows:
+            raise ValueError(f"{path}: {len(table.sirens)} SIREN au lieu de {rows}")
+        return table
+
+    # CSV (mêmes colonnes que le CSV de données manuelles de resume)
+
+    @classmethod
+    def read_csv(cls, path: str) -> "SocieteTable":
+        """
+        Importe un CSV (séparateur « ; » ou « , ») ayant les colonnes de COLUMNS.
+
+        Raises:
+            ValueError: colonnes manquantes ou SIREN invalide
+        """
+        table = cls()
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            header = f.readline()
+            f.seek(0)
+            reader = csv.reader(f, delimiter=';' if ';' in header else ',')
+            names = next(reader, [])
+            missing = [c for c in COLUMNS if c not in names]
+            if missing:
+                raise ValueError(f"{path}: colonne(s) manquante(s): {', '.join(missing)}")
+            positions = [names.index(c) for c in COLUMNS]
+            # Ligne 1 = en-tête
+            for line_number, row in enumerate(reader, start=2):
+                if not row:
+                    continue
+                try:
+                    table.append_values([row[p].strip() if p < len(row) else '' for p in positions])
+                except ValueError as e:
+                    raise ValueError(f"{path}: ligne {line_number}: {e}") from None
+        return table
+
+    def write_csv(self, path: str):
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(COLUMNS)
+            columns = list(self.columns.values())
+            for i in range(len(self)):
+                writer.writerow([self.siren(i), *(column[i] for column in columns)])
+
+
+def _synthetic_table(rows: int) -> SocieteTable:
+    """Table de rows sociétés aux valeurs réalistes (catégories répétées, adresses distinctes)."""
+    formes = ["SAS", "SARL", "SA à conseil d'administration", "SAS unipersonnelle", "SARL unipersonnelle"]
+    villes = ["Paris", "Nanterre", "Lyon", "Marseille", "Bordeaux", "Lille", "Toulouse", "Nantes"]
+    fonctions = ["Président", "Gérant", "Directeur général", "Président-directeur général"]
+    capitals = [f"{c:,} €".replace(',', ' ') for c in (1000, 5000, 10000, 37000, 100000)]
+    table = SocieteTable()
+    for n in range(rows):
+        ville = villes[n % len(villes)]
+        table.append_values((
+            f"{100000000 + n * 7:09d}",
+            f"SOCIETE {n:07d}",
+            formes[n % len(formes)],
+            capitals[n % len(capitals)],
+            f"{1 + n % 200} rue {n // 200 + 1}, {75001 + n % 20} {ville}",
+            ville,
+            f"Prénom{n % 997} NOM{n % 7919}",
+            fonctions[n % len(fonctions)],
+        ))
+    return table
+
+
+def export_cache(path: str) -> int:
+    """
+    Écrit les fiches valides du cache des sociétés dans une table (sauvegarde,
+    transfert vers une autre machine).
+
+    Returns:
+        Nombre de sociétés exportées
+    """
+    from .cache import get_company_cache
+
+    cache = get_company_cache()
+    if cache is None:
+        raise ValueError("cache des sociétés désactivé (cache.enabled)")
+    table = SocieteTable.from_societes(cache.valid_found())
+    table.metadata['data_version'] = cache.data_version
+    table.save(path)
+    return len(table)
+
+
+def import_cache(path: str) -> int:
+    """
+    Charge une table dans le cache des sociétés (une transaction) puis
+    dans l'index des noms : ses sociétés sont résolues sans appel à l'API
+    et trouvables par leur nom. Les fiches gardent la version des tables
+    de correspondance de l'export : construites avec d'autres tables,
+    elles seront reconstruites.
+
+    Returns:
+        Nombre de sociétés importées
+    """
+    from .cache import get_company_cache
+    from .name_index import get_name_index
+
+    cache = get_company_cache()
+    if cache is None:
+        raise ValueError("cache des sociétés désactivé (cache.enabled)")
+    table = SocieteTable.load(path)
+    count = cache.put_many(table, source='table', data_version=table.metadata.get('data_version', ''))
+    get_name_index().sync_cache(cache)
+    return count
+
+
+def _info(path: str):
+    """Charge une table et affiche durée, taille et mémoire."""
+    # Unix uniquement : importé ici, pas au chargement du module
+    import resource
+
+    start = time.perf_counter()
+    table = SocieteTable.load(path)
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"   Chargement: {len(table):,} sociétés en {elapsed:.2f} s".replace(',', ' '))
+    print(f"   Mémoire: {table.nbytes() / 1e6:.0f} Mo de données, RSS max: {peak_mb:.0f} Mo")
+    if len(table):
+        print(f"   Première: {table[0]}")
+
+
+def _bench(rows: int):
+    """Mesure construction, écriture et relecture (dans un processus neuf) d'une table synthétique."""
+    import subprocess
+    import tempfile
+    import tracemalloc
+
+    # Empreinte mémoire par société : objets Societe contre table
+    sample = 100_000
+    tracemalloc.start()
+    objects = list(_synthetic_table(sample))
+    objects_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    tracemalloc.start()
+    sample_table = _synthetic_table(sample)
+    table_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del sample_table
+    print(f"🧪 Mémoire par société: {objects_bytes / sample:.0f} octets (Societe) "
+          f"contre {table_bytes / sample:.0f} octets (SocieteTable)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'societes.soctab'
+
+        print(f"🧪 Table synthétique: {rows:,} sociétés".replace(',', ' '))
+        start = time.perf_counter()
+        table = _synthetic_table(rows)
+        print(f"   Construction: {time.perf_counter() - start:.1f} s")
+
+        start = time.perf_counter()
+        table.save(str(path))
+        print(f"   Écriture: {time.perf_counter() - start:.2f} s, fichier de {path.stat().st_size / 1e6:.0f} Mo")
+
+        probe = table.siren(rows // 2)
+        start = time.perf_counter()
+        found = table.find(probe)
+        print(f"   Premier find (index): {time.perf_counter() - start:.2f} s -> {found}")
+        del table
+
+        # Relecture dans un processus neuf : RSS sans la construction
+        subprocess.run([sys.executable, '-m', 'src.societe_table', '--info', str(path)], check=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Table de sociétés en colonnes")
+    parser.add_argument('--bench', type=int, metavar='LIGNES',
+                        help='Benchmark sur une table synthétique de LIGNES sociétés')
+    parser.add_argument('--import-csv', metavar='CSV', help='Convertit un CSV de sociétés en table (avec --output)')
+    parser.add_argument('--export-csv', metavar='CSV', help='Exporte une table (--info) en CSV')
+    parser.add_argument('--output', metavar='FICHIER', help='Table à écrire (--import-csv)')
+    parser.add_argument('--info', metavar='FICHIER', help='Charge une table et affiche sa taille')
+    parser.add_argument('--export-cache', metavar='FICHIER',
+                        help='Écrit les fiches valides du cache des sociétés dans une table')
+    parser.add_argument('--import-cache', metavar='FICHIER',
+                        help='Charge une table dans le cache des sociétés et l\'index des noms')
+    args = parser.parse_args()
+
+    if args.import_csv:
+        if not args.output:
+            parser.error("--import-csv requiert --output")
+        start = time.perf_counter()
+        imported = SocieteTable.read_csv(args.import_csv)
+        imported.save(args.output)
+        print(f"✅ {len(imported):,} sociétés -> {args.output} "
+              f"({time.perf_counter() - start:.1f} s)".replace(',', ' '))
+    elif args.export_csv:
+        if not args.info:
+            parser.error("--export-csv requiert --info FICHIER (table source)")
+        SocieteTable.load(args.info).write_csv(args.export_csv)
+        print(f"✅ Export CSV: {args.export_csv}")
+    elif args.export_cache:
+        print(f"✅ {export_cache(args.export_cache):,} sociétés du cache -> {args.export_cache}".replace(',', ' '))
+    elif args.import_cache:
+        print(f"✅ {import_cache(args.import_cache):,} sociétés -> cache et index des noms".replace(',', ' '))
+    elif args.info:
+        _info(args.info)
+    else:
+        _bench(args.bench or 1_000_000)
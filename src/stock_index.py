@@ -0,0 +1,243 @@
+# Index local du fichier stock SIRENE (StockUniteLegale) pour une résolution hors réseau
+
+import argparse
+import csv
+import io
+import os
+import random
+import sqlite3
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from .settings import get_setting, resolve_path
+
+# Lignes insérées par transaction : borne la mémoire pendant l'import
+INSERT_CHUNK = 50_000
+
+# Colonnes du fichier StockUniteLegale conservées dans l'index
+STOCK_COLUMNS = (
+    'siren',
+    'denominationUniteLegale',
+    'denominationUsuelle1UniteLegale',
+    'nomUniteLegale',
+    'prenom1UniteLegale',
+    'categorieJuridiqueUniteLegale',
+    'etatAdministratifUniteLegale',
+)
+
+
+@contextmanager
+def _open_stock_file(path: Path) -> Iterator[io.TextIOBase]:
+    """Ouvre le CSV stock, directement ou dans l'archive zip publiée par l'INSEE (fermée en sortie)."""
+    if path.suffix.lower() == '.zip':
+        with zipfile.ZipFile(path) as archive:
+            name = next(n for n in archive.namelist() if n.lower().endswith('.csv'))
+            with io.TextIOWrapper(archive.open(name), encoding='utf-8', newline='') as f:
+                yield f
+        return
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        yield f
+
+
+def _iter_stock_rows(f) -> Iterator[tuple]:
+    """Lignes (siren, dénomination, catégorie juridique, état) du CSV, en flux."""
+    reader = csv.DictReader(f)
+    missing = [c for c in ('siren', 'categorieJuridiqueUniteLegale') if c not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Colonnes absentes du fichier stock: {', '.join(missing)}")
+
+    for record in reader:
+        siren = record.get('siren') or ''
+        if len(siren) != 9 or not siren.isdigit():
+            continue
+        denomination = (
+            record.get('denominationUniteLegale') or
+            record.get('denominationUsuelle1UniteLegale') or
+            ' '.join(p for p in (record.get('prenom1UniteLegale'), record.get('nomUniteLegale')) if p) or
+            ''
+        )
+        yield (
+            int(siren),
+            denomination,
+            record.get('categorieJuridiqueUniteLegale') or '',
+            record.get('etatAdministratifUniteLegale') or '',
+        )
+
+
+def build_stock_index(stock_path: str, index_path: str) -> int:
+    """
+    Construit l'index SQLite à partir du fichier StockUniteLegale.
+
+    Le CSV (ou le zip INSEE) est lu en flux et inséré par paquets de
+    INSERT_CHUNK lignes : la mémoire reste bornée quelle que soit la
+    taille du fichier. Le SIREN est la clé primaire entière de la table
+    (B-tree rowid), ce qui donne un index compact et des recherches en
+    O(log n). L'index est écrit dans un fichier temporaire puis remplacé
+    atomiquement.
+
+    Returns:
+        Nombre d'unités légales indexées
+    """
+    stock_file = Path(stock_path)
+    if not stock_file.exists():
+        raise FileNotFoundError(f"Fichier stock introuvable: {stock_file}")
+
+    index_file = Path(index_path)
+    index_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = index_file.with_name(index_file.name + '.tmp')
+    if tmp_file.exists():
+        tmp_file.unlink()
+
+    conn = sqlite3.connect(str(tmp_file))
+    count = 0
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("""
+            CREATE TABLE unites_legales (
+                siren INTEGER PRIMARY KEY,
+                denomination TEXT,
+                categorie_juridique TEXT,
+                etat TEXT
+            )
+        """)
+
+        with _open_stock_file(stock_file) as f:
+            chunk = []
+            for row in _iter_stock_rows(f):
+                chunk.append(row)
+                if len(chunk) >= INSERT_CHUNK:
+                    conn.executemany("INSERT OR REPLACE INTO unites_legales VALUES (?, ?, ?, ?)", chunk)
+                    conn.commit()
+                    count += len(chunk)
+                    chunk = []
+            if chunk:
+                conn.executemany("INSERT OR REPLACE INTO unites_legales VALUES (?, ?, ?, ?)", chunk)
+                conn.commit()
+                count += len(chunk)
+    finally:
+        conn.close()
+
+    os.replace(tmp_file, index_file)
+    return count
+
+
+class StockIndex:
+    """Lecture de l'index stock : une requête par clé primaire, rien n'est chargé en mémoire."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_unite_legale(self, siren: str) -> Optional[Dict[str, Any]]:
+        """
+        Unité légale au format de l'API SIRENE (clé uniteLegale), ou None.
+
+        Le fichier stock ne contient ni adresse ni capital : ces champs
+        sont absents et la Societe construite les marque "Non renseigné" ;
+        les variantes qui les reprennent refusent alors le rendu
+        (ContractRenderer.check_complete).
+        """
+        row = self._connection().execute(
+            "SELECT denomination, categorie_juridique, etat FROM unites_legales WHERE siren = ?",
+            (int(siren),)
+        ).fetchone()
+        if row is None:
+            return None
+
+        denomination, categorie, etat = row
+        return {
+            'siren': siren,
+            'periodesUniteLegale': [{
+                'denominationUniteLegale': denomination,
+                'categorieJuridiqueUniteLegale': categorie,
+                'etatAdministratifUniteLegale': etat,
+            }],
+        }
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM unites_legales").fetchone()[0]
+
+
+_stock_index: Optional[StockIndex] = None
+
+
+def get_stock_index() -> Optional[StockIndex]:
+    """Index configuré dans config/settings.yaml (stock.path), None s'il n'a pas été construit."""
+    global _stock_index
+
+    if _stock_index is None:
+        path = resolve_path(get_setting('stock', 'path', '.cache/stock_unite_legale.sqlite'))
+        if not path.exists():
+            return None
+        _stock_index = StockIndex(path)
+    return _stock_index
+
+
+def write_synthetic_stock(path: str, rows: int, seed: int = 42):
+    """Écrit un faux fichier StockUniteLegale de `rows` lignes (en flux)."""
+    rng = random.Random(seed)
+    categories = ['5710', '5499', '5599', '5498', '1000', '9220', '6540']
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(STOCK_COLUMNS)
+        for i in range(rows):
+            siren = f"{100000000 + i * 7:09d}"
+            categorie = rng.choice(categories)
+            if categorie == '1000':
+                writer.writerow((siren, '', '', f"NOM{i}", 'JEAN', categorie, 'A'))
+            else:
+                writer.writerow((siren, f"SOCIETE {i}", '', '', '', categorie, rng.choice('AAAAC')))
+
+
+def _bench(rows: int, lookups: int = 100_000):
+    """Mesure import et recherches sur un fichier stock synthétique."""
+    # Unix uniquement : importé ici, pas au chargement du module
+    import resource
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / 'StockUniteLegale_synthetic.csv'
+        index_path = Path(tmp) / 'stock.sqlite'
+
+        print(f"🧪 Fichier stock synthétique: {rows:,} lignes".replace(',', ' '))
+        write_synthetic_stock(str(csv_path), rows)
+        print(f"   Taille CSV: {csv_path.stat().st_size / 1e6:.0f} Mo")
+
+        start = time.perf_counter()
+        count = build_stock_index(str(csv_path), str(index_path))
+        elapsed = time.perf_counter() - start
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"   Import: {count:,} unités légales en {elapsed:.1f} s ({count / elapsed:,.0f} lignes/s)".replace(',', ' '))
+        print(f"   Taille index: {index_path.stat().st_size / 1e6:.0f} Mo, RSS max: {peak_mb:.0f} Mo")
+
+        index = StockIndex(index_path)
+        rng = random.Random(1)
+        sirens = [f"{100000000 + rng.randrange(rows) * 7:09d}" for _ in range(lookups)]
+        start = time.perf_counter()
+        for siren in sirens:
+            index.get_unite_legale(siren)
+        elapsed = time.perf_counter() - start
+        print(f"   Recherches: {lookups:,} en {elapsed:.2f} s ({elapsed / lookups * 1e6:.1f} µs/recherche)".replace(',', ' '))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index local du fichier stock SIRENE")
+    parser.add_argument('--bench', type=int, metavar='LIGNES',
+                        help='Benchmark sur un fichier synthétique de LIGNES lignes')
+    parser.add_argument('--lookups', type=int, default=100_000, help='Nombre de recherches du benchmark')
+    args = parser.parse_args()
+
+    _bench(args.bench or 1_000_000, args.lookups)
@@ -0,0 +1,206 @@
+# Cache de templates DOCX compilés : chaque template est parsé une seule fois
+
+import copy
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from docx import Document
+from docx.text.paragraph import Paragraph
+
+from .metrics import metrics
+from .replacer import ReplacementEngine, compile_replacements, merge_counts, record_replacements
+
+
+def _element_path(element, root) -> Tuple[int, ...]:
+    """Chemin d'un élément XML sous forme d'indices d'enfants depuis la racine."""
+    path = []
+    while element is not root:
+        parent = element.getparent()
+        path.append(parent.index(element))
+        element = parent
+    return tuple(reversed(path))
+
+
+def _element_at(root, path: Tuple[int, ...]):
+    """Retrouve un élément à partir de son chemin d'indices."""
+    element = root
+    for index in path:
+        element = element[index]
+    return element
+
+
+def _runs_text(p) -> str:
+    """Texte joint des runs directs d'un paragraphe (ce que voit le moteur)."""
+    return ''.join(r.text for r in p.r_lst)
+
+
+class CompiledTemplate:
+    """
+    Template DOCX parsé une fois et indexé.
+
+    L'index enregistre chaque paragraphe du corps et des tableaux (chemin
+    XML + texte joint de ses runs) et chaque cellule de tableau. Un rendu
+    travaille sur une copie profonde du document et ne réécrit que les
+    paragraphes dont le texte d'origine contient une clé.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.mtime = self.path.stat().st_mtime
+        with metrics.timer('template_parse'):
+            self.document = Document(self.path)
+        self._lock = threading.Lock()
+
+        # Paragraphes uniques (corps puis cellules) : chemin XML et texte d'origine
+        self._paragraph_paths: List[Tuple[int, ...]] = []
+        self._paragraph_texts: List[str] = []
+        # Cellules uniques : (texte d'origine, [paragraphes], colonne dans la grille du tableau)
+        self._cells: List[Tuple[str, List[int], int]] = []
+
+        self._build_index()
+
+    def _build_index(self):
+        """Parcourt le corps et les tableaux du document et enregistre les positions."""
+        root = self.document.element
+        # Clé = l'élément lui-même : garder la référence stabilise le proxy lxml
+        seen: Dict[object, int] = {}
+
+        def register_paragraph(p) -> int:
+            if p not in seen:
+                seen[p] = len(self._paragraph_paths)
+                self._paragraph_paths.append(_element_path(p, root))
+                self._paragraph_texts.append(_runs_text(p))
+            return seen[p]
+
+        for paragraph in self.document.paragraphs:
+            register_paragraph(paragraph._p)
+
+        for table in self.document.tables:
+            for row in table.rows:
+                for column, cell in enumerate(row.cells):
+                    if cell._tc in seen:
+                        # Cellule fusionnée déjà indexée
+                        continue
+                    seen[cell._tc] = -1
+                    paragraph_ids = [register_paragraph(p._p) for p in cell.paragraphs]
+                    self._cells.append((cell.text, paragraph_ids, column))
+
+    def paragraphs_matching(self, engine: ReplacementEngine) -> List[int]:
+        """Paragraphes dont le texte d'origine contient au moins une clé."""
+        return [i for i, text in enumerate(self._paragraph_texts) if engine.matches(text)]
+
+    def render(self) -> "TemplateRendering":
+        """Démarre un rendu sur une copie du document d'origine."""
+        # La copie se fait au niveau du part : lxml ne partage pas le memo de
+        # deepcopy, l'élément racine doit être celui que le package sérialise
+        with self._lock, metrics.timer('render_copy'):
+            part = copy.deepcopy(self.document.part)
+        return TemplateRendering(self, part.document)
+
+
+class TemplateRendering:
+    """
+    Rendu en cours d'un CompiledTemplate.
+
+    Les paragraphes déjà modifiés sont suivis : leur nouveau texte peut
+    contenir une clé d'un remplacement appliqué ensuite.
+    """
+
+    def __init__(self, template: CompiledTemplate, document):
+        self.template = template
+        self.document = document
+        self._root = document.element
+        self._paragraphs: Dict[int, object] = {}
+        self._dirty: Set[int] = set()
+
+    def _paragraph(self, paragraph_id: int):
+        p = self._paragraphs.get(paragraph_id)
+        if p is None:
+            p = _element_at(self._root, self.template._paragraph_paths[paragraph_id])
+            self._paragraphs[paragraph_id] = p
+        return p
+
+    def _apply(self, engine: ReplacementEngine, paragraph_ids: Iterable[int]) -> Dict[str, int]:
+        total: Dict[str, int] = {}
+        for paragraph_id in paragraph_ids:
+            counts = engine.apply_to_runs(self._paragraph(paragraph_id).r_lst)
+            if counts:
+                self._dirty.add(paragraph_id)
+                merge_counts(total, counts)
+        return total
+
+    def replace(self, replacements: Union[Dict[str, str], ReplacementEngine]) -> Dict[str, int]:
+        """
+        Équivalent de replace_in_document(doc, replacements).
+
+        Returns:
+            Nombre de remplacements effectués par clé
+        """
+        engine = replacements if isinstance(replacements, ReplacementEngine) \
+            else compile_replacements(replacements)
+        with metrics.timer('replace'):
+            candidates = set(self.template.paragraphs_matching(engine)) | self._dirty
+            counts = self._apply(engine, sorted(candidates))
+        record_replacements(engine, counts)
+        return counts
+
+    def replace_in_cells(self, markers: Iterable[str],
+                         replacements: Union[Dict[str, str], ReplacementEngine],
+                         column: Optional[int] = None) -> Dict[str, int]:
+        """
+        Remplacements limités aux cellules dont le texte contient un des marqueurs.
+
+        Le test des marqueurs porte sur le texte courant de la cellule
+        (après les remplacements déjà appliqués). column (0 = première
+        colonne de la grille) restreint la règle à une colonne : le bloc de
+        signature d'une seule partie dans un tableau de signatures.
+        """
+        markers = tuple(markers)
+        engine = replacements if isinstance(replacements, ReplacementEngine) \
+            else compile_replacements(replacements)
+        total: Dict[str, int] = {}
+
+        with metrics.timer('replace'):
+            for cell_text, paragraph_ids, cell_column in self.template._cells:
+                if column is not None and cell_column != column:
+                    continue
+                if any(paragraph_id in self._dirty for paragraph_id in paragraph_ids):
+                    cell_text = '\n'.join(Paragraph(self._paragraph(i), None).text for i in paragraph_ids)
+                if any(marker in cell_text for marker in markers):
+                    merge_counts(total, self._apply(engine, paragraph_ids))
+
+        record_replacements(engine, total)
+        return total
+
+
+_cache: Dict[str, CompiledTemplate] = {}
+_cache_lock = threading.Lock()
+
+
+def get_compiled_template(path) -> CompiledTemplate:
+    """
+    Retourne le template compilé pour ce fichier DOCX.
+
+    Le template est parsé au premier appel puis conservé en mémoire ;
+    il est recompilé si le fichier a été modifié depuis.
+    """
+    resolved = Path(path).resolve()
+    key = str(resolved)
+    mtime = resolved.stat().st_mtime
+
+    with _cache_lock:
+        compiled = _cache.get(key)
+        if compiled is None or compiled.mtime != mtime:
+            metrics.incr('template_cache_total', result='miss')
+            compiled = CompiledTemplate(resolved)
+            _cache[key] = compiled
+        else:
+            metrics.incr('template_cache_total', result='hit')
+        return compiled
+
+
+def clear_template_cache():
+    """Vide le cache de templates compilés."""
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,110 @@
+# Fixtures communes : configuration isolée dans un répertoire temporaire, famille de templates de test
+
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+from docx import Document
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src import (cache, config_registry, jobs, name_index, output_store, pending, settings,  # noqa: E402
+                 sirene_client, stock_index)
+from src.sirene_stub import start_stub_server  # noqa: E402
+
+# Singletons construits à partir de config/settings.yaml, remis à zéro à chaque test
+SINGLETONS = (
+    (cache, '_company_cache'),
+    (cache, '_dirigeant_cache'),
+    (config_registry, '_registry'),
+    (jobs, '_job_store'),
+    (name_index, '_name_index'),
+    (output_store, '_output_store'),
+    (pending, '_pending_queue'),
+    (sirene_client, '_client'),
+    (stock_index, '_stock_index'),
+)
+
+# Famille de contrats de test : désignation de la partie 2 et tableau de signatures
+MSA_CONFIG = {
+    'name': 'msa',
+    'partie_fixe': {'raison_sociale': 'FR DIGITAL', 'siren': '901 995 308', 'representant_nom': 'Frédéric Ramet'},
+    'variants': {'standard': {'template': 'MSA_Standard.docx'}},
+    'formats': {'designation': {
+        'Entre XXXXX,': 'Entre {raison_sociale} ({forme_juridique|lower}),',
+        'numéro XXXXX': 'numéro {siren}',
+    }},
+    'tables': [{'markers': ['Nom :'], 'column': 0, 'replacements': {'Nom :': 'Nom : {representant_nom}'}}],
+    'placeholders': ['XXXXX'],
+    'output': {'naming': 'MSA_{{TYPE}}_{{P2_RAISON_SOCIALE}}_{{DATE}}.docx'},
+}
+
+
+def build_msa_template(path: Path) -> Path:
+    """Template DOCX de la famille de test (placeholders coupés entre runs)."""
+    document = Document()
+    paragraph = document.add_paragraph()
+    for text in ("Entre XX", "XXX, inscrite sous le numéro X", "XXXX, et FR DIGITAL."):
+        paragraph.add_run(text)
+    table = document.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "LE CLIENT"
+    table.cell(0, 1).text = "FR DIGITAL"
+    table.cell(1, 0).text = "Nom :"
+    table.cell(1, 1).text = "Nom : Frédéric Ramet"
+    document.save(path)
+    return path
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """
+    Configuration globale isolée : caches, file de travaux et templates dans
+    tmp_path, aucun appel réseau (SIRENE et représentants désactivés).
+
+    Returns:
+        Racine temporaire (templates/ contient la famille de test « msa »)
+    """
+    templates = tmp_path / 'templates'
+    (templates / 'msa' / 'examples').mkdir(parents=True)
+    (templates / 'msa' / 'config.yaml').write_text(yaml.safe_dump(MSA_CONFIG, allow_unicode=True), encoding='utf-8')
+    build_msa_template(templates / 'msa' / 'examples' / 'MSA_Standard.docx')
+
+    overrides = {
+        'paths': {'templates': str(templates)},
+        'templates': {'config_cache': False},
+        'cache': {'enabled': False},
+        'dirigeants': {'provider': ''},
+        'sirene': {'base_url': 'http://127.0.0.1:9', 'max_retries': 0},
+        'stock': {'path': str(tmp_path / 'stock.sqlite')},
+        'names': {'path': str(tmp_path / 'names.sqlite'), 'resolve': False},
+        'jobs': {'path': str(tmp_path / 'jobs.sqlite')},
+        'output_store': {'path': str(tmp_path / 'outputs')},
+        'pending': {'path': str(tmp_path / 'pending.jsonl')},
+    }
+    monkeypatch.setattr(settings, 'load_settings', lambda: overrides)
+    for module, name in SINGLETONS:
+        monkeypatch.setattr(module, name, None)
+    return tmp_path
+
+
+@pytest.fixture
+def stub():
+    """
+    Serveur SIRENE / Pappers simulé (src/sirene_stub.py).
+
+    Returns:
+        start(**options) -> (état du serveur, URL de base)
+    """
+    servers = []
+
+    def start(**options):
+        server, base_url = start_stub_server(**options)
+        servers.append(server)
+        return server.RequestHandlerClass.state, base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
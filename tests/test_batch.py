@@ -0,0 +1,59 @@
+# Mode batch : manifest JSONL, lignes en erreur, doublons, mise en attente (données de test, hors ligne)
+
+import json
+
+from src.batch import read_batch_file, run_batch
+from src.pending import PendingQueue
+
+
+def write_batch(path, *lines):
+    path.write_text("party,contract,type\n" + "".join(f"{line}\n" for line in lines), encoding='utf-8')
+    return str(path)
+
+
+def manifest(summary):
+    with open(summary['manifest'], encoding='utf-8') as f:
+        return sorted((json.loads(line) for line in f), key=lambda result: result['line'])
+
+
+def test_manifest_has_one_entry_per_row(project):
+    rows = read_batch_file(write_batch(
+        project / 'lot.csv',
+        "393525852,msa,standard",
+        "https://www.pappers.fr/entreprise/nexans-393525852,msa,",
+        "901995308,msa,standard",
+        "552100554,msa,standard",
+        "393525852,msa,premium",
+        "393525852,dpa,",
+        ",msa,standard",
+    ))
+
+    summary = run_batch(rows, output_dir=str(project / 'out'), workers=1, offline=True)
+
+    results = manifest(summary)
+    assert [(r['line'], r['status']) for r in results] == [
+        (2, 'ok'), (3, 'duplicate'), (4, 'error'), (5, 'error'), (6, 'error'), (7, 'error'), (8, 'error')]
+    ok, duplicate, fixed_party, unknown, variant, template, empty = results
+    assert ok['output'].endswith('.docx') and ok['raison_sociale'] == 'NEXANS'
+    # Même contrat qu'une ligne précédente : rendu une seule fois
+    assert (duplicate['duplicate_of'], duplicate['output']) == (2, None)
+    assert len(list((project / 'out').glob('*.docx'))) == 1
+    assert "partie 1 du contrat" in fixed_party['error']
+    assert "552100554" in unknown['error'] and "hors ligne" in unknown['error']
+    assert variant['error'].startswith("Variante inconnue: premium")
+    assert template['error'] == "Type de contrat inconnu: dpa"
+    assert empty['error'] == "Colonne party/siren vide"
+    assert {key: summary[key] for key in ('total', 'ok', 'duplicates', 'deferred', 'errors')} == {
+        'total': 7, 'ok': 1, 'duplicates': 1, 'deferred': 0, 'errors': 5}
+
+
+def test_unknown_companies_are_deferred_with_a_queue(project):
+    rows = read_batch_file(write_batch(project / 'lot.csv', "552100554,msa,standard", "552100554,msa,standard"))
+    queue = PendingQueue(project / 'pending.jsonl')
+
+    summary = run_batch(rows, output_dir=str(project / 'out'), workers=1, offline=True, pending=queue)
+
+    assert [r['status'] for r in manifest(summary)] == ['deferred', 'deferred']
+    assert (summary['deferred'], summary['errors']) == (2, 0)
+    # Un seul contrat en attente
+    assert [(e['siren'], e['template'], e['variant']) for e in queue.entries()] == [('552100554', 'msa', 'standard')]
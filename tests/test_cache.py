@@ -0,0 +1,99 @@
+# Cache des sociétés : TTL, cache négatif, version des tables, résolution sans appel réseau
+
+from types import SimpleNamespace
+
+import pytest
+
+from src import cache, settings
+from src.cache import HIT, MISS, NEGATIVE, CompanyCache
+from src.models import Societe
+from src.scraper import SocieteNotFoundError, resolve_many
+
+DAY = 86400
+
+
+def societe(siren: str = '552100554', **changes) -> Societe:
+    values = dict(siren=f"{siren[:3]} {siren[3:6]} {siren[6:]}", raison_sociale="ACME",
+                  forme_juridique="Société par actions simplifiée", capital="1 000 €",
+                  adresse="Lyon (France)", ville_rcs="Lyon", representant_nom="Jean Dupont",
+                  representant_fonction="Président")
+    values.update(changes)
+    return Societe(**values)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Horloge du cache pilotée par le test : clock.now en secondes."""
+    fake = SimpleNamespace(now=1_000_000.0)
+    fake.time = lambda: fake.now
+    monkeypatch.setattr(cache, 'time', fake)
+    return fake
+
+
+@pytest.fixture
+def company_cache(tmp_path, clock):
+    return CompanyCache(tmp_path / 'societes.sqlite', ttl_seconds=30 * DAY, negative_ttl_seconds=6 * 3600,
+                        data_version='categories:1,greffes:1')
+
+
+def test_found_entry_expires_after_ttl(company_cache, clock):
+    assert company_cache.get('552100554') == (MISS, None)
+
+    company_cache.put('552100554', societe())
+    clock.now += 30 * DAY
+    assert company_cache.get('552100554') == (HIT, societe())
+
+    clock.now += 1
+    assert company_cache.get('552100554') == (MISS, None)
+
+
+def test_negative_entry_expires_sooner_and_is_replaced_by_a_found_one(company_cache, clock):
+    company_cache.put_not_found('999000001')
+    clock.now += 6 * 3600
+    assert company_cache.get('999000001') == (NEGATIVE, None)
+
+    clock.now += 1
+    assert company_cache.get('999000001') == (MISS, None)
+
+    company_cache.put_not_found('999000001')
+    company_cache.put('999000001', societe('999000001'))
+    assert company_cache.get('999000001') == (HIT, societe('999000001'))
+
+
+def test_entries_built_with_other_tables_are_rebuilt(company_cache):
+    company_cache.put('552100554', societe(), data_version='categories:0,greffes:1')
+    # Saisie manuelle : ne dépend pas des tables
+    company_cache.put('552100555', societe('552100555'), source='manual', data_version='')
+    company_cache.put('552100556', societe('552100556'))
+
+    assert company_cache.get('552100554') == (MISS, None)
+    assert company_cache.get('552100555')[0] == HIT
+    assert [s.siren for s in company_cache.valid_found()] == ['552 100 555', '552 100 556']
+
+
+def test_invalidate_and_found_since(company_cache, clock):
+    start = clock.now
+    company_cache.put('552100555', societe('552100555'))
+    clock.now += 10
+    company_cache.put('552100554', societe())
+    company_cache.put_not_found('999000001')
+
+    assert [(siren, at - start) for siren, _, at in company_cache.found_since(start - 1)] == [
+        ('552100555', 0), ('552100554', 10)]
+    assert [siren for siren, _, _ in company_cache.found_since(start)] == ['552100554']
+
+    company_cache.invalidate('552100554')
+    assert company_cache.get('552100554') == (MISS, None)
+
+
+def test_resolve_many_answers_from_the_cache_without_network(project):
+    settings.load_settings()['cache'] = {'enabled': True, 'path': str(project / 'societes.sqlite')}
+    company_cache = cache.get_company_cache()
+    company_cache.put('552100554', societe())
+    company_cache.put_not_found('999000001')
+
+    results = resolve_many(['552100554', '999 000 001'])
+
+    assert results['552100554'] == societe()
+    error = results['999 000 001']
+    assert isinstance(error, SocieteNotFoundError) and "introuvable (cache)" in str(error)
@@ -0,0 +1,26 @@
+# CLI : génération de contrats de la famille de test (données de test, aucun appel réseau)
+
+import sys
+
+import yaml
+
+from src import cli
+from tests.conftest import MSA_CONFIG
+
+
+def run_cli(monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ['cli', *args])
+    cli.main()
+
+
+def test_contract_summary_names_the_configured_fixed_party(project, monkeypatch, capsys):
+    config = {**MSA_CONFIG, 'partie_fixe': {**MSA_CONFIG['partie_fixe'], 'raison_sociale': 'ACME CONSEIL'}}
+    (project / 'templates' / 'msa' / 'config.yaml').write_text(yaml.safe_dump(config, allow_unicode=True),
+                                                                encoding='utf-8')
+
+    run_cli(monkeypatch, 'contract', 'msa', '--party', '393525852', '--output', str(project / 'out'))
+
+    out = capsys.readouterr().out
+    assert "   - ACME CONSEIL (Partie 1)\n   - NEXANS (Partie 2)" in out
+    assert "FR DIGITAL (Partie 1)" not in out
+    assert len(list((project / 'out').glob('MSA_standard_NEXANS_*.docx'))) == 1
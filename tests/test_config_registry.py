@@ -0,0 +1,102 @@
+# Validation et chargement des config.yaml de templates
+
+import copy
+import os
+
+import pytest
+import yaml
+
+from src.config_registry import ConfigRegistry, TemplateConfigError, validate_template_config
+from tests.conftest import MSA_CONFIG
+
+
+def config(**changes):
+    result = copy.deepcopy(MSA_CONFIG)
+    result.update(changes)
+    return result
+
+
+def errors_of(value) -> str:
+    with pytest.raises(TemplateConfigError) as excinfo:
+        validate_template_config(value, 'msa')
+    return str(excinfo.value)
+
+
+def test_valid_config():
+    assert validate_template_config(config(), 'msa')['variants'] == MSA_CONFIG['variants']
+
+
+def test_not_a_mapping():
+    assert "dictionnaire YAML est attendu" in errors_of(['variants'])
+
+
+@pytest.mark.parametrize('changes, expected', [
+    ({'variants': {}}, "variants: au moins une variante est requise"),
+    ({'variants': {'standard': {'template': 'MSA.pdf'}}}, "variants.standard.template: nom de fichier .docx attendu"),
+    ({'variants': {'standard': {'template': 'MSA.docx', 'format_partie2': 'courte'}}},
+     "variants.standard.format_partie2: 'courte' (formats déclarés: designation)"),
+    ({'formats': {'designation': {'XXXXX': '{nom}'}}}, "formats.designation.XXXXX: {nom}: champ inconnu"),
+    ({'formats': {'designation': {'XXXXX': '{siren|reverse}'}}}, "filtre(s) inconnu(s) reverse"),
+    ({'formats': {'designation': {'XXXXX': '{siren:>9}'}}}, "format et conversion non pris en charge"),
+    ({'tables': [{'markers': [], 'replacements': {'Nom :': '{representant_nom}'}}]},
+     "tables[0].markers: liste de chaînes non vides attendue"),
+    ({'tables': [{'markers': ['Nom :'], 'column': -1, 'replacements': {'Nom :': '{representant_nom}'}}]},
+     "tables[0].column: index de colonne (entier >= 0) attendu"),
+    ({'placeholders': ['XXXXX', '']}, "placeholders: liste de chaînes non vides attendue"),
+    ({'output': {'naming': 'MSA_{{DATE}}.docx'}}, "output.naming: {{TYPE}} requis"),
+])
+def test_invalid_config(changes, expected):
+    assert expected in errors_of(config(**changes))
+
+
+def test_all_errors_reported_at_once():
+    message = errors_of(config(variants={}, placeholders='XXXXX', output={'naming': 'x.pdf'}))
+
+    assert "variants:" in message
+    assert "placeholders:" in message
+    assert "output.naming: modèle de nom de fichier .docx attendu" in message
+
+
+def test_registry_reloads_modified_config(tmp_path):
+    path = tmp_path / 'msa' / 'config.yaml'
+    path.parent.mkdir()
+    path.write_text(yaml.safe_dump(config()), encoding='utf-8')
+    registry = ConfigRegistry(tmp_path, cache_dir=tmp_path / 'cache')
+
+    assert registry.get('msa') is registry.get('msa')
+    path.write_text(yaml.safe_dump(config(output={'naming': 'MSA_{{TYPE}}_{{DATE}}_v2.docx'})), encoding='utf-8')
+    os.utime(path, (1, 1))
+    assert registry.get('msa')['output']['naming'].endswith('_v2.docx')
+
+
+def test_registry_rejects_invalid_yaml(tmp_path):
+    path = tmp_path / 'msa' / 'config.yaml'
+    path.parent.mkdir()
+    path.write_text("variants: [", encoding='utf-8')
+
+    with pytest.raises(TemplateConfigError, match="YAML invalide"):
+        ConfigRegistry(tmp_path).get('msa')
+    with pytest.raises(FileNotFoundError):
+        ConfigRegistry(tmp_path).get('dpa')
+
+
+def test_json_cache_revalidated_when_validators_change(tmp_path, monkeypatch):
+    from src import config_registry
+
+    path = tmp_path / 'msa' / 'config.yaml'
+    path.parent.mkdir()
+    path.write_text(yaml.safe_dump(config()), encoding='utf-8')
+    ConfigRegistry(tmp_path, cache_dir=tmp_path / 'cache').get('msa')
+    assert (tmp_path / 'cache' / 'msa.json').is_file()
+
+    def rejected(value, name):
+        raise TemplateConfigError("nouvelle règle de validation")
+
+    monkeypatch.setattr(config_registry, 'validate_template_config', rejected)
+    # Même YAML, mêmes validateurs : relu depuis le cache JSON, sans validation
+    assert ConfigRegistry(tmp_path, cache_dir=tmp_path / 'cache').get('msa')['name'] == 'msa'
+
+    # Validateurs modifiés : le cache est ignoré et la configuration revalidée
+    monkeypatch.setattr(config_registry, 'validator_version', lambda: 'modifiés')
+    with pytest.raises(TemplateConfigError, match="nouvelle règle"):
+        ConfigRegistry(tmp_path, cache_dir=tmp_path / 'cache').get('msa')
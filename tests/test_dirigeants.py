@@ -0,0 +1,122 @@
+# Représentants légaux : choix du signataire, extrait local, API Pappers simulée, cache et résolution
+
+import pytest
+
+from src import dirigeants, settings
+from src.cache import HIT, MISS, NEGATIVE, DirigeantCache
+from src.dirigeants import (DirigeantProvider, DirigeantResolver, LocalDumpProvider, PappersProvider,
+                            choose_representant, get_provider)
+from src.models import Dirigeant
+from src.scraper import REPRESENTANT_NON_DISPONIBLE, resolve_many
+
+
+@pytest.fixture
+def resolver_settings(project):
+    """Résolveur partagé reconstruit à partir de la configuration du test."""
+    dirigeants.get_dirigeant_resolver.cache_clear()
+    yield settings.load_settings()
+    dirigeants.get_dirigeant_resolver.cache_clear()
+
+
+def write_dump(path, text):
+    path.write_text(text, encoding='utf-8')
+    return path
+
+
+def test_choose_representant():
+    assert choose_representant([('Anne Martin', 'Directeur général délégué'), ('Jean Dupont', 'Président'),
+                                ('Paul Durand', 'président')]) == Dirigeant('Jean Dupont', 'Président')
+    assert choose_representant([('', 'Président'), ('Anne Martin', '')]) == Dirigeant('Anne Martin',
+                                                                                       'Représentant légal')
+    assert choose_representant([]) is None
+
+
+def test_provider_is_abstract():
+    with pytest.raises(TypeError):
+        DirigeantProvider()
+
+
+@pytest.mark.parametrize('text', [
+    "siren;nom;fonction\n552100554;Anne Martin;Directeur général\n552 100 554;Jean Dupont;Président\n",
+    "siren,nom_complet,qualite\n552100554,Jean Dupont,Président\n",
+])
+def test_local_dump(tmp_path, text):
+    provider = LocalDumpProvider(write_dump(tmp_path / 'dirigeants.csv', text))
+
+    assert provider.fetch('552100554') == (Dirigeant('Jean Dupont', 'Président'), 200)
+    assert provider.fetch('552100555') == (None, 404)
+
+
+def test_unreadable_local_dump_means_no_dirigeant(tmp_path, capsys):
+    provider = LocalDumpProvider(write_dump(tmp_path / 'dirigeants.csv', "siren;fonction\n552100554;Président\n"))
+
+    assert provider.fetch('552100554') == (None, None)
+    assert provider.fetch('552100555') == (None, None)
+    # Signalé une seule fois
+    assert capsys.readouterr().out.count("colonnes siren et nom") == 1
+
+    assert LocalDumpProvider(tmp_path / 'absent.csv').fetch('552100554') == (None, None)
+
+
+def test_pappers_provider_against_stub(stub):
+    state, base_url = stub()
+    provider = PappersProvider(base_url, api_key='cle')
+
+    # Le commissaire aux comptes n'est pas retenu
+    assert provider.fetch('552100554') == (Dirigeant('Dirigeant Test 554', 'Président'), 200)
+    assert provider.fetch('999000001') == (None, 404)
+
+    unreachable = PappersProvider('http://127.0.0.1:9', api_key='cle', timeout=1)
+    assert unreachable.fetch('552100554') == (None, None)
+    assert state.statuses == {200: 1, 404: 1}
+
+
+def test_resolver_caches_found_and_not_found_but_not_errors(tmp_path, stub):
+    state, base_url = stub()
+    cache = DirigeantCache(tmp_path / 'dirigeants.sqlite', ttl_seconds=3600, negative_ttl_seconds=3600)
+    resolver = DirigeantResolver(PappersProvider(base_url, api_key='cle'), cache=cache, workers=2)
+
+    assert resolver.submit('552100554').result().nom == 'Dirigeant Test 554'
+    assert resolver.get('999000001') is None
+    assert resolver.get('552100554').nom == 'Dirigeant Test 554'
+    assert state.requests == 2
+    assert cache.get('552100554')[0] == HIT and cache.get('999000001')[0] == NEGATIVE
+
+    # Hors ligne : le fournisseur distant n'est pas interrogé
+    assert resolver.get('552100555', offline=True) is None
+    assert state.requests == 2
+
+    broken = DirigeantResolver(LocalDumpProvider(tmp_path / 'absent.csv'), cache=cache, workers=1)
+    assert broken.get('552100556') is None
+    assert cache.get('552100556') == (MISS, None)
+
+
+def test_get_provider(resolver_settings, tmp_path):
+    assert get_provider('') is None
+    assert get_provider('auto') is None
+    with pytest.raises(ValueError, match="pappers requiert pappers.api_key"):
+        get_provider('pappers')
+    with pytest.raises(ValueError, match="inconnu"):
+        get_provider('rne')
+
+    resolver_settings['dirigeants']['local_path'] = str(tmp_path / 'dirigeants.csv')
+    assert isinstance(get_provider('auto'), LocalDumpProvider)
+    resolver_settings['pappers'] = {'api_key': 'cle'}
+    assert isinstance(get_provider('auto'), PappersProvider)
+
+
+def test_resolve_many_fills_representant_from_local_dump(resolver_settings, stub, project):
+    state, base_url = stub()
+    resolver_settings['sirene'].update(base_url=base_url, api_key='cle', requests_per_minute=6000)
+    resolver_settings['dirigeants'].update(provider='local', local_path=str(
+        write_dump(project / 'dirigeants.csv', "siren;nom;fonction\n552100554;Jean Dupont;Président\n")))
+
+    results = resolve_many(['552100554'])
+    assert (results['552100554'].representant_nom, results['552100554'].representant_fonction) == (
+        'Jean Dupont', 'Président')
+
+    # Extrait illisible : fiche rendue sans représentant au lieu d'une erreur
+    write_dump(project / 'dirigeants.csv', "siren;fonction\n552100554;Président\n")
+    dirigeants.get_dirigeant_resolver.cache_clear()
+    results = resolve_many(['552100554'])
+    assert results['552100554'].representant_nom == REPRESENTANT_NON_DISPONIBLE
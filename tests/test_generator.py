@@ -0,0 +1,52 @@
+# Génération de plusieurs contrats : noms de fichiers distincts, archive ZIP, stockage incrémental
+
+import io
+import os
+import zipfile
+from dataclasses import replace
+
+import pytest
+from docx import Document
+
+from src.generator import generate_contract_set, unique_filename
+from src.output_store import OutputStore
+from src.scraper import get_test_data
+
+NEXANS = get_test_data('393525852')
+# Même raison sociale une fois tronquée à 20 caractères
+HOMONYMES = [
+    replace(NEXANS, siren='552 100 554', raison_sociale="GROUPE INDUSTRIEL DU NORD EST"),
+    replace(NEXANS, siren='552 100 555', raison_sociale="GROUPE INDUSTRIEL DU NORD OUEST"),
+]
+
+
+def test_unique_filename():
+    used = set()
+
+    assert unique_filename('MSA_a.docx', HOMONYMES[0], used) == 'MSA_a.docx'
+    assert unique_filename('MSA_a.docx', HOMONYMES[1], used) == 'MSA_a_552100555.docx'
+    assert unique_filename('MSA_a.docx', HOMONYMES[1], used) == 'MSA_a_552100555_2.docx'
+    assert used == {'MSA_a.docx', 'MSA_a_552100555.docx', 'MSA_a_552100555_2.docx'}
+
+
+def test_zip_entries_never_collide(project):
+    zip_path = project / 'contrats.zip'
+
+    names = generate_contract_set('msa', HOMONYMES, ['standard'], zip_path=str(zip_path))
+
+    assert len(set(names)) == 2
+    assert names[1].endswith('_552100555.docx')
+    with zipfile.ZipFile(zip_path) as archive:
+        assert archive.namelist() == names
+        document = Document(io.BytesIO(archive.read(names[1])))
+    assert "GROUPE INDUSTRIEL DU NORD OUEST" in document.paragraphs[0].text
+
+
+@pytest.mark.parametrize('incremental', [False, True])
+def test_output_files_never_collide(project, incremental):
+    store = OutputStore(project / 'outputs') if incremental else None
+
+    paths = generate_contract_set('msa', HOMONYMES, ['standard'], output_dir=str(project / 'out'), store=store)
+
+    assert len(set(paths)) == 2
+    assert sorted(p.name for p in (project / 'out').iterdir()) == sorted(os.path.basename(path) for path in paths)
@@ -0,0 +1,124 @@
+# File de travaux : reprise après interruption, remise en file des échecs
+
+from pathlib import Path
+
+import pytest
+
+from src.jobs import DONE, FAILED, QUEUED, RENDERING, RESOLVED, RESOLVING, SAVING, JobRunner, JobStore
+from src.scraper import get_test_data
+
+
+def rows(*parties, template='msa', variant='standard'):
+    return [{'line': i, 'party': party, 'template': template, 'variant': variant}
+            for i, party in enumerate(parties, start=2)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(tmp_path / 'jobs.sqlite')
+
+
+def statuses(store, run_id):
+    return [job['status'] for job in store.jobs(run_id)]
+
+
+def test_create_run_records_input_errors(store, tmp_path):
+    run_id = store.create_run(rows('393525852') + [{'line': 3, 'party': 'x', 'variant': 'standard',
+                                                    'error': 'SIREN invalide'}], str(tmp_path / 'out'))
+
+    jobs = store.jobs(run_id)
+    assert [job['status'] for job in jobs] == [QUEUED, FAILED]
+    assert jobs[1]['failed_stage'] == 'input'
+    # Colonne template absente : NDA
+    assert [job['template'] for job in jobs] == ['msa', 'nda']
+    assert store.progress(run_id)['remaining'] == 1
+
+
+def test_recover_resumes_interrupted_jobs_at_last_stable_state(store, tmp_path):
+    run_id = store.create_run(rows('393525852', '393525852', '393525852', '393525852'), str(tmp_path))
+    jobs = store.claim(run_id, 4)
+    assert statuses(store, run_id) == [RESOLVING] * 4
+
+    # Interruption pendant la résolution, le rendu, l'écriture, et un travail terminé
+    store.resolved(jobs[1]['id'], get_test_data('393525852'))
+    store.set_status(jobs[1]['id'], RENDERING)
+    store.resolved(jobs[2]['id'], get_test_data('393525852'))
+    store.set_status(jobs[2]['id'], SAVING)
+    store.resolved(jobs[3]['id'], get_test_data('393525852'))
+    store.done(jobs[3]['id'], 'out.docx')
+
+    assert store.recover(run_id) == 3
+    assert statuses(store, run_id) == [QUEUED, RESOLVED, RESOLVED, DONE]
+    # Un travail déjà pris n'est pas repris deux fois
+    assert [job['id'] for job in store.claim(run_id, 10)] == [jobs[0]['id']]
+
+
+def test_retry_requeues_at_failed_stage_and_skips_input_errors(store, tmp_path):
+    run_id = store.create_run(rows('393525852', '393525852') + [{'line': 9, 'party': 'x', 'variant': 'standard',
+                                                                  'error': 'SIREN invalide'}], str(tmp_path))
+    resolve_job, render_job = store.claim(run_id, 2)
+    store.fail(resolve_job['id'], 'resolve', 'API indisponible')
+    store.resolved(render_job['id'], get_test_data('393525852'))
+    store.fail(render_job['id'], 'render', 'pool cassé')
+
+    assert store.retry(run_id) == 2
+    jobs = store.jobs(run_id)
+    # Société déjà résolue : reprise directement au rendu
+    assert [job['status'] for job in jobs] == [QUEUED, RESOLVED, FAILED]
+    assert jobs[0]['error'] is None and jobs[0]['failed_stage'] is None
+    assert jobs[2]['failed_stage'] == 'input'
+
+
+def test_retry_selected_jobs(store, tmp_path):
+    run_id = store.create_run(rows('393525852', '393525852'), str(tmp_path))
+    first, second = store.claim(run_id, 2)
+    store.fail(first['id'], 'resolve', 'erreur')
+    store.fail(second['id'], 'resolve', 'erreur')
+
+    assert store.retry(run_id, [second['id']]) == 1
+    assert statuses(store, run_id) == [FAILED, QUEUED]
+
+
+def test_runner_completes_then_resumes_only_unfinished_jobs(project, tmp_path):
+    store = JobStore(tmp_path / 'jobs.sqlite')
+    run_id = store.create_run(rows('393525852', '552100554'), str(tmp_path / 'out'))
+
+    progress = JobRunner(store, run_id, render_workers=1, offline=True).run()
+
+    assert (progress[DONE], progress[FAILED], progress['remaining']) == (1, 1, 0)
+    done, failed = store.jobs(run_id)
+    assert Path(done['output']).is_file()
+    assert Path(done['output']).name.startswith('MSA_standard_')
+    # Hors ligne, sans cache : introuvable, reprenable avec retry
+    assert failed['failed_stage'] == 'resolve'
+
+    assert store.retry(run_id) == 1
+    progress = JobRunner(store, run_id, render_workers=1, offline=True).run()
+    assert (progress[DONE], progress[FAILED]) == (1, 1)
+    # Le travail terminé n'est pas régénéré
+    assert store.jobs(run_id)[0]['attempts'] == 1
+
+
+def test_runner_marks_invalid_identifiers_as_input_errors(project, tmp_path):
+    store = JobStore(tmp_path / 'jobs.sqlite')
+    run_id = store.create_run(rows('12345', '552100554'), str(tmp_path / 'out'))
+
+    JobRunner(store, run_id, render_workers=1, offline=True).run()
+
+    invalid, not_found = store.jobs(run_id)
+    assert invalid['failed_stage'] == 'input'
+    assert "SIREN invalide" in invalid['error']
+    assert not_found['failed_stage'] == 'resolve'
+    # Seule la société introuvable est reprise
+    assert store.retry(run_id) == 1
+    assert statuses(store, run_id) == [FAILED, QUEUED]
+
+
+def test_resolve_failure_stage():
+    from src.jobs import resolve_failure_stage
+    from src.scraper import AmbiguousNameError, SocieteNotFoundError
+
+    assert resolve_failure_stage(ValueError("SIREN invalide")) == 'input'
+    assert resolve_failure_stage(AmbiguousNameError("ACME", [])) == 'input'
+    assert resolve_failure_stage(SocieteNotFoundError('552100554', "introuvable")) == 'resolve'
+    assert resolve_failure_stage(ConnectionError("réseau")) == 'resolve'
@@ -0,0 +1,84 @@
+# Tables SIRENE : catégories juridiques, greffes par département ou par commune
+
+import pytest
+
+from src import lookups, settings
+from src.contract_engine import ContractRenderer, IncompleteSocieteError
+from src.lookups import (NON_RENSEIGNE, departement, forme_juridique_label, greffe_for_commune, greffes,
+                         lookups_version, read_table)
+from src.scraper import societe_from_unite_legale
+
+
+@pytest.fixture
+def reload_greffes():
+    greffes.cache_clear()
+    yield
+    greffes.cache_clear()
+
+
+@pytest.mark.parametrize('code, expected', [
+    ('5710', "Société par actions simplifiée"),
+    ('5720', "Société par actions simplifiée unipersonnelle"),
+    (' 5499 ', "Société à responsabilité limitée"),
+    ('9999', "Code 9999"),
+    ('', NON_RENSEIGNE),
+    (None, NON_RENSEIGNE),
+])
+def test_forme_juridique_label(code, expected):
+    assert forme_juridique_label(code) == expected
+
+
+def test_departement():
+    assert [departement(code) for code in ('92026', '2A004', '97411')] == ['92', '2A', '974']
+
+
+@pytest.mark.parametrize('code_commune, expected', [
+    # Département à un seul greffe
+    ('92026', "Nanterre"),
+    ('78586', "Versailles"),
+    ('2A004', "Ajaccio"),
+    # Département à plusieurs greffes : commune listée
+    ('13001', "Aix-en-Provence"),
+    ('13055', "Marseille"),
+    ('97411', "Saint-Denis de la Réunion"),
+    # Commune non listée d'un département à plusieurs greffes, code inconnu ou absent
+    ('13047', NON_RENSEIGNE),
+    ('99999', NON_RENSEIGNE),
+    ('', NON_RENSEIGNE),
+])
+def test_greffe_for_commune(code_commune, expected):
+    assert greffe_for_commune(code_commune) == expected
+
+
+def test_configured_greffes_table(tmp_path, monkeypatch, reload_greffes):
+    path = tmp_path / 'greffes.csv'
+    path.write_text("# version: test-1\ncode;greffe\n13;*\n13047;Tarascon\n", encoding='utf-8')
+    monkeypatch.setattr(settings, 'load_settings', lambda: {'lookups': {'greffes_path': str(path)}})
+
+    assert greffe_for_commune('13047') == "Tarascon"
+    assert greffe_for_commune('92026') == NON_RENSEIGNE
+    assert lookups_version().endswith("greffes:test-1")
+
+
+def test_read_table_requires_columns(tmp_path):
+    path = tmp_path / 'table.csv'
+    path.write_text("code;ville\n01;Bourg-en-Bresse\n", encoding='utf-8')
+
+    with pytest.raises(ValueError, match="greffe"):
+        read_table(path, 'greffe')
+    assert read_table(lookups.GREFFES_PATH, 'greffe')[0] == greffes()[0]
+
+
+def test_unknown_greffe_refuses_variants_using_ville_rcs(tmp_path):
+    societe = societe_from_unite_legale({
+        'periodesUniteLegale': [{'denominationUniteLegale': 'ACME', 'categorieJuridiqueUniteLegale': '5710'}],
+        'adresseEtablissement': {'libelleCommuneEtablissement': 'CHATEAUNEUF-LES-MARTIGUES',
+                                 'codeCommuneEtablissement': '13047'},
+    }, '552100554')
+    assert societe.ville_rcs == NON_RENSEIGNE
+
+    config = {'variants': {'simple': {'template': 'X.docx'}},
+              'formats': {'simple': {'commerce de XXX': 'commerce de {ville_rcs}', 'XXXXX': '{raison_sociale}'}}}
+    renderer = ContractRenderer('x', 'simple', config, tmp_path / 'X.docx')
+    with pytest.raises(IncompleteSocieteError, match="ville_rcs non renseigné"):
+        renderer.check_complete(societe)
@@ -0,0 +1,129 @@
+# Index des raisons sociales : normalisation, distance, recherche approchée, synchronisation du cache
+
+from dataclasses import replace
+
+import pytest
+
+from src.cache import CompanyCache
+from src.name_index import NameIndex, edit_variants, max_distance_for, name_distance, normalize_name
+from src.scraper import AmbiguousNameError, get_test_data, siren_from_name
+
+ROWS = [
+    ('100000004', 'ACME', 'Paris', 'stock'),
+    ('100000005', 'ACME', 'Lyon', 'stock'),
+    ('100000006', 'SNCF VOYAGEURS', 'Saint-Denis', 'stock'),
+    ('100000007', 'Groupe Tépéka & Fils', 'Nanterre', 'stock'),
+    # SIREN élevés : derniers dans l'ordre des listes de trigrammes
+    ('900000001', 'TEPUKE', 'Lyon', 'stock'),
+    ('900000002', 'LOFIAL CONSEIL SAS', 'Paris 8', 'stock'),
+]
+
+# Noms partageant le seul trigramme intact de « tepeke » / « lofeal » avec le bon
+# nom : plus nombreux que les candidats lus par requête de l'ancienne recherche
+FILLERS = [(f"{base + i:09d}", f"{prefix}{i:04d}", '', 'stock')
+           for base, prefix in ((200000000, 'TEP'), (210000000, 'LOF')) for i in range(1000)]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = NameIndex(tmp_path / 'names.sqlite')
+    index.build(ROWS + FILLERS)
+    return index
+
+
+def sirens(matches):
+    return [match.siren for match in matches]
+
+
+def test_normalize_name():
+    assert normalize_name("Société Générale SA") == 'societe generale'
+    assert normalize_name("A&B  Conseil (SARL)") == 'a et b conseil'
+    # Nom fait d'une seule mention de forme : conservé
+    assert normalize_name("SAS") == 'sas'
+    assert normalize_name(None) == ''
+
+
+def test_name_distance():
+    assert name_distance('nexans', 'groupe nexans france', 2) == 0
+    assert name_distance('nexans france', 'nexans', 2) == 3
+    assert name_distance('tepeke', 'tepuke', 1) == 1
+    assert name_distance('tepeke', 'groupe tepuke', 1) == 1
+    # Au-delà du maximum : max_distance + 1
+    assert name_distance('tepeke', 'tapuke', 1) == 2
+    assert [max_distance_for(text) for text in ('sas', 'acme', 'tepuke', 'sncf voyageurs')] == [0, 1, 1, 2]
+
+
+def test_edit_variants():
+    variants = edit_variants('abc')
+
+    assert {'xbc', 'bc', 'abxc', 'ab', 'a c'} <= variants
+    assert 'abc' not in variants and '' not in variants
+
+
+def test_search_exact_and_word_prefix(index):
+    assert sirens(index.search('tepuke')) == ['900000001']
+    assert sirens(index.search('SNCF')) == ['100000006']
+    # Début d'un mot autre que le premier, accents et forme juridique ignorés
+    assert index.search('voyageurs')[0].siren == '100000006'
+    assert index.search('TEPEKA')[0].raison_sociale == 'Groupe Tépéka & Fils'
+    assert index.search('lofial conseil')[0].distance == 0
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('TEPEKE', '900000001'),
+    ('LOFEAL', '900000002'),
+    ('TEPKE', '900000001'),
+    ('TEPUUKE', '900000001'),
+])
+def test_search_one_typo_among_names_sharing_a_common_trigram(index, query, expected):
+    matches = index.search(query)
+
+    assert expected in sirens(matches)
+    assert {match.distance for match in matches} == {1}
+
+
+def test_search_two_typos(index):
+    match = index.search('SNCF VOYAJEURZ')[0]
+
+    assert (match.siren, match.distance) == ('100000006', 2)
+
+
+def test_search_commune_filter(index):
+    assert sirens(index.search('ACME')) == ['100000004', '100000005']
+    assert sirens(index.search('ACME', commune='lyon')) == ['100000005']
+    # « Paris » correspond aussi à « Paris 8 »
+    assert sirens(index.search('lofeal', commune='Paris')) == ['900000002']
+    assert index.search('TEPUKE', commune='Paris') == []
+
+
+def test_sync_cache_is_incremental(index, tmp_path):
+    cache = CompanyCache(tmp_path / 'societes.sqlite', ttl_seconds=3600, negative_ttl_seconds=60)
+    societe = replace(get_test_data('393525852'), siren='300000001', raison_sociale='ZORBAXIA',
+                      adresse='Courbevoie (France)')
+    cache.put('300000001', societe)
+
+    assert index.sync_cache(cache) == 1
+    assert index.sync_cache(cache) == 0
+    match = index.search('zorbaxia', commune='Courbevoie')[0]
+    assert (match.siren, match.source) == ('300000001', 'cache')
+
+    # Fiche renommée : l'ancien nom n'est plus trouvé, y compris avec une faute
+    cache.put('300000001', replace(societe, raison_sociale='QUELVENA'))
+    assert index.sync_cache(cache) == 1
+    assert index.search('zorbaxia') == [] and index.search('zorbaxio') == []
+    assert sirens(index.search('quelvena')) == ['300000001']
+    assert index.count() == len(ROWS) + len(FILLERS) + 3
+
+
+def test_name_resolution_ambiguous_then_narrowed_by_commune(project):
+    from src.name_index import get_name_index
+
+    get_name_index().build(ROWS)
+
+    with pytest.raises(AmbiguousNameError) as excinfo:
+        siren_from_name('Acme')
+    assert sirens(excinfo.value.matches) == ['100000004', '100000005']
+    assert siren_from_name('Acme', commune='Lyon') == '100000005'
+    assert siren_from_name('LOFEAL') == '900000002'
+    with pytest.raises(ValueError, match="Aucune société"):
+        siren_from_name('Inexistante Holding')
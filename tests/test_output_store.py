@@ -0,0 +1,111 @@
+# Stockage adressé par contenu : objets réutilisés ou altérés, liens physiques vers les sorties
+
+import os
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+from src.generator import generate_contract_stored
+from src.metrics import metrics
+from src.models import Societe
+from src.output_store import OutputStore
+
+ACME = Societe(siren='552 100 554', raison_sociale='ACME', forme_juridique='Société par actions simplifiée',
+               capital='1 000 €', adresse='Lyon (France)', ville_rcs='Lyon', representant_nom='Jean Dupont',
+               representant_fonction='Président')
+
+
+@pytest.fixture
+def store(tmp_path):
+    metrics.reset()
+    yield OutputStore(tmp_path / 'outputs')
+    metrics.reset()
+
+
+def lookups():
+    """Recherches dans le stockage, par résultat (hit, miss, corrupt)."""
+    return {counter['labels']['result']: counter['value'] for counter in metrics.snapshot()['counters']
+            if counter['name'] == 'output_store_total'}
+
+
+def test_lookup_miss_hit_and_corrupt_object(store, tmp_path):
+    template = tmp_path / 'template.docx'
+    template.write_bytes(b'template')
+    key = store.key(template, {'template': 'template.docx'}, ACME)
+    assert store.lookup(key) is None
+
+    path = store.put(key, b'contrat', siren=ACME.siren, variant='standard')
+    assert path == store.object_path(key)
+    assert store.lookup(key) == path
+
+    # Même taille, autres octets : jamais resservi
+    path.write_bytes(b'CONTRAT')
+    assert store.lookup(key) is None
+    assert lookups() == {'miss': 1, 'hit': 1, 'corrupt': 1}
+
+
+def test_key_depends_on_every_input(store, tmp_path):
+    template = tmp_path / 'template.docx'
+    template.write_bytes(b'template')
+    key = store.key(template, {'template': 'template.docx'}, ACME)
+
+    assert store.key(template, {'template': 'template.docx'}, ACME) == key
+    assert store.key(template, {'template': 'autre.docx'}, ACME) != key
+    assert store.key(template, {'template': 'template.docx'}, ACME, renderer='fast') != key
+    assert store.key(template, {'template': 'template.docx'}, replace(ACME, capital='2 000 €')) != key
+
+    template.write_bytes(b'autre template')
+    assert store.key(template, {'template': 'template.docx'}, ACME) != key
+
+
+def test_manifest_is_shared_between_instances(store, tmp_path):
+    key = 'ab' * 32
+    store.put(key, b'contrat', siren=ACME.siren, variant='standard')
+
+    # Autre processus du pool : relit les entrées ajoutées au manifest
+    other = OutputStore(tmp_path / 'outputs')
+    assert other.lookup(key) == store.object_path(key)
+
+    # Ligne en cours d'écriture : ignorée jusqu'à ce qu'elle soit complète
+    with open(store.manifest_path, 'a', encoding='utf-8') as f:
+        f.write('{"key": "cd')
+    assert other.lookup('cd' * 32) is None
+    assert other.lookup(key) == store.object_path(key)
+
+
+def test_link_places_a_hard_link_and_replaces_existing(store, tmp_path):
+    path = store.put('ab' * 32, b'contrat')
+    dest = tmp_path / 'out' / 'contrat.docx'
+    dest.parent.mkdir()
+    dest.write_bytes(b'ancien')
+
+    OutputStore.link(path, dest)
+    OutputStore.link(path, dest)
+
+    assert os.path.samefile(path, dest)
+    assert dest.read_bytes() == b'contrat'
+    assert [p.name for p in dest.parent.iterdir()] == ['contrat.docx']
+
+
+def test_generate_contract_stored_reuses_then_regenerates(project, store):
+    output_dir = str(project / 'out')
+
+    output, reused = generate_contract_stored('msa', ACME, store, 'standard', output_dir)
+    assert not reused
+    assert generate_contract_stored('msa', ACME, store, 'standard', output_dir) == (output, True)
+    [stored] = store.objects_dir.glob('*/*.docx')
+    assert os.path.samefile(stored, output)
+
+    # Sortie modifiée sur place (même inode que l'objet) : régénérée dans un nouvel objet
+    with open(output, 'r+b') as f:
+        f.write(b'XX')
+    assert generate_contract_stored('msa', ACME, store, 'standard', output_dir) == (output, False)
+    assert Path(output).read_bytes()[:2] == b'PK'
+    assert os.path.samefile(store.object_path(stored.stem), output)
+
+    # Autre société : autre clé
+    _, reused = generate_contract_stored('msa', replace(ACME, raison_sociale='ACME BIS'), store, 'standard',
+                                         output_dir)
+    assert not reused
+    assert lookups() == {'miss': 2, 'hit': 1, 'corrupt': 1}
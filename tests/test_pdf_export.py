@@ -0,0 +1,131 @@
+# Export PDF par lots : faux soffice (aucun LibreOffice requis)
+
+import json
+import sys
+
+import pytest
+
+from src.pdf_export import PdfExporter, PdfExportError, find_soffice, format_pdf_result
+
+# Faux soffice : journalise ses appels, « convertit » les fichiers dont le nom
+# ne contient pas « illisible », code de sortie et attente pilotés par des fichiers
+FAKE_SOFFICE = """\
+#!{python}
+import json, pathlib, sys, time
+here = pathlib.Path(__file__).parent
+args = sys.argv[1:]
+outdir = pathlib.Path(args[args.index('--outdir') + 1])
+files = [pathlib.Path(a) for a in args[args.index('--outdir') + 2:]]
+with open(here / 'calls.jsonl', 'a') as log:
+    log.write(json.dumps({{'outdir': str(outdir), 'files': [f.name for f in files],
+                          'profile': args[0]}}) + '\\n')
+if (here / 'sleep').exists():
+    time.sleep(float((here / 'sleep').read_text()))
+for f in files:
+    if 'illisible' not in f.name:
+        (outdir / (f.stem + '.pdf')).write_bytes(b'%PDF-1.4 ' + f.read_bytes())
+if (here / 'fail').exists():
+    sys.stderr.write('conversion impossible\\n')
+    sys.exit(1)
+"""
+
+
+@pytest.fixture
+def soffice(tmp_path):
+    directory = tmp_path / 'bin'
+    directory.mkdir()
+    path = directory / 'soffice'
+    path.write_text(FAKE_SOFFICE.format(python=sys.executable), encoding='utf-8')
+    path.chmod(0o755)
+    return path
+
+
+def calls(soffice):
+    log = soffice.parent / 'calls.jsonl'
+    return [json.loads(line) for line in log.read_text().splitlines()] if log.exists() else []
+
+
+def documents(directory, *names):
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name in names:
+        path = directory / f"{name}.docx"
+        path.write_bytes(name.encode())
+        paths.append(str(path))
+    return paths
+
+
+def exporter(soffice, tmp_path, **options):
+    return PdfExporter(soffice=str(soffice), profile_dir=tmp_path / 'profiles', **options)
+
+
+def test_documents_are_converted_in_batches(soffice, tmp_path):
+    sources = documents(tmp_path / 'out', 'a', 'b', 'c', 'd', 'e')
+
+    results = exporter(soffice, tmp_path, workers=1, batch_size=2).convert(sources)
+
+    assert [call['files'] for call in calls(soffice)] == [['a.docx', 'b.docx'], ['c.docx', 'd.docx'], ['e.docx']]
+    assert [result['status'] for result in results] == ['ok'] * 5
+    assert (tmp_path / 'out' / 'c.pdf').read_bytes() == b'%PDF-1.4 c'
+    assert [result['batch_size'] for result in results] == [2, 2, 2, 2, 1]
+    for result in results:
+        assert result['amortized_ms'] == pytest.approx(result['batch_ms'] / result['batch_size'], abs=0.1)
+    assert "ms/document amorti, lot de 2" in format_pdf_result(results[0])
+    # Un profil LibreOffice par worker, réutilisé d'un lot à l'autre
+    assert {call['profile'] for call in calls(soffice)} == {
+        f"-env:UserInstallation={(tmp_path / 'profiles' / 'worker-0').resolve().as_uri()}"}
+
+
+def test_batches_are_grouped_by_output_directory(soffice, tmp_path):
+    first = documents(tmp_path / 'lot1', 'a', 'b')
+    second = documents(tmp_path / 'lot2', 'a')
+
+    with exporter(soffice, tmp_path, workers=2, batch_size=10) as pdf:
+        for source in (first[0], second[0], first[1]):
+            pdf.submit(source)
+        results = pdf.close()
+
+    assert sorted(tuple(call['files']) for call in calls(soffice)) == [('a.docx',), ('a.docx', 'b.docx')]
+    assert {result['pdf'] for result in results} == {
+        str(tmp_path / 'lot1' / 'a.pdf'), str(tmp_path / 'lot1' / 'b.pdf'), str(tmp_path / 'lot2' / 'a.pdf')}
+
+
+def test_same_pdf_name_starts_a_new_batch(soffice, tmp_path):
+    sources = documents(tmp_path / 'lot1', 'a') + documents(tmp_path / 'lot2', 'a')
+
+    results = exporter(soffice, tmp_path, batch_size=10).convert(sources, output_dir=str(tmp_path / 'pdf'))
+
+    assert [call['files'] for call in calls(soffice)] == [['a.docx'], ['a.docx']]
+    assert [result['status'] for result in results] == ['ok', 'ok']
+
+
+def test_errors_are_reported_per_document(soffice, tmp_path):
+    sources = documents(tmp_path / 'out', 'a', 'illisible')
+    # PDF d'une exécution précédente : jamais pris pour le résultat
+    (tmp_path / 'out' / 'illisible.pdf').write_bytes(b'ancien')
+
+    ok, missing = exporter(soffice, tmp_path).convert(sources)
+
+    assert ok['status'] == 'ok'
+    assert (missing['status'], missing['pdf'], missing['error']) == ('error', None, "PDF non produit par LibreOffice")
+    assert format_pdf_result(missing).startswith("❌ PDF:")
+
+
+def test_soffice_failure_and_timeout(soffice, tmp_path):
+    (soffice.parent / 'fail').write_text('')
+    source, unreadable = documents(tmp_path / 'out', 'a', 'illisible')
+
+    ok, failed = exporter(soffice, tmp_path).convert([source, unreadable])
+    # Code de sortie non nul : les PDF produits restent valables
+    assert ok['status'] == 'ok'
+    assert failed['error'] == "soffice (code 1): conversion impossible"
+
+    (soffice.parent / 'fail').unlink()
+    (soffice.parent / 'sleep').write_text('10')
+    [result] = exporter(soffice, tmp_path, timeout=1).convert([unreadable])
+    assert result['error'] == "soffice: délai de 1 s dépassé"
+
+
+def test_missing_soffice(tmp_path):
+    with pytest.raises(PdfExportError, match="LibreOffice introuvable"):
+        find_soffice(str(tmp_path / 'absent'))
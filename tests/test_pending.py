@@ -0,0 +1,103 @@
+# File d'attente des contrats (--defer) et CSV de données manuelles (resume --manual)
+
+import csv
+import json
+import os
+
+import pytest
+
+from src.pending import MANUAL_COLUMNS, PendingQueue, read_manual_data
+
+NEXANS = ['393525852', 'NEXANS', 'Société anonyme', '43 779 037 €', 'Courbevoie', 'Nanterre',
+          'Christopher Guérin', 'Directeur général']
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return PendingQueue(tmp_path / 'pending.jsonl')
+
+
+def write_manual(path, rows, delimiter=';', encoding='utf-8'):
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        writer.writerow(MANUAL_COLUMNS)
+        writer.writerows(rows)
+    return str(path)
+
+
+def test_park_once_per_contract(queue):
+    assert queue.park('393525852', 'Nexans', 'master', 'output', "introuvable")
+    assert not queue.park('393525852', 'nexans', 'master', 'output', "toujours introuvable")
+    assert queue.park('393525852', 'Nexans', 'master', 'output', "introuvable", template='msa')
+    assert queue.park('393525852', 'Nexans', 'prestations', 'output', "introuvable")
+
+    entries = queue.entries()
+    assert [(e['template'], e['variant'], e['reason']) for e in entries] == [
+        ('nda', 'master', "introuvable"), ('msa', 'master', "introuvable"), ('nda', 'prestations', "introuvable")]
+    assert entries[0]['output_dir'] == os.path.abspath('output')
+
+
+def test_entries_tolerate_legacy_and_corrupt_lines(queue):
+    legacy = {'siren': '393525852', 'party': 'Nexans', 'variant': 'master', 'output_dir': '/out', 'reason': ''}
+    queue.path.write_text(json.dumps(legacy) + "\n{tronqué\n", encoding='utf-8')
+
+    assert queue.entries() == [legacy]
+    # Entrée antérieure aux types de contrats : NDA
+    assert not queue.park('393525852', 'Nexans', 'master', '/out', "introuvable")
+
+
+def test_remove_keeps_other_contracts(queue):
+    assert queue.entries() == []
+    queue.park('393525852', 'Nexans', 'master', 'output', "introuvable")
+    queue.park('552100554', 'Acme', 'master', 'output', "introuvable")
+
+    queue.remove([queue.entries()[0]])
+
+    assert [entry['siren'] for entry in queue.entries()] == ['552100554']
+
+
+def test_write_template_lists_each_siren_once(queue, tmp_path):
+    for variant in ('master', 'prestations'):
+        queue.park('393525852', 'Nexans', variant, 'output', "introuvable")
+    queue.park('552100554', 'Acme', 'master', 'output', "introuvable")
+
+    path = tmp_path / 'a_completer' / 'manuel.csv'
+    assert queue.write_template(str(path)) == 2
+    with open(path, encoding='utf-8', newline='') as f:
+        rows = list(csv.DictReader(f, delimiter=';'))
+    assert [row['siren'] for row in rows] == ['393525852', '552100554']
+    assert list(rows[0]) == list(MANUAL_COLUMNS)
+    assert rows[0]['raison_sociale'] == ''
+
+
+@pytest.mark.parametrize('delimiter', [';', ','])
+def test_read_manual_data(tmp_path, delimiter):
+    path = write_manual(tmp_path / 'manuel.csv', [
+        NEXANS,
+        ['552 100 554', 'ACME', 'SAS', '1 000 €', 'Lyon (France)', 'Lyon', 'Jean Dupont', 'Président'],
+        # Ligne du modèle pas encore remplie : ignorée sans erreur
+        ['901995309', '', '', '', '', '', '', ''],
+        ['552100555', 'ACME BIS', '', '1 000 €', 'Lyon', 'Lyon', 'Jean Dupont', 'Président'],
+        ['12345', 'COURT', 'SAS', '1 €', 'Paris', 'Paris', 'Jean Dupont', 'Président'],
+    ], delimiter=delimiter, encoding='utf-8-sig')
+
+    societes, errors = read_manual_data(path)
+
+    assert list(societes) == ['393525852', '552100554']
+    nexans = societes['393525852']
+    assert (nexans.siren, nexans.raison_sociale) == ('393 525 852', 'NEXANS')
+    # Même forme que la saisie interactive et l'API SIRENE
+    assert nexans.adresse == 'Courbevoie (France)'
+    assert societes['552100554'].adresse == 'Lyon (France)'
+    assert errors == ["ligne 5 (552100555): champ(s) vide(s): forme_juridique",
+                      "ligne 6: SIREN invalide: 12345"]
+
+
+def test_read_manual_data_requires_all_columns(tmp_path):
+    path = tmp_path / 'manuel.csv'
+    path.write_text("siren;raison_sociale\n393525852;NEXANS\n", encoding='utf-8')
+
+    with pytest.raises(ValueError, match="colonne\\(s\\) manquante\\(s\\): forme_juridique"):
+        read_manual_data(str(path))
+    with pytest.raises(FileNotFoundError):
+        read_manual_data(str(tmp_path / 'absent.csv'))
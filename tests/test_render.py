@@ -0,0 +1,207 @@
+# Rendu : moteur fast_render contre python-docx, placeholders coupés entre runs
+
+import io
+import zipfile
+
+import pytest
+from docx import Document
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+
+from benchmarks.fast_render_check import canonical_document_xml, document_texts, render_synthetic, sample_parties
+from benchmarks.synthetic import SIZES, build_synthetic_template
+from src.fast_render import get_fast_template
+from src.generator import load_template_config, render_contract
+from src.replacer import ReplacementEngine
+from src.template_cache import get_compiled_template
+
+NDA_CONFIG = load_template_config('nda')
+NDA_VARIANTS = list(NDA_CONFIG['variants'])
+
+
+@pytest.fixture(scope='module')
+def synthetic_templates(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('synthetic')
+    return {size: build_synthetic_template(directory / f"{size}.docx", **options)
+            for size, options in SIZES.items() if size != 'large'}
+
+
+@pytest.mark.parametrize('party', ['nexans', 'escaping'])
+@pytest.mark.parametrize('size', ['small', 'medium'])
+def test_fast_render_matches_python_docx(synthetic_templates, size, party):
+    partie2 = sample_parties()[party]
+    reference = render_synthetic('docx', synthetic_templates[size], partie2)
+    fast = render_synthetic('fast', synthetic_templates[size], partie2)
+
+    assert document_texts(fast) == document_texts(reference)
+    assert canonical_document_xml(fast) == canonical_document_xml(reference)
+    assert partie2.raison_sociale.strip() in '\n'.join(document_texts(fast))
+
+
+@pytest.mark.parametrize('variant', NDA_VARIANTS)
+def test_fast_render_matches_python_docx_on_nda_templates(variant):
+    from src.generator import contract_renderer
+
+    if not contract_renderer('nda', variant, NDA_CONFIG).template_path.exists():
+        pytest.skip("templates NDA non fournis (templates/nda/examples/*.docx)")
+    partie2 = sample_parties()['nexans']
+    reference = render_contract('nda', partie2, variant, config=NDA_CONFIG, engine='docx')
+    fast = render_contract('nda', partie2, variant, config=NDA_CONFIG, engine='fast')
+
+    assert canonical_document_xml(fast) == canonical_document_xml(reference)
+    cells = document_texts(fast)[-4:]
+    assert cells[2].startswith(f"Nom : {partie2.representant_nom}")
+    # Bloc de signature de la partie 1 inchangé
+    assert cells[3] == "Nom : Frédéric Ramet\nTitre : Président"
+
+
+class NonSeekable(io.RawIOBase):
+    """Flux d'écriture sans seek ni tell (réponse HTTP, pipe)."""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.data += b
+        return len(b)
+
+
+def test_fast_render_copies_other_parts_without_recompressing(synthetic_templates, tmp_path):
+    # Compression différente de celle de zlib par défaut : une recompression se verrait
+    template = tmp_path / 'niveau1.docx'
+    with zipfile.ZipFile(synthetic_templates['small']) as source, \
+            zipfile.ZipFile(template, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as target:
+        for info in source.infolist():
+            target.writestr(info.filename, source.read(info))
+    rendering = get_fast_template(template).render()
+    rendering.replace({'XXXXX': 'NEXANS'})
+    stream = NonSeekable()
+    rendering.save(stream)
+
+    with zipfile.ZipFile(template) as source, zipfile.ZipFile(io.BytesIO(bytes(stream.data))) as output:
+        assert output.testzip() is None
+        assert sorted(output.namelist()) == sorted(source.namelist())
+        for info in source.infolist():
+            if info.filename != "word/document.xml":
+                copied = output.getinfo(info.filename)
+                assert (copied.CRC, copied.compress_type, copied.compress_size) == (
+                    info.CRC, info.compress_type, info.compress_size)
+        assert b'NEXANS' in output.read("word/document.xml")
+
+
+def test_cell_markers_include_hyperlink_text(tmp_path):
+    document = Document()
+    paragraph = document.add_table(rows=1, cols=1).cell(0, 0).paragraphs[0]
+    hyperlink = OxmlElement('w:hyperlink')
+    hyperlink.set(qn('w:anchor'), 'signature')
+    run = OxmlElement('w:r')
+    text = OxmlElement('w:t')
+    text.text = "Signataire"
+    run.append(text)
+    hyperlink.append(run)
+    paragraph._p.append(hyperlink)
+    paragraph.add_run(" : XXXXX")
+    path = tmp_path / 'hyperlien.docx'
+    document.save(path)
+
+    outputs = []
+    for get_template in (get_compiled_template, get_fast_template):
+        rendering = get_template(path).render()
+        assert rendering.replace_in_cells(['Signataire'], {'XXXXX': 'Jean Dupont'}) == {'XXXXX': 1}
+        buffer = io.BytesIO()
+        (rendering.document if get_template is get_compiled_template else rendering).save(buffer)
+        outputs.append(buffer.getvalue())
+
+    assert document_texts(outputs[1]) == ["Signataire : Jean Dupont"]
+    assert canonical_document_xml(outputs[1]) == canonical_document_xml(outputs[0])
+
+
+def _paragraph(*texts):
+    document = Document()
+    paragraph = document.add_paragraph()
+    for i, text in enumerate(texts):
+        paragraph.add_run(text).bold = i == 0
+    return paragraph
+
+
+def test_placeholder_split_across_runs():
+    paragraph = _paragraph("Entre XX", "XXX, inscrite sous le numéro X", "XXXX.")
+    engine = ReplacementEngine({'Entre XXXXX,': 'Entre NEXANS,', 'numéro XXXXX': 'numéro 393 525 852'})
+
+    counts = engine.apply_to_paragraph(paragraph)
+
+    assert paragraph.text == "Entre NEXANS, inscrite sous le numéro 393 525 852."
+    assert counts == {'Entre XXXXX,': 1, 'numéro XXXXX': 1}
+    # Le remplacement prend le run (et le formatage) où commence le placeholder
+    assert [run.text for run in paragraph.runs] == ["Entre NEXANS,", " inscrite sous le numéro 393 525 852", "."]
+    assert paragraph.runs[0].bold
+
+
+def test_first_key_wins_and_replacement_not_rescanned():
+    paragraph = _paragraph("XXXXX XXXXX")
+    engine = ReplacementEngine({'XXXXX XXXXX': 'A XXXXX', 'XXXXX': 'B'})
+
+    engine.apply_to_paragraph(paragraph)
+
+    assert paragraph.text == "A XXXXX"
+
+
+def test_paragraph_without_placeholder_untouched():
+    paragraph = _paragraph("Aucun", " placeholder")
+    before = [run._r for run in paragraph.runs]
+
+    assert ReplacementEngine({'XXXXX': 'A'}).apply_to_paragraph(paragraph) == {}
+    assert [run._r for run in paragraph.runs] == before
+    assert paragraph.text == "Aucun placeholder"
+
+
+def _run_children(paragraph):
+    return [child.tag.split('}')[1] for run in paragraph.runs for child in run._r if not child.tag.endswith('rPr')]
+
+
+def test_replacement_keeps_fields_tabs_and_breaks():
+    paragraph = _paragraph("Société XX")
+    run = paragraph.runs[0]
+    run.add_tab()
+    run.add_text("XXX")
+    run.add_break()
+    # Champ dans le même run que le placeholder
+    run._r.append(OxmlElement('w:fldChar'))
+    instruction = OxmlElement('w:instrText')
+    instruction.text = ' PAGE '
+    run._r.append(instruction)
+    paragraph.add_run("suite XXXXX")
+
+    ReplacementEngine({'XXXXX': 'NEXANS', 'Société XX': 'Société NEXANS'}).apply_to_paragraph(paragraph)
+
+    assert paragraph.text == "Société NEXANS\tXXX\nsuite NEXANS"
+    assert _run_children(paragraph) == ['t', 'tab', 't', 'br', 'fldChar', 'instrText', 't']
+    assert instruction.text == ' PAGE '
+
+
+def test_placeholder_spanning_a_tab_and_values_with_breaks():
+    paragraph = _paragraph("Nom")
+    paragraph.runs[0].add_tab()
+    paragraph.runs[0].add_text(": XXXXX")
+
+    ReplacementEngine({'Nom\t: XXXXX': 'Nom : Zoé\tO\'Brien\nPrésidente'}).apply_to_paragraph(paragraph)
+
+    assert paragraph.text == "Nom : Zoé\tO'Brien\nPrésidente"
+    assert _run_children(paragraph) == ['t', 'tab', 't', 'br', 't']
+
+
+def test_contract_family_renders_split_placeholders(project):
+    from src.scraper import get_test_data
+
+    partie2 = get_test_data('393525852')
+    for engine in ('docx', 'fast'):
+        document = Document(io.BytesIO(render_contract('msa', partie2, 'standard', engine=engine)))
+        cells = [cell.text for row in document.tables[0].rows for cell in row.cells]
+
+        assert document.paragraphs[0].text == ("Entre NEXANS (société anonyme), inscrite sous le numéro "
+                                               "393 525 852, et FR DIGITAL.")
+        # Règle de tableau limitée à la colonne du client
+        assert cells == ["LE CLIENT", "FR DIGITAL", f"Nom : {partie2.representant_nom}", "Nom : Frédéric Ramet"]
@@ -0,0 +1,95 @@
+# Serveur HTTP : réponses 200/400/404/503
+
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.server import NdaServer
+
+
+@pytest.fixture
+def server(project):
+    server = NdaServer(('127.0.0.1', 0), workers=1, queue_size=0, timeout=10, offline=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, path: str, payload):
+    """POST JSON -> (code HTTP, en-têtes, corps)."""
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+    request = urllib.request.Request(f"http://127.0.0.1:{server.server_address[1]}{path}", data=body,
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def test_render_ok(server):
+    status, headers, body = post(server, '/msa', {'siren': '393525852', 'variant': 'standard'})
+
+    assert status == 200
+    assert body[:2] == b'PK'
+    assert "NEXANS" in headers['Content-Disposition']
+    assert server.stats['ok'] == 1
+
+
+@pytest.mark.parametrize('payload', [
+    b'{pas du json',
+    [1, 2],
+    {'siren': '123'},
+    {'siren': ['393525852']},
+    {'siren': '393525852', 'variant': [1]},
+    {'siren': '393525852', 'variant': {'a': 1}},
+])
+def test_invalid_request_400(server, payload):
+    status, _, body = post(server, '/msa', payload)
+
+    assert status == 400
+    assert json.loads(body)['error'].startswith("Requête invalide")
+
+
+def test_unknown_variant_400(server):
+    status, _, body = post(server, '/msa', {'siren': '393525852', 'variant': 'premium'})
+
+    assert status == 400
+    assert json.loads(body)['variants'] == ['standard']
+
+
+def test_fixed_party_400(server):
+    status, _, body = post(server, '/msa', {'siren': '901995308'})
+
+    assert status == 400
+    assert "partie 1" in json.loads(body)['error']
+
+
+def test_unknown_route_404(server):
+    status, _, body = post(server, '/dpa', {'siren': '393525852'})
+
+    assert status == 404
+    assert json.loads(body)['templates'] == ['msa']
+
+
+def test_unknown_siren_404(server):
+    # Hors ligne, sans cache ni index : société introuvable
+    status, _, body = post(server, '/msa', {'siren': '552100554'})
+
+    assert status == 404
+    assert "552100554" in json.loads(body)['error']
+
+
+def test_saturated_503(server):
+    # Capacité atteinte : réponse immédiate, sans file d'attente
+    server.in_flight = server.capacity
+    status, headers, _ = post(server, '/msa', {'siren': '393525852'})
+
+    assert status == 503
+    assert headers['Retry-After'] == '1'
+    assert server.stats['rejected'] == 1
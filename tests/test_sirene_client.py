@@ -0,0 +1,138 @@
+# Client SIRENE : quota 429 et Retry-After, recherche groupée, contre le serveur simulé (aucun appel externe)
+
+import time
+from email.utils import formatdate
+
+import pytest
+
+from src import cache, settings
+from src.cache import NEGATIVE
+from src.scraper import SocieteNotFoundError, fetch_many_from_sirene_api, resolve_many
+from src.sirene_client import MAX_SEARCH_RESULTS, SireneClient, parse_retry_after
+
+
+@pytest.fixture
+def sirene(project, stub):
+    """Configuration du projet pointée sur le serveur simulé, avec une clé API."""
+    state, base_url = stub()
+    settings.load_settings()['sirene'].update(base_url=base_url, api_key='cle', requests_per_minute=6000)
+    return state
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('demain') is None
+    assert 8 <= parse_retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10
+    # Date passée : pas d'attente négative
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0.0
+
+
+def test_429_retried_after_retry_after_until_max_retries(stub):
+    state, base_url = stub(quota=2, window=60.0, retry_after=1)
+    client = SireneClient(base_url, requests_per_minute=6000, max_retries=1, backoff_seconds=0.01)
+
+    assert client.get_unite_legale('552100554')[0] == 200
+    assert client.get_unite_legale('552100555')[0] == 200
+    start = time.monotonic()
+    status, data = client.get_unite_legale('552100556')
+    elapsed = time.monotonic() - start
+
+    # Quota épuisé : 429, nouvelle tentative après Retry-After (1 s), même fenêtre -> 429 rendu
+    assert state.statuses == {200: 2, 429: 2}
+    assert elapsed >= 0.9
+    assert status == 429 and data is None
+
+
+def test_429_retry_succeeds_when_quota_window_resets(stub):
+    state, base_url = stub(quota=1, window=0.5, retry_after=1)
+    client = SireneClient(base_url, requests_per_minute=6000, max_retries=3, backoff_seconds=0.01)
+
+    assert client.get_unite_legale('552100554')[0] == 200
+    start = time.monotonic()
+    status, data = client.get_unite_legale('552100555')
+
+    assert status == 200
+    assert data['uniteLegale']['siren'] == '552100555'
+    assert state.statuses == {200: 2, 429: 1}
+    assert time.monotonic() - start >= 0.9
+
+
+def test_429_pauses_all_requests(stub):
+    """Un 429 suspend le seau à jetons partagé : les autres threads attendent aussi."""
+    state, base_url = stub(quota=1, window=0.5, retry_after=1)
+    client = SireneClient(base_url, requests_per_minute=6000, max_retries=3, backoff_seconds=0.01)
+
+    start = time.monotonic()
+    results = client.map(client.get_unite_legale, ['552100554', '552100555', '552100556'], workers=3)
+
+    assert [status for status, _ in results] == [200, 200, 200]
+    assert state.statuses[429] >= 1
+    assert time.monotonic() - start >= 0.9
+
+
+def test_404_is_not_retried(stub):
+    state, base_url = stub()
+    client = SireneClient(base_url, requests_per_minute=6000, max_retries=3, backoff_seconds=0.01)
+
+    assert client.get_unite_legale('999000001') == (404, None)
+    assert state.statuses == {404: 1}
+
+
+def test_search_unites_legales(stub):
+    state, base_url = stub()
+    client = SireneClient(base_url, requests_per_minute=6000)
+
+    status, unites_legales = client.search_unites_legales(['552100554', '999000001', '552100555'])
+    assert status == 200
+    assert [unite['siren'] for unite in unites_legales] == ['552100554', '552100555']
+    assert client.search_unites_legales(['999000001']) == (404, [])
+
+    with pytest.raises(ValueError, match="Au plus"):
+        client.search_unites_legales([f"{n:09d}" for n in range(MAX_SEARCH_RESULTS + 1)])
+
+
+def test_bulk_search_then_one_request_per_missing_siren(sirene):
+    results = fetch_many_from_sirene_api(['552100554', '999000001', '552100555', '552100554'])
+
+    # Une recherche groupée (200), puis le SIREN absent de la réponse seul (404)
+    assert sirene.requests == 2
+    assert sirene.statuses == {200: 1, 404: 1}
+    assert results['999000001'] == (None, 404)
+    societe, status = results['552100555']
+    assert (societe.siren, status) == ('552 100 555', 200)
+
+
+def test_bulk_search_chunks_and_can_be_disabled(sirene):
+    sirens = ['552100554', '552100555', '552100556']
+
+    settings.load_settings()['sirene']['bulk_chunk_size'] = 2
+    assert all(status == 200 for _, status in fetch_many_from_sirene_api(sirens).values())
+    assert sirene.requests == 2
+
+    settings.load_settings()['sirene']['bulk'] = False
+    fetch_many_from_sirene_api(sirens)
+    assert sirene.requests == 2 + 3
+
+
+def test_failed_bulk_search_falls_back_to_single_requests(stub, project):
+    state, base_url = stub(fail_every=2)
+    settings.load_settings()['sirene'].update(base_url=base_url, api_key='cle', requests_per_minute=6000)
+    # Une requête sur deux en 503, sans reprise : la recherche groupée, puis le second SIREN
+    state.requests = 1
+
+    results = fetch_many_from_sirene_api(['552100554', '552100555'], workers=1)
+
+    assert state.statuses == {503: 2, 200: 1}
+    assert results['552100554'][1] == 200
+    assert results['552100555'] == (None, 503)
+
+
+def test_resolve_many_caches_sirens_not_found(sirene, project):
+    settings.load_settings()['cache'] = {'enabled': True, 'path': str(project / 'societes.sqlite')}
+
+    results = resolve_many(['552100554', '999000001'])
+
+    assert results['552100554'].raison_sociale
+    assert isinstance(results['999000001'], SocieteNotFoundError)
+    assert cache.get_company_cache().get('999000001')[0] == NEGATIVE
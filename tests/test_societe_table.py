@@ -0,0 +1,119 @@
+# Sociétés en mémoire : champs internés, table en colonnes, fichier binaire, export / import du cache
+
+import struct
+from dataclasses import asdict
+
+import pytest
+
+from src import cache, settings, societe_table
+from src.models import INTERNED_FIELDS, Societe
+from src.name_index import get_name_index
+from src.scraper import format_siren
+from src.societe_table import FORMAT_VERSION, MAGIC, SocieteTable, export_cache, import_cache
+
+
+def societe(n: int, **changes) -> Societe:
+    values = dict(
+        siren=format_siren(f"{552100000 + n:09d}"),
+        raison_sociale=f"SOCIETE {n}",
+        forme_juridique="Société par actions simplifiée",
+        capital=f"{1000 + n} €",
+        adresse=f"{n} rue Pasteur, Lyon (France)",
+        ville_rcs="Lyon",
+        representant_nom=f"Jean Dupont {n}",
+        representant_fonction="Président",
+    )
+    values.update(changes)
+    return Societe(**values)
+
+
+def sample(rows: int = 500):
+    return [societe(n) for n in range(rows)]
+
+
+def test_low_cardinality_fields_are_interned():
+    assert INTERNED_FIELDS == ('forme_juridique', 'ville_rcs', 'representant_fonction')
+    first, second = societe(1, ville_rcs=''.join(['Ly', 'on'])), societe(2, ville_rcs=''.join(['Ly', 'on']))
+
+    assert first.ville_rcs is second.ville_rcs
+    assert not hasattr(first, '__dict__')
+
+
+def test_save_load_round_trip(tmp_path):
+    societes = sample()
+    table = SocieteTable.from_societes(societes)
+    table.metadata['data_version'] = 'categories:1,greffes:1'
+    path = tmp_path / 'societes.soctab'
+
+    table.save(str(path))
+    loaded = SocieteTable.load(str(path))
+
+    assert [asdict(s) for s in loaded] == [asdict(s) for s in societes]
+    assert loaded.metadata == {'data_version': 'categories:1,greffes:1'}
+    assert loaded.find('552 100 042') == societes[42]
+    assert loaded.find('999999999') is None and loaded.find('abc') is None
+    assert loaded[-1] == societes[-1]
+    # Colonnes répétitives : une valeur distincte, codée par ligne
+    assert loaded.columns['forme_juridique'].values == ["Société par actions simplifiée"]
+    assert len(loaded.columns['adresse'].data) > 0
+
+
+def test_load_rejects_other_versions_and_damaged_files(tmp_path):
+    path = tmp_path / 'societes.soctab'
+    SocieteTable.from_societes(sample()).save(str(path))
+    data = path.read_bytes()
+
+    (header_length,) = struct.unpack('<I', data[len(MAGIC):len(MAGIC) + 4])
+    header = data[len(MAGIC) + 4:len(MAGIC) + 4 + header_length]
+    newer = header.replace(f'"version": {FORMAT_VERSION}'.encode(), f'"version": {FORMAT_VERSION + 1}'.encode())
+    path.write_bytes(data.replace(header, newer))
+    with pytest.raises(ValueError, match="version de format non supportée"):
+        SocieteTable.load(str(path))
+
+    path.write_bytes(data[:-10])
+    with pytest.raises(ValueError, match="tronqué"):
+        SocieteTable.load(str(path))
+
+    path.write_bytes(b'PK' + data)
+    with pytest.raises(ValueError, match="pas une table de sociétés"):
+        SocieteTable.load(str(path))
+
+
+def test_load_tables_saved_with_capital_and_adresse_as_categories(tmp_path, monkeypatch):
+    path = tmp_path / 'ancienne.soctab'
+    monkeypatch.setattr(societe_table, 'CATEGORY_COLUMNS', INTERNED_FIELDS + ('capital', 'adresse'))
+    SocieteTable.from_societes(sample(20)).save(str(path))
+    monkeypatch.undo()
+
+    # Le type de chaque colonne est lu dans l'en-tête du fichier
+    assert list(SocieteTable.load(str(path))) == sample(20)
+
+
+def test_csv_round_trip(tmp_path):
+    path = tmp_path / 'societes.csv'
+    SocieteTable.from_societes(sample(3)).write_csv(str(path))
+
+    assert list(SocieteTable.read_csv(str(path))) == sample(3)
+
+    path.write_text(path.read_text(encoding='utf-8') + "12345;X;SAS;1 €;Lyon;Lyon;A;B\n", encoding='utf-8')
+    with pytest.raises(ValueError, match="ligne 5: SIREN invalide: 12345"):
+        SocieteTable.read_csv(str(path))
+
+
+def test_export_then_import_cache(project):
+    with pytest.raises(ValueError, match="cache des sociétés désactivé"):
+        export_cache(str(project / 'export.soctab'))
+
+    settings.load_settings()['cache'] = {'enabled': True, 'path': str(project / 'societes.sqlite')}
+    for item in sample(3):
+        cache.get_company_cache().put(item.siren.replace(' ', ''), item)
+
+    assert export_cache(str(project / 'export.soctab')) == 3
+
+    # Autre machine : cache vide, puis import
+    settings.load_settings()['cache']['path'] = str(project / 'autre.sqlite')
+    cache._company_cache = None
+    assert import_cache(str(project / 'export.soctab')) == 3
+    assert cache.get_company_cache().get('552100001')[1] == societe(1)
+    # Trouvables par leur nom
+    assert get_name_index().search('societe 2')[0].siren == '552100002'
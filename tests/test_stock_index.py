@@ -0,0 +1,104 @@
+# Index du fichier stock SIRENE : import, recherches, ordre stock / API, contrats refusés sans adresse
+
+import csv
+import zipfile
+from dataclasses import replace
+
+import pytest
+
+from src import settings, stock_index
+from src.contract_engine import IncompleteSocieteError
+from src.generator import contract_renderer, render_contract
+from src.lookups import NON_RENSEIGNE
+from src.scraper import scrape_pappers, stock_before_api
+from src.stock_index import STOCK_COLUMNS, StockIndex, build_stock_index
+
+STOCK_ROWS = [
+    ('552100554', 'ACME INDUSTRIE', '', '', '', '5710', 'A'),
+    ('552100555', '', 'ACME USUEL', '', '', '5499', 'A'),
+    ('552100556', '', '', 'DURAND', 'JEAN', '1000', 'C'),
+    # Lignes ignorées : SIREN invalide
+    ('12345', 'TROP COURT', '', '', '', '5710', 'A'),
+    ('ABCDEFGHI', 'PAS UN SIREN', '', '', '', '5710', 'A'),
+]
+
+
+def write_stock(path, rows=STOCK_ROWS, columns=STOCK_COLUMNS):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(rows)
+    return path
+
+
+def test_build_and_lookup(tmp_path):
+    index_path = tmp_path / 'stock.sqlite'
+
+    assert build_stock_index(str(write_stock(tmp_path / 'stock.csv')), str(index_path)) == 3
+    index = StockIndex(index_path)
+    assert index.count() == 3
+
+    periode = index.get_unite_legale('552100554')['periodesUniteLegale'][0]
+    assert periode == {'denominationUniteLegale': 'ACME INDUSTRIE', 'categorieJuridiqueUniteLegale': '5710',
+                       'etatAdministratifUniteLegale': 'A'}
+    # Dénomination usuelle, puis prénom et nom (personne physique)
+    assert index.get_unite_legale('552100555')['periodesUniteLegale'][0]['denominationUniteLegale'] == 'ACME USUEL'
+    assert index.get_unite_legale('552100556')['periodesUniteLegale'][0]['denominationUniteLegale'] == 'JEAN DURAND'
+    assert index.get_unite_legale('999999999') is None
+
+
+def test_build_from_insee_zip(tmp_path, monkeypatch):
+    csv_path = write_stock(tmp_path / 'StockUniteLegale_utf8.csv')
+    zip_path = tmp_path / 'StockUniteLegale_utf8.zip'
+    with zipfile.ZipFile(zip_path, 'w') as archive:
+        archive.write(csv_path, csv_path.name)
+
+    opened = []
+
+    class TrackedZipFile(zipfile.ZipFile):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            opened.append(self)
+
+    monkeypatch.setattr(stock_index.zipfile, 'ZipFile', TrackedZipFile)
+
+    assert build_stock_index(str(zip_path), str(tmp_path / 'stock.sqlite')) == 3
+    # Archive fermée après l'import
+    assert [archive.fp for archive in opened] == [None]
+
+
+def test_build_errors(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        build_stock_index(str(tmp_path / 'absent.csv'), str(tmp_path / 'stock.sqlite'))
+
+    write_stock(tmp_path / 'partiel.csv', rows=[('552100554', 'ACME')], columns=('siren', 'denominationUniteLegale'))
+    with pytest.raises(ValueError, match="categorieJuridiqueUniteLegale"):
+        build_stock_index(str(tmp_path / 'partiel.csv'), str(tmp_path / 'stock.sqlite'))
+    assert not (tmp_path / 'stock.sqlite').exists()
+
+
+def test_stock_before_api_without_api_key_or_offline(project):
+    assert stock_before_api(offline=False)
+    assert stock_before_api(offline=True)
+
+    settings.load_settings()['sirene']['api_key'] = 'cle'
+    assert not stock_before_api(offline=False)
+    assert stock_before_api(offline=True)
+
+
+def test_stock_societe_is_refused_by_variants_using_missing_fields(project):
+    build_stock_index(str(write_stock(project / 'stock.csv')), str(project / 'stock.sqlite'))
+
+    societe = scrape_pappers('552100554', interactive=False)
+    assert (societe.raison_sociale, societe.adresse, societe.capital) == ('ACME INDUSTRIE', NON_RENSEIGNE,
+                                                                          NON_RENSEIGNE)
+
+    # La famille de test ne reprend ni adresse ni capital
+    renderer = contract_renderer('msa', 'standard')
+    assert renderer.missing_fields(societe) == []
+    assert render_contract('msa', societe, 'standard', engine='fast')
+
+    incomplete = replace(societe, forme_juridique=NON_RENSEIGNE)
+    with pytest.raises(IncompleteSocieteError) as excinfo:
+        render_contract('msa', incomplete, 'standard', engine='fast')
+    assert (excinfo.value.siren, excinfo.value.missing) == ('552100554', ['forme_juridique'])